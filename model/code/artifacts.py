@@ -0,0 +1,69 @@
+import os
+import base64
+import hashlib
+import tempfile
+
+from enums import Color, SnarkPath
+
+
+def hash_conteudo(conteudo):
+    """Endereço de um artefato no armazenamento: sha256 do seu conteúdo"""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def identificador_artefato(*hashes):
+    """Identifica um conjunto de artefatos a partir dos hashes (igual a prover.hash_artefato do conteúdo)"""
+    sha256 = hashlib.sha256()
+    for valor in hashes:
+        sha256.update(bytes.fromhex(valor))
+    return sha256.hexdigest()
+
+
+class ArtifactStore:
+    """Armazenamento local dos arquivos do trusted setup, endereçados pelo hash do conteúdo
+
+    Um arquivo gravado nunca é alterado: um novo trusted setup gera novos hashes, e os
+    arquivos só são solicitados ao Servidor (por meio do Usuário) quando não estão aqui.
+    """
+
+    def __init__(self, diretorio=None):
+        self.diretorio = diretorio or SnarkPath.ARTIFACTS_DIR.value
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def caminho(self, hash_artefato):
+        if len(hash_artefato) != 64 or not all(c in '0123456789abcdef' for c in hash_artefato):
+            raise ValueError(f"Hash de artefato inválido: {hash_artefato}")
+        return os.path.join(self.diretorio, hash_artefato)
+
+    def possui(self, hash_artefato):
+        return os.path.isfile(self.caminho(hash_artefato))
+
+    def faltantes(self, hashes):
+        """Hashes referenciados que ainda não estão no armazenamento local"""
+        return [valor for valor in hashes if not self.possui(valor)]
+
+    def salvar(self, hash_artefato, conteudo):
+        """Confere o hash e publica o arquivo com uma renomeação atômica"""
+        if hash_conteudo(conteudo) != hash_artefato:
+            raise ValueError(f"Conteúdo não corresponde ao hash {hash_artefato}")
+        if self.possui(hash_artefato):
+            return
+
+        descritor, temporario = tempfile.mkstemp(prefix='.parcial-', dir=self.diretorio)
+        try:
+            with os.fdopen(descritor, 'wb') as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, self.caminho(hash_artefato))
+        except OSError:
+            os.unlink(temporario)
+            raise
+        print(Color.RED.value + f" Artefato armazenado: {hash_artefato[:12]} ({len(conteudo)} bytes)")
+
+    def salvar_base64(self, conteudos):
+        """Grava os artefatos recebidos no formato {hash: conteúdo em base64}"""
+        for hash_artefato, conteudo in conteudos.items():
+            self.salvar(hash_artefato, base64.b64decode(conteudo))
+
+    def ler(self, hash_artefato):
+        with open(self.caminho(hash_artefato), 'rb') as arquivo:
+            return arquivo.read()
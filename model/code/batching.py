@@ -0,0 +1,186 @@
+import math
+import queue
+import threading
+import time
+from collections import deque
+
+from enums import Batching, Color
+
+
+def percentil(valores, p):
+    """Calcula o percentil p (0-100) de uma lista de valores pelo método nearest-rank"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return ordenados[posicao]
+
+
+class EmbeddingRequest:
+    """Solicitação individual aguardando o processamento do seu lote"""
+
+    def __init__(self, imagem):
+        self.imagem = imagem
+        self.embedding = None
+        self.evento = threading.Event()
+        self.chegada = time.perf_counter()
+        self.etapas = {} # Etapa -> (início, fim, tamanho do lote), em segundos desde a época, para o rastreamento
+
+    def concluir(self, embedding):
+        self.embedding = embedding
+        self.evento.set()
+
+
+class MicroBatcher:
+    """Agrupa solicitações concorrentes em micro-lotes processados em duas etapas paralelas"""
+
+    def __init__(self, pipeline, janela=None, tamanho_maximo=None):
+        self.pipeline = pipeline
+        self.janela = Batching.WINDOW.value if janela is None else janela
+        self.tamanho_maximo = Batching.MAX_SIZE.value if tamanho_maximo is None else tamanho_maximo
+
+        # Fila de entrada (etapa de detecção) e fila intermediária (etapa de embedding)
+        self.fila_deteccao = queue.Queue()
+        self.fila_embedding = queue.Queue(maxsize=Batching.PIPELINE_DEPTH.value)
+
+        # Estatísticas por tamanho de lote
+        self.trava_estatisticas = threading.Lock()
+        self.estatisticas_lote = {}
+
+        self.threads = []
+
+    def iniciar(self):
+        """Inicia as threads das etapas de detecção e de embedding"""
+        for alvo in (self.etapa_deteccao, self.etapa_embedding):
+            thread = threading.Thread(target=alvo, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+        print(Color.RED.value + f" Micro-batching ativo - Janela: {self.janela * 1000:.0f} ms, Lote máximo: {self.tamanho_maximo}")
+
+    def gerar(self, imagem, timeout=None, etapas=None):
+        """Enfileira uma imagem e bloqueia até que a sua embedding (ou None) esteja pronta
+
+        Se 'etapas' for informado, recebe os intervalos dos lotes de detecção ('mtcnn') e de
+        embedding ('resnet') que processaram a imagem.
+        """
+        solicitacao = EmbeddingRequest(imagem)
+        self.fila_deteccao.put(solicitacao)
+
+        if not solicitacao.evento.wait(timeout or Batching.TIMEOUT.value):
+            print(Color.RED.value + "❌ Tempo esgotado aguardando o micro-lote")
+            return None
+
+        if etapas is not None:
+            etapas.update(solicitacao.etapas)
+        return solicitacao.embedding
+
+    def coletar_lote(self):
+        """Aguarda a primeira solicitação e agrupa as seguintes até fechar a janela ou encher o lote"""
+        lote = [self.fila_deteccao.get()]
+        prazo = time.perf_counter() + self.janela
+
+        while len(lote) < self.tamanho_maximo:
+            restante = prazo - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self.fila_deteccao.get(timeout=restante))
+            except queue.Empty:
+                break
+
+        return lote
+
+    def etapa_deteccao(self):
+        """Etapa 1: detecção de faces do lote coletado"""
+        while True:
+            lote = self.coletar_lote()
+            inicio = time.time()
+            try:
+                faces = self.pipeline.detectar_lote([s.imagem for s in lote])
+            except Exception as e:
+                print(Color.RED.value + f"❌ Erro na etapa de detecção: {e}")
+                faces = [None] * len(lote)
+            etapa = (inicio, time.time(), len(lote))
+
+            # Solicitações sem face detectada são concluídas imediatamente
+            pendentes = []
+            for solicitacao, face in zip(lote, faces):
+                solicitacao.etapas['mtcnn'] = etapa
+                if face is None:
+                    solicitacao.concluir(None)
+                else:
+                    pendentes.append((solicitacao, face))
+
+            if pendentes:
+                self.fila_embedding.put(pendentes)
+
+    def etapa_embedding(self):
+        """Etapa 2: forward do InceptionResnetV1 sobre as faces detectadas, em paralelo à detecção"""
+        excedente = []
+        while True:
+            # Faces que não couberam no lote anterior vêm primeiro, sem esperar por novas
+            pendentes = excedente or self.fila_embedding.get()
+
+            # Aproveita lotes de detecção já concluídos sem esperar por novos
+            while len(pendentes) < self.tamanho_maximo:
+                try:
+                    pendentes.extend(self.fila_embedding.get_nowait())
+                except queue.Empty:
+                    break
+
+            # O forward nunca excede o lote máximo; o restante segue para o próximo
+            pendentes, excedente = pendentes[:self.tamanho_maximo], pendentes[self.tamanho_maximo:]
+
+            inicio = time.perf_counter()
+            inicio_etapa = time.time()
+            try:
+                embeddings = self.pipeline.embedar_lote([face for _, face in pendentes])
+            except Exception as e:
+                print(Color.RED.value + f"❌ Erro na etapa de embedding: {e}")
+                embeddings = [None] * len(pendentes)
+            etapa = (inicio_etapa, time.time(), len(pendentes))
+
+            for (solicitacao, _), embedding in zip(pendentes, embeddings):
+                solicitacao.etapas['resnet'] = etapa
+                solicitacao.concluir(embedding)
+
+            latencias = [time.perf_counter() - s.chegada for s, _ in pendentes]
+            self.registrar_lote(len(pendentes), latencias, time.perf_counter() - inicio)
+
+    def registrar_lote(self, tamanho, latencias, duracao):
+        """Acumula latências e tempo de processamento por tamanho de lote"""
+        with self.trava_estatisticas:
+            dados = self.estatisticas_lote.setdefault(tamanho, {
+                'lotes': 0,
+                'solicitacoes': 0,
+                'tempo_processamento': 0.0,
+                'latencias': deque(maxlen=Batching.STATS_WINDOW.value)
+            })
+            dados['lotes'] += 1
+            dados['solicitacoes'] += len(latencias)
+            dados['tempo_processamento'] += duracao
+            dados['latencias'].extend(latencias)
+
+    def relatorio(self):
+        """Retorna vazão e latência p99 por tamanho de lote da etapa de embedding"""
+        with self.trava_estatisticas:
+            relatorio = {}
+            for tamanho, dados in sorted(self.estatisticas_lote.items()):
+                latencias = list(dados['latencias'])
+                tempo = dados['tempo_processamento']
+                relatorio[tamanho] = {
+                    'lotes': dados['lotes'],
+                    'solicitacoes': dados['solicitacoes'],
+                    'vazao': dados['solicitacoes'] / tempo if tempo > 0 else 0.0,
+                    'p50': percentil(latencias, 50),
+                    'p99': percentil(latencias, 99)
+                }
+            return relatorio
+
+    def imprimir_relatorio(self):
+        """Imprime a tabela de vazão e latência p99 por tamanho de lote"""
+        print(Color.RED.value + " LOTE | SOLICITAÇÕES | VAZÃO (emb/s) | P50 (ms) | P99 (ms)")
+        for tamanho, dados in self.relatorio().items():
+            print(Color.RED.value + f" {tamanho:>4} | {dados['solicitacoes']:>12} | {dados['vazao']:>13.1f} | "
+                  f"{dados['p50'] * 1000:>8.1f} | {dados['p99'] * 1000:>8.1f}")
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from batching import MicroBatcher, percentil
+from enums import Color
+from model import Model
+
+
+TAMANHOS_LOTE = [1, 2, 4, 8, 16, 32]
+
+
+def carregar_imagens(diretorio):
+    """Carrega todas as imagens do diretório informado em RGB"""
+    imagens = []
+    for nome in sorted(os.listdir(diretorio)):
+        try:
+            imagens.append(Image.open(os.path.join(diretorio, nome)).convert('RGB'))
+        except Exception:
+            continue
+    return imagens
+
+
+def medir(pipeline, imagens, tamanho_lote, solicitacoes):
+    """Dispara solicitações concorrentes e mede vazão e latência para um tamanho máximo de lote"""
+    batcher = MicroBatcher(pipeline, tamanho_maximo=tamanho_lote)
+    batcher.iniciar()
+
+    def solicitar(indice):
+        inicio = time.perf_counter()
+        batcher.gerar(imagens[indice % len(imagens)])
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=solicitacoes) as executor:
+        latencias = list(executor.map(solicitar, range(solicitacoes)))
+    duracao = time.perf_counter() - inicio
+
+    return solicitacoes / duracao, percentil(latencias, 50), percentil(latencias, 99)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python3 benchmark_batching.py [DIRETÓRIO DE IMAGENS] [SOLICITAÇÕES]")
+        sys.exit(1)
+
+    diretorio = sys.argv[1]
+    solicitacoes = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    imagens = carregar_imagens(diretorio)
+    if not imagens:
+        print(Color.RED.value + f"❌ Nenhuma imagem encontrada em {diretorio}")
+        sys.exit(1)
+
+    model = Model()
+
+    # Aquecimento, para que a primeira medição não pague a inicialização do Torch
+    medir(model.pipeline, imagens, 1, 2)
+
+    print(Color.RED.value + f" {solicitacoes} solicitações concorrentes sobre {len(imagens)} imagens")
+    print(Color.RED.value + " LOTE MÁXIMO | VAZÃO (emb/s) | P50 (ms) | P99 (ms)")
+    for tamanho_lote in TAMANHOS_LOTE:
+        vazao, p50, p99 = medir(model.pipeline, imagens, tamanho_lote, solicitacoes)
+        print(Color.RED.value + f" {tamanho_lote:>11} | {vazao:>13.1f} | {p50 * 1000:>8.1f} | {p99 * 1000:>8.1f}")
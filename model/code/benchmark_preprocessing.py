@@ -0,0 +1,92 @@
+import sys
+import time
+import statistics
+from io import BytesIO
+
+import torch
+from PIL import Image
+
+from benchmark_batching import carregar_imagens
+from enums import Color
+from model import Model
+from preprocessing import ImagemPreparada, preparar_imagem
+
+
+LADOS_ORIGEM = [640, 1920, 4032] # Maior lado das imagens enviadas (4032 px: foto de 12 MP)
+LADOS_DETECCAO = [0, 1280, 960, 640, 480, 320] # 0: detecção na resolução original
+
+
+def codificar(imagem, lado):
+    """Reamostra a imagem para o maior lado informado e a codifica em JPEG, como um cliente enviaria"""
+    fator = lado / max(imagem.size)
+    redimensionada = imagem.resize((round(imagem.width * fator), round(imagem.height * fator)), Image.BICUBIC)
+    buffer = BytesIO()
+    redimensionada.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def embedding(model, preparada):
+    face = model.pipeline.detectar_lote([preparada])[0]
+    if face is None:
+        return None
+    return model.pipeline.embedar_lote([face])[0]
+
+
+def medir(model, arquivos, lado_deteccao, referencias):
+    """Latência de decodificação + detecção e concordância com a embedding de referência"""
+    latencias = []
+    distancias = []
+    detectadas = 0
+
+    for dados, referencia in zip(arquivos, referencias):
+        inicio = time.perf_counter()
+        if lado_deteccao:
+            preparada = preparar_imagem(dados, lado_deteccao)
+        else:
+            preparada = ImagemPreparada(Image.open(BytesIO(dados)).convert('RGB'))
+        face = model.pipeline.detectar_lote([preparada])[0]
+        latencias.append(time.perf_counter() - inicio)
+
+        if face is None:
+            continue
+        detectadas += 1
+
+        if referencia is not None:
+            atual = model.pipeline.embedar_lote([face])[0]
+            distancias.append(1 - torch.nn.functional.cosine_similarity(atual, referencia, dim=0).item())
+
+    return (
+        statistics.mean(latencias),
+        detectadas / len(arquivos),
+        max(distancias) if distancias else float('nan')
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python3 benchmark_preprocessing.py [DIRETÓRIO DE IMAGENS]")
+        sys.exit(1)
+
+    imagens = carregar_imagens(sys.argv[1])
+    if not imagens:
+        print(Color.RED.value + f"❌ Nenhuma imagem encontrada em {sys.argv[1]}")
+        sys.exit(1)
+
+    model = Model()
+
+    print(Color.RED.value + " ORIGEM (px) | DETECÇÃO (px) | LATÊNCIA (ms) | DETECTADAS | DIST. COSSENO MÁX.")
+    for lado_origem in LADOS_ORIGEM:
+        arquivos = [codificar(imagem, lado_origem) for imagem in imagens]
+
+        # Referência: detecção e recorte na resolução original, como antes do pré-processamento
+        referencias = [
+            embedding(model, ImagemPreparada(Image.open(BytesIO(dados)).convert('RGB'))) for dados in arquivos
+        ]
+
+        for lado_deteccao in LADOS_DETECCAO:
+            if lado_deteccao >= lado_origem:
+                continue
+            latencia, taxa, distancia = medir(model, arquivos, lado_deteccao, referencias)
+            rotulo = lado_deteccao or 'original'
+            print(Color.RED.value + f" {lado_origem:>11} | {rotulo:>13} | {latencia * 1000:>13.1f} | "
+                  f"{taxa * 100:>9.1f}% | {distancia:>18.4f}")
@@ -0,0 +1,101 @@
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from enums import Adjustments, Color
+from model import Model
+from preprocessing import ImagemPreparada
+from projection import EmbeddingProjection, matriz_aleatoria, matriz_pca
+from quantization import quantizar
+
+
+DIMENSOES = [256, 128] # Dimensões avaliadas por padrão (comparadas às 512 originais)
+
+
+def carregar_faces(diretorio):
+    """Imagens do diretório e de seus subdiretórios; o nome do subdiretório identifica a pessoa"""
+    faces = []
+    for raiz, _, arquivos in sorted(os.walk(diretorio)):
+        rotulo = os.path.relpath(raiz, diretorio)
+        for nome in sorted(arquivos):
+            try:
+                imagem = Image.open(os.path.join(raiz, nome)).convert('RGB')
+            except Exception:
+                continue
+            faces.append((None if rotulo == '.' else rotulo, imagem))
+    return faces
+
+
+def embeddings_faces(model, faces):
+    """Embeddings de 512 dimensões das imagens com face detectada e seus rótulos"""
+    embeddings = []
+    rotulos = []
+    for rotulo, imagem in faces:
+        face = model.pipeline.detectar_lote([ImagemPreparada(imagem)])[0]
+        if face is None:
+            continue
+        embeddings.append(model.pipeline.embedar_lote([face])[0].numpy())
+        rotulos.append(rotulo)
+    return np.stack(embeddings), rotulos
+
+
+def decisoes(embeddings):
+    """Decisão do circuito para cada par (i < j) das embeddings quantizadas
+
+    Como no circuito, que compara os quadrados, a decisão é |cosseno| >= limiar.
+    """
+    quantizadas = quantizar(embeddings).astype(np.float64)
+    normas = np.linalg.norm(quantizadas, axis=1)
+    cossenos = (quantizadas @ quantizadas.T) / np.outer(normas, normas)
+    linhas, colunas = np.triu_indices(len(embeddings), k=1)
+    return np.abs(cossenos[linhas, colunas]) >= Adjustments.THRESHOLD.value / Adjustments.SCALE.value
+
+
+def acuracia(decisoes_pares, rotulos):
+    """Fração dos pares em que a decisão coincide com a identidade (None sem rótulos)"""
+    if any(rotulo is None for rotulo in rotulos):
+        return None
+    linhas, colunas = np.triu_indices(len(rotulos), k=1)
+    mesma_pessoa = np.array([rotulos[i] == rotulos[j] for i, j in zip(linhas, colunas)])
+    return float(np.mean(decisoes_pares == mesma_pessoa))
+
+
+def formatar(valor):
+    return f"{valor * 100:>7.1f}%" if valor is not None else f"{'-':>8}"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python3 benchmark_projection.py [DIRETÓRIO DE IMAGENS] [DIMENSÕES...]")
+        sys.exit(1)
+
+    faces = carregar_faces(sys.argv[1])
+    if len(faces) < 2:
+        print(Color.RED.value + f"❌ São necessárias ao menos duas imagens em {sys.argv[1]}")
+        sys.exit(1)
+
+    dimensoes = [int(arg) for arg in sys.argv[2:]] or DIMENSOES
+
+    model = Model()
+    embeddings, rotulos = embeddings_faces(model, faces)
+    referencia = decisoes(embeddings)
+
+    print(Color.RED.value + f" {len(embeddings)} faces, {len(referencia)} pares, "
+          f"{int(referencia.sum())} aceitos com {Adjustments.EMBEDDING_DIMENSIONS.value} dimensões")
+    print(Color.RED.value + " DIMENSÕES | MÉTODO | CONCORDÂNCIA COM 512 | ACURÁCIA")
+    print(Color.RED.value + f" {Adjustments.EMBEDDING_DIMENSIONS.value:>9} | {'-':>6} | "
+          f"{formatar(1.0):>20} | {formatar(acuracia(referencia, rotulos))}")
+
+    for dimensao in dimensoes:
+        matrizes = {'random': matriz_aleatoria(dimensao)}
+        # A PCA é ajustada nas próprias imagens avaliadas (estimativa otimista)
+        if len(embeddings) >= dimensao:
+            matrizes['pca'] = matriz_pca(embeddings, dimensao)
+
+        for metodo, matriz in matrizes.items():
+            projetadas = decisoes(EmbeddingProjection(matriz).aplicar(embeddings))
+            concordancia = float(np.mean(projetadas == referencia))
+            print(Color.RED.value + f" {dimensao:>9} | {metodo:>6} | {formatar(concordancia):>20} | "
+                  f"{formatar(acuracia(projetadas, rotulos))}")
@@ -0,0 +1,86 @@
+import sys
+import json
+import time
+import random
+import statistics
+import subprocess
+
+from batching import percentil
+from enums import Adjustments, Color, SnarkPath
+from prover import ProverPool, hash_artefato
+from quantization import quantizar
+
+
+def entrada_sintetica(ruido=None):
+    """Par de embeddings aleatórias no formato produzido por Model.escalar_embedding
+
+    Com ruido, a segunda embedding é uma perturbação da primeira (par semelhante).
+    """
+    def normalizar(vetor):
+        norma = sum(v * v for v in vetor) ** 0.5
+        return [v / norma for v in vetor]
+
+    primeira = normalizar([random.gauss(0, 1) for _ in range(Adjustments.DIMENSIONS.value)])
+    if ruido is None:
+        segunda = normalizar([random.gauss(0, 1) for _ in range(Adjustments.DIMENSIONS.value)])
+    else:
+        segunda = normalizar([v + random.gauss(0, ruido) for v in primeira])
+
+    return {
+        'embedding1': quantizar(primeira).tolist(),
+        'embedding2': quantizar(segunda).tolist(),
+        'threshold': Adjustments.THRESHOLD.value
+    }
+
+
+def medir_script(entrada, repeticoes):
+    """Tempo por prova executando generate_proof.sh (bash + Node + snarkjs + leitura da zkey)"""
+    with open(SnarkPath.WITNESS.value, 'w') as arquivo:
+        json.dump(entrada, arquivo)
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = subprocess.run(SnarkPath.GENERATE_PROOF_SCRIPT.value, capture_output=True, text=True, shell=True)
+        tempos.append(time.perf_counter() - inicio)
+        if resultado.returncode != 0:
+            raise RuntimeError(resultado.stderr)
+    return tempos
+
+
+def medir_daemon(entrada, repeticoes):
+    """Tempo da primeira prova (inclui carregar os artefatos) e das seguintes no prover persistente"""
+    with open(SnarkPath.PROVING_KEY.value, 'rb') as zkey, open(SnarkPath.CIRCUIT.value, 'rb') as wasm:
+        artefato = hash_artefato(zkey.read(), wasm.read())
+
+    provers = ProverPool(processos=1)
+    provers.iniciar()
+
+    tempos = []
+    for _ in range(repeticoes + 1):
+        inicio = time.perf_counter()
+        provers.provar(artefato, SnarkPath.PROVING_KEY.value, SnarkPath.CIRCUIT.value, entrada)
+        tempos.append(time.perf_counter() - inicio)
+
+    provers.encerrar()
+    return tempos[0], tempos[1:]
+
+
+if __name__ == "__main__":
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    # Usa a proving key e o circuito já presentes em proof_generation/inputs/
+    entrada = entrada_sintetica()
+
+    script = medir_script(entrada, repeticoes)
+    primeira, daemon = medir_daemon(entrada, repeticoes)
+
+    media_script = statistics.mean(script)
+    media_daemon = statistics.mean(daemon)
+
+    print(Color.RED.value + " MODO   | MÉDIA (s) | P50 (s) | MÁX. (s)")
+    print(Color.RED.value + f" script | {media_script:>9.3f} | {percentil(script, 50):>7.3f} | {max(script):>8.3f}")
+    print(Color.RED.value + f" daemon | {media_daemon:>9.3f} | {percentil(daemon, 50):>7.3f} | {max(daemon):>8.3f}")
+    print(Color.RED.value + f" Primeira prova do daemon (com carga dos artefatos): {primeira:.3f} s")
+    print(Color.RED.value + f" Redução de Benchmark.PROOF_GENERATION: {media_script - media_daemon:.3f} s "
+          f"({(1 - media_daemon / media_script) * 100:.1f}%)")
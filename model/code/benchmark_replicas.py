@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from batching import percentil
+from benchmark_batching import carregar_imagens
+from enums import Color
+from model import Model
+from replicas import ReplicaPool
+
+
+def medir(model, imagens, processos, solicitacoes):
+    """Mede vazão e latência do pool com a quantidade de processos informada"""
+    replicas = ReplicaPool(model.mtcnn, model.resnet, processos=processos)
+    replicas.iniciar()
+
+    def solicitar(indice):
+        inicio = time.perf_counter()
+        replicas.gerar(imagens[indice % len(imagens)])
+        return time.perf_counter() - inicio
+
+    # Aquecimento: cada réplica paga a própria inicialização fora da medição
+    with ThreadPoolExecutor(max_workers=processos * 2) as executor:
+        list(executor.map(solicitar, range(processos * 2)))
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=solicitacoes) as executor:
+        latencias = list(executor.map(solicitar, range(solicitacoes)))
+    duracao = time.perf_counter() - inicio
+
+    replicas.encerrar()
+    return solicitacoes / duracao, percentil(latencias, 99)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python3 benchmark_replicas.py [DIRETÓRIO DE IMAGENS] [SOLICITAÇÕES] [MÁXIMO DE PROCESSOS]")
+        sys.exit(1)
+
+    diretorio = sys.argv[1]
+    solicitacoes = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    maximo = int(sys.argv[3]) if len(sys.argv) > 3 else len(os.sched_getaffinity(0))
+
+    imagens = carregar_imagens(diretorio)
+    if not imagens:
+        print(Color.RED.value + f"❌ Nenhuma imagem encontrada em {diretorio}")
+        sys.exit(1)
+
+    # Os pesos são carregados uma única vez e compartilhados por todas as réplicas
+    model = Model()
+
+    processos = 1
+    referencia = None
+    print(Color.RED.value + " PROCESSOS | VAZÃO (emb/s) | ACELERAÇÃO | P99 (ms)")
+    while processos <= maximo:
+        vazao, p99 = medir(model, imagens, processos, solicitacoes)
+        referencia = referencia or vazao
+        print(Color.RED.value + f" {processos:>9} | {vazao:>13.1f} | {vazao / referencia:>9.2f}x | {p99 * 1000:>8.1f}")
+        processos = processos * 2 if processos * 2 <= maximo or processos == maximo else maximo
@@ -0,0 +1,122 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from enums import Cache, Color
+
+
+class EmbeddingCache:
+    """Cache LRU das embeddings, indexado pelo sha256 dos bytes da imagem decodificada
+
+    As entradas expiram após o TTL (contado a partir da inserção, sem renovação por acesso)
+    e o cache respeita limites de quantidade de entradas e de memória ocupada.
+    """
+
+    def __init__(self, max_entradas=None, max_bytes=None, ttl=None):
+        self.max_entradas = Cache.MAX_ENTRIES.value if max_entradas is None else max_entradas
+        self.max_bytes = Cache.MAX_BYTES.value if max_bytes is None else max_bytes
+        self.ttl = Cache.TTL.value if ttl is None else ttl
+
+        self.entradas = OrderedDict()
+        self.bytes_ocupados = 0
+        self.trava = threading.Lock()
+
+        self.acertos = 0
+        self.faltas = 0
+        self.expiradas = 0
+        self.despejadas = 0
+
+    @property
+    def ativo(self):
+        return self.max_entradas > 0 and self.max_bytes > 0 and self.ttl > 0
+
+    def iniciar(self):
+        """Remove periodicamente as entradas expiradas, mesmo sem novas solicitações"""
+        if not self.ativo:
+            return
+
+        thread = threading.Thread(target=self.expirar_periodicamente, daemon=True)
+        thread.start()
+        print(Color.RED.value + f" Cache de embeddings ativo - Entradas: {self.max_entradas}, "
+              f"Memória: {self.max_bytes // 1024} KiB, TTL: {self.ttl} s")
+
+    def chave(self, dados_imagem):
+        return hashlib.sha256(dados_imagem).digest()
+
+    def obter(self, chave):
+        """Retorna a embedding armazenada para a chave ou None"""
+        if not self.ativo:
+            return None
+
+        with self.trava:
+            entrada = self.entradas.get(chave)
+            if entrada is not None and time.monotonic() - entrada[1] > self.ttl:
+                self.remover(chave)
+                self.expiradas += 1
+                entrada = None
+
+            if entrada is None:
+                self.faltas += 1
+                return None
+
+            self.entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada[0]
+
+    def armazenar(self, chave, embedding):
+        """Armazena a embedding (array NumPy) e despeja as menos usadas recentemente se necessário"""
+        if not self.ativo or embedding.nbytes > self.max_bytes:
+            return
+
+        with self.trava:
+            if chave in self.entradas:
+                self.remover(chave)
+
+            self.entradas[chave] = (embedding, time.monotonic())
+            self.bytes_ocupados += embedding.nbytes
+
+            while len(self.entradas) > self.max_entradas or self.bytes_ocupados > self.max_bytes:
+                self.remover(next(iter(self.entradas)))
+                self.despejadas += 1
+
+    def remover(self, chave):
+        embedding, _ = self.entradas.pop(chave)
+        self.bytes_ocupados -= embedding.nbytes
+
+    def remover_expiradas(self):
+        agora = time.monotonic()
+        with self.trava:
+            expiradas = [chave for chave, (_, inicio) in self.entradas.items() if agora - inicio > self.ttl]
+            for chave in expiradas:
+                self.remover(chave)
+            self.expiradas += len(expiradas)
+
+    def expirar_periodicamente(self):
+        while True:
+            time.sleep(min(self.ttl, 60))
+            self.remover_expiradas()
+
+    def limpar(self):
+        with self.trava:
+            self.entradas.clear()
+            self.bytes_ocupados = 0
+
+    def relatorio(self):
+        """Retorna acertos, faltas, taxa de acerto e ocupação do cache"""
+        with self.trava:
+            consultas = self.acertos + self.faltas
+            return {
+                'entradas': len(self.entradas),
+                'bytes': self.bytes_ocupados,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'expiradas': self.expiradas,
+                'despejadas': self.despejadas
+            }
+
+    def imprimir_relatorio(self):
+        dados = self.relatorio()
+        print(Color.RED.value + f" CACHE DE EMBEDDINGS: {dados['acertos']} acertos, {dados['faltas']} faltas "
+              f"({dados['taxa_acerto'] * 100:.1f}%), {dados['entradas']} entradas, {dados['bytes'] / 1024:.1f} KiB")
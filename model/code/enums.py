@@ -7,23 +7,94 @@ class Address(Enum):
     HOST = '0.0.0.0'
     PORT = 8002
 
+class Projection(Enum):
+    DIMENSIONS = 0 # Dimensão das embeddings após a projeção (ex.: 128 ou 256); 0 mantém as 512 dimensões
+    METHOD = 'random' # 'random' (matriz ortonormal gerada com SEED) ou 'pca' (ajustada com projection.py)
+    SEED = 5448
+    MATRIX_FILE = '/home/model/weights/projection_{dimensoes}.npy'
+
 class Adjustments(Enum):
-    DIMENSIONS = 512
+    EMBEDDING_DIMENSIONS = 512 # Saída do InceptionResnetV1
+
+    # Dimensão das embeddings enviadas ao circuito; deve coincidir com Circuit.DIMENSIONS em server/code/enums.py
+    DIMENSIONS = Projection.DIMENSIONS.value or EMBEDDING_DIMENSIONS
+
+    # Precisão de ponto fixo: embeddings e limiar são multiplicados por 2^FRACTIONAL_BITS (ex.: 16, 24 ou 32)
+    # Deve coincidir com Circuit.FRACTIONAL_BITS em server/code/enums.py (largura do comparador do circuito)
+    FRACTIONAL_BITS = 16
+    SCALE = 1 << FRACTIONAL_BITS
+
+    SIMILARITY_THRESHOLD = 0.7
+    THRESHOLD = round(SIMILARITY_THRESHOLD * SCALE) # Entrada pública threshold do circuito
+
+class Startup(Enum):
+    WEIGHTS_FILE = '/home/model/weights/inception_resnet_v1_vggface2.pt' # Pesos locais, lidos com mmap
+    READY_TIMEOUT = 300 # Tempo máximo (em segundos) que uma solicitação aguarda o modelo ficar pronto
+
+class Batching(Enum):
+    WINDOW = 0.010 # Tempo máximo (em segundos) de espera para agrupar solicitações em um lote
+    MAX_SIZE = 16 # Quantidade máxima de imagens por lote
+    PIPELINE_DEPTH = 4 # Lotes detectados aguardando a etapa de embedding
+    STATS_WINDOW = 1000 # Latências mantidas por tamanho de lote para o relatório
+    TIMEOUT = 60 # Tempo máximo (em segundos) de espera por uma embedding do micro-lote
+
+class Inference(Enum):
+    BACKEND = 'eager' # 'eager', 'torchscript', 'onnx' (requer onnxruntime), 'int8-dynamic' ou 'int8-static'
+    INTRA_OP_THREADS = 0 # 0 utiliza todos os núcleos disponíveis
+    INTEROP_THREADS = 1
+    CALIBRATION_BATCHES = 8 # Lotes sintéticos de calibração da quantização estática
+    ONNX_MODEL = '/home/model/weights/inception_resnet_v1.onnx'
+
+    # Portão de acurácia (ver validate_backend.py)
+    MAX_COSINE_DISTANCE = 0.01 # Distância de cosseno máxima entre as embeddings otimizada e eager
 
-    THRESHOLD = int(0.7 * 10) # Ajuste necessário, ver server/code/snarkjs/trusted_setup/input/cosine_similarity.circom
+class Preprocessing(Enum):
+    DETECTION_SIZE = 640 # Maior lado (em pixels) da imagem usada na detecção; 0 detecta na resolução original
+    CROP_SIZE = 1280 # Maior lado da imagem da qual a face é recortada; 0 recorta da resolução original
 
-    SCALE = 50_000_000_000_000_000_000_000_000_000
+class Cache(Enum):
+    MAX_ENTRIES = 1024 # Embeddings mantidas no cache; 0 desativa o cache
+    MAX_BYTES = 4 * 1024 * 1024 # Memória máxima ocupada pelas embeddings em cache
+    TTL = 300 # Tempo (em segundos) que uma embedding permanece no cache após ser calculada
+
+class Prefetch(Enum):
+    TTL = 60 # Tempo (em segundos) que uma embedding preparada para a autenticação aguarda a solicitação de prova
+    WAIT_TIMEOUT = 60 # Tempo máximo (em segundos) que a prova aguarda uma embedding ainda em cálculo
+
+class Replicas(Enum):
+    PROCESSES = 0 # Processos de réplica do pipeline facial; 0 executa o micro-batching no próprio processo
+    THREADS_PER_PROCESS = 0 # 0 utiliza uma thread intra-op por núcleo reservado à réplica
+    TIMEOUT = 60 # Tempo máximo (em segundos) de espera por uma réplica
+    HEALTH_INTERVAL = 1 # Intervalo (em segundos) entre as verificações das réplicas encerradas
+
+class Prover(Enum):
+    MODE = 'daemon' # 'daemon' (provers Node persistentes) ou 'script' (generate_proof.sh a cada prova)
+    WORKERS = 0 # Provas simultâneas (processos prover persistentes); 0 utiliza um por núcleo disponível
+    DAEMON_SCRIPT = '/home/model/snarkjs/prover/prover.js'
+    TIMEOUT = 120 # Tempo máximo (em segundos) de resposta de um prover; esgotado, o processo é reiniciado
+
+class Witness(Enum):
+    MODE = 'native' # 'native' (witness calculada em Python) ou 'wasm' (circuit.wasm no snarkjs)
+
+class FailFast(Enum):
+    MODE = 'circuit' # 'circuit' (rejeita sem gerar a prova quando o circuito daria result = 0) ou 'off'
+    MARGIN = 0.1 # Rejeita apenas se a similaridade de cossenos estiver abaixo do limiar por esta margem
+
+class Workspace(Enum):
+    ROOT = '/dev/shm' # Áreas de trabalho das provas em tmpfs (usa o diretório temporário padrão se indisponível)
 
 class SnarkPath(Enum):
     # === DIRETÓRIOS === #
     PROOF_GENERATION_DIR = '/home/model/snarkjs/proof_generation/'
     PROOF_GENERATION_INPUTS = PROOF_GENERATION_DIR + 'inputs/'
     PROOF_GENERATION_OUTPUTS = PROOF_GENERATION_DIR + 'outputs/'
+    ARTIFACTS_DIR = '/home/model/snarkjs/artifacts/'
 
     # === ENTRADAS === #
     WITNESS =  PROOF_GENERATION_INPUTS + 'input.json'
     PROVING_KEY = PROOF_GENERATION_INPUTS + 'proving_key.zkey'
     CIRCUIT = PROOF_GENERATION_INPUTS + 'circuit.wasm'
+    SYMBOLS = PROOF_GENERATION_INPUTS + 'circuit.sym'
 
     #  === SCRIPT === #
     GENERATE_PROOF_SCRIPT = '/bin/bash ' + PROOF_GENERATION_DIR + 'generate_proof.sh'
@@ -36,3 +107,6 @@ class Benchmark:
     EMBEDDING_GENERATION = 0
     PROOF_GENERATION = 0
 
+
+class Tracing(Enum):
+    FILE = '' # Spans no formato Trace Event (JSON), reunidos com user/code/merge_traces.py (ex.: '/home/model/traces/model.json'); vazio desativa. O arquivo cresce sem limite enquanto ativo
@@ -0,0 +1,73 @@
+import threading
+
+from enums import Adjustments, FailFast
+from witness import resultado_circuito
+
+
+def similaridade_cosseno(embedding1, embedding2):
+    """Similaridade de cossenos calculada sobre as embeddings escaladas (inteiros)"""
+    produto = sum(a * b for a, b in zip(embedding1, embedding2))
+    normas = sum(a * a for a in embedding1) * sum(b * b for b in embedding2)
+    if normas == 0:
+        return 0.0
+    return produto / normas ** 0.5
+
+
+class RejeicaoAntecipada(Exception):
+    """As faces não correspondem: a prova codificaria apenas result = 0"""
+
+
+class SimilarityCheck:
+    """Verificação em texto claro, antes da prova, da decisão que o circuito tomaria
+
+    A decisão é calculada com a mesma aritmética do circuito (corpo finito da BN254); a
+    solicitação só é rejeitada quando o circuito produziria result = 0 (ou não teria witness)
+    e a similaridade de cossenos está abaixo do limiar pela margem configurada.
+    """
+
+    def __init__(self, modo=None, margem=None):
+        self.modo = modo or FailFast.MODE.value
+        self.margem = FailFast.MARGIN.value if margem is None else margem
+
+        self.trava = threading.Lock()
+        self.verificacoes = 0
+        self.rejeicoes = 0
+
+    @property
+    def ativo(self):
+        return self.modo == 'circuit'
+
+    def rejeitaria(self, embedding1, embedding2, threshold, bits=None):
+        try:
+            resultado = resultado_circuito(embedding1, embedding2, threshold, bits)
+        except ValueError:
+            # Sem witness válida, a prova não poderia ser gerada
+            resultado = 0
+
+        limiar = threshold / Adjustments.SCALE.value
+        return resultado == 0 and similaridade_cosseno(embedding1, embedding2) < limiar - self.margem
+
+    def verificar(self, embedding1, embedding2, threshold, bits=None):
+        """Levanta RejeicaoAntecipada para correspondências claramente negativas"""
+        self.verificar_templates([embedding1], embedding2, threshold, bits)
+
+    def verificar_templates(self, templates, embedding, threshold, bits=None):
+        """Rejeita apenas quando a embedding claramente não corresponde a nenhum dos templates"""
+        if not self.ativo:
+            return
+
+        rejeitar = all(self.rejeitaria(template, embedding, threshold, bits) for template in templates)
+
+        with self.trava:
+            self.verificacoes += 1
+            self.rejeicoes += rejeitar
+
+        if rejeitar:
+            raise RejeicaoAntecipada("Faces não correspondem (rejeitado antes da geração da prova)")
+
+    def relatorio(self):
+        with self.trava:
+            return {
+                'verificacoes': self.verificacoes,
+                'rejeicoes': self.rejeicoes
+            }
@@ -0,0 +1,183 @@
+import io
+import os
+import copy
+import importlib.util
+
+import torch
+from enums import Color, Inference
+
+
+BACKENDS = ['eager', 'torchscript', 'onnx', 'int8-dynamic', 'int8-static']
+
+
+def configurar_threads():
+    """Ajusta os pools de threads intra-op e inter-op do Torch"""
+    intra_op = Inference.INTRA_OP_THREADS.value or os.cpu_count() or 1
+    torch.set_num_threads(intra_op)
+
+    # O pool inter-op só pode ser ajustado antes do primeiro trabalho paralelo
+    try:
+        torch.set_num_interop_threads(Inference.INTEROP_THREADS.value)
+    except RuntimeError:
+        pass
+
+    print(Color.RED.value + f" Threads do Torch - Intra-op: {torch.get_num_threads()}, Inter-op: {torch.get_num_interop_threads()}")
+
+
+def exemplo_entrada(tamanho_lote=1):
+    """Lote de entrada no formato das faces pós-processadas pelo MTCNN"""
+    return torch.randn(tamanho_lote, 3, 160, 160).clamp(-1, 1)
+
+
+class EagerBackend:
+    """Execução eager do InceptionResnetV1 (referência de acurácia)"""
+
+    nome = 'eager'
+
+    def __init__(self, resnet):
+        self.modelo = resnet
+
+    def __call__(self, lote):
+        with torch.inference_mode():
+            return self.modelo(lote)
+
+    def ajustar_threads(self, threads):
+        """Threads intra-op do processo de réplica (o Torch já as ajusta por processo)"""
+
+
+class TorchScriptBackend(EagerBackend):
+    """Grafo rastreado (torch.jit.trace), congelado e otimizado para inferência"""
+
+    nome = 'torchscript'
+
+    def __init__(self, resnet):
+        dispositivo = next(resnet.parameters()).device
+        with torch.inference_mode():
+            self.rastreado = torch.jit.trace(copy.deepcopy(resnet), exemplo_entrada().to(dispositivo))
+        self.otimizar()
+
+    def otimizar(self):
+        self.modelo = torch.jit.optimize_for_inference(torch.jit.freeze(self.rastreado.eval()))
+
+    def __getstate__(self):
+        # Grafos TorchScript não são serializáveis com pickle (réplicas recriadas pelo forkserver), e o grafo
+        # congelado não é recarregável: segue o grafo rastreado no formato do torch.jit, congelado de novo ao ser carregado
+        buffer = io.BytesIO()
+        torch.jit.save(self.rastreado, buffer)
+        return {'grafo': buffer.getvalue()}
+
+    def __setstate__(self, estado):
+        self.rastreado = torch.jit.load(io.BytesIO(estado['grafo']))
+        self.otimizar()
+
+
+class OnnxBackend:
+    """Grafo exportado em ONNX executado pelo ONNX Runtime (opcional)"""
+
+    nome = 'onnx'
+
+    def __init__(self, resnet):
+        # Sem o ONNX Runtime instalado, criar_backend recorre ao eager
+        if importlib.util.find_spec('onnxruntime') is None:
+            raise ImportError("No module named 'onnxruntime'")
+
+        caminho = Inference.ONNX_MODEL.value
+        if not os.path.exists(caminho):
+            print(Color.RED.value + f" Exportando grafo ONNX para {caminho}...")
+            torch.onnx.export(
+                copy.deepcopy(resnet).cpu(), exemplo_entrada(), caminho,
+                input_names=['faces'], output_names=['embeddings'],
+                dynamic_axes={'faces': {0: 'lote'}, 'embeddings': {0: 'lote'}}
+            )
+
+        self.caminho = caminho
+        self.threads = Inference.INTRA_OP_THREADS.value or os.cpu_count() or 1
+
+        # A sessão (e o seu pool de threads) é criada no primeiro uso, no processo que executa a inferência
+        self.sessao = None
+
+    def criar_sessao(self):
+        import onnxruntime
+
+        opcoes = onnxruntime.SessionOptions()
+        opcoes.intra_op_num_threads = self.threads
+        opcoes.inter_op_num_threads = Inference.INTEROP_THREADS.value
+        opcoes.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return onnxruntime.InferenceSession(self.caminho, opcoes, providers=['CPUExecutionProvider'])
+
+    def __call__(self, lote):
+        if self.sessao is None:
+            self.sessao = self.criar_sessao()
+        saida = self.sessao.run(None, {'faces': lote.cpu().numpy()})[0]
+        return torch.from_numpy(saida)
+
+    def ajustar_threads(self, threads):
+        self.threads = threads
+        self.sessao = None
+
+
+class DynamicInt8Backend(EagerBackend):
+    """Quantização dinâmica int8 das camadas lineares"""
+
+    nome = 'int8-dynamic'
+
+    def __init__(self, resnet):
+        self.modelo = torch.ao.quantization.quantize_dynamic(
+            copy.deepcopy(resnet), {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+
+class StaticInt8Backend(EagerBackend):
+    """Quantização estática int8 (FX graph mode) calibrada com faces de amostra"""
+
+    nome = 'int8-static'
+
+    def __init__(self, resnet, amostras_calibracao=None):
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+        preparado = prepare_fx(
+            copy.deepcopy(resnet).cpu(),
+            get_default_qconfig_mapping('x86'),
+            (exemplo_entrada(),)
+        )
+
+        # Sem faces reais, a calibração usa entradas sintéticas no intervalo do MTCNN
+        if not amostras_calibracao:
+            amostras_calibracao = [exemplo_entrada(8) for _ in range(Inference.CALIBRATION_BATCHES.value)]
+
+        with torch.inference_mode():
+            for lote in amostras_calibracao:
+                preparado(lote.cpu())
+
+        self.modelo = convert_fx(preparado)
+
+    def __call__(self, lote):
+        with torch.inference_mode():
+            return self.modelo(lote.cpu())
+
+
+def criar_backend(resnet, nome=None, amostras_calibracao=None):
+    """Instancia o backend de inferência selecionado, recorrendo ao eager em caso de falha"""
+    nome = nome or Inference.BACKEND.value
+
+    try:
+        if nome == 'torchscript':
+            backend = TorchScriptBackend(resnet)
+        elif nome == 'onnx':
+            backend = OnnxBackend(resnet)
+        elif nome == 'int8-dynamic':
+            backend = DynamicInt8Backend(resnet)
+        elif nome == 'int8-static':
+            backend = StaticInt8Backend(resnet, amostras_calibracao)
+        else:
+            backend = EagerBackend(resnet)
+    except ImportError as e:
+        print(Color.RED.value + f"⚠️ Backend {nome} indisponível ({e}), usando eager")
+        backend = EagerBackend(resnet)
+    except Exception as e:
+        print(Color.RED.value + f"❌ Erro ao preparar backend {nome}: {e}, usando eager")
+        backend = EagerBackend(resnet)
+
+    print(Color.RED.value + f" Backend de inferência: {backend.nome}")
+    return backend
@@ -1,6 +1,13 @@
+import time
+
+inicio = time.perf_counter()
+
+# Torch, facenet_pytorch e demais dependências do modelo
 from model import Model
 
 
 if __name__ == "__main__":
-    model = Model()
-    model.executar()
\ No newline at end of file
+    # O socket é aberto antes de carregar os modelos (ver Model.executar)
+    model = Model(carregar=False)
+    model.fases.registrar('importacao', time.perf_counter() - inicio)
+    model.executar()
@@ -2,34 +2,128 @@ import time
 import json
 import socket
 import threading
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 import base64
-from PIL import Image
-from io import BytesIO
 
 import torch
-from enums import Address, Adjustments, Benchmark, Color, SnarkPath
-from facenet_pytorch import MTCNN, InceptionResnetV1
+from enums import Address, Adjustments, Batching, Benchmark, Color, Prover, Replicas, Startup, Witness
+from facenet_pytorch import MTCNN
+
+from artifacts import ArtifactStore, hash_conteudo, identificador_artefato
+from batching import MicroBatcher
+from cache import EmbeddingCache
+from failfast import RejeicaoAntecipada, SimilarityCheck
+from inference import EagerBackend, configurar_threads, criar_backend
+from multitemplate import preparar_templates
+from pipeline import FacePipeline
+from prefetch import PreparedEmbeddings
+from preprocessing import preparar_imagem
+from projection import carregar_projecao
+from protocol import decodificar
+from prover import ProverPool, executar_script_prova, quantidade_provers
+from quantization import quantizar
+from replicas import ReplicaPool
+from startup import StartupPhases, carregar_resnet
+from tracing import Tracer, rastreado
+from witness import WitnessGenerator
 
 
 class Model:
-    def __init__(self):
+    def __init__(self, carregar=True):
 
         print("\n" + "=" * 60)
         print(Color.RED.value + " INICIALIZANDO MODELO DE IA")
         print("=" * 60)
 
+        # Duração de cada fase da inicialização e componentes já disponíveis
+        self.fases = StartupPhases(['detector', 'embedder', 'provers', 'warmup'])
+        self.pronto = threading.Event()
+
         # Configurações de rede
         self.host = Address.HOST.value
         self.port = Address.PORT.value
 
+        # Identificador de correlação da solicitação atendida por cada thread
+        self.contexto = threading.local()
+
+        # Spans das solicitações atendidas, no contexto de rastreamento recebido em cada mensagem
+        self.rastreamento = Tracer('modelo', prefixo=Color.RED.value)
+
+        # Pool de processos de réplica (apenas em CPU, pois o fork não é compatível com CUDA)
+        self.usar_replicas = Replicas.PROCESSES.value > 0
+
         # Configuração do dispositivo (GPU ou CPU)
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.device = 'cuda' if torch.cuda.is_available() and not self.usar_replicas else 'cpu'
+
+        # Ajuste das threads do Torch para inferência em CPU (as réplicas ajustam as próprias)
+        if not self.usar_replicas:
+            configurar_threads()
+
+        # Componentes de IA, criados em carregar_componentes()
+        self.mtcnn = None
+        self.resnet = None
+        self.gerador_embeddings = None
+
+        # Cache das embeddings de imagens reenviadas (limitado em entradas, memória e tempo)
+        self.cache = EmbeddingCache()
+
+        # Embeddings das fotos de autenticação enviadas antes da solicitação de prova
+        self.embeddings_preparadas = PreparedEmbeddings()
         
-        # Detector de faces MTCNN
+        # Projeção opcional das embeddings para menos dimensões (circuito menor)
+        self.projecao = carregar_projecao()
+
+        # Limiar de similaridade para correspondência facial
+        self.limiar_similaridade = Adjustments.THRESHOLD.value
+
+        # Provers persistentes com a proving key e o circuito pré-carregados
+        self.provers = ProverPool() if Prover.MODE.value == 'daemon' else None
+        self.limite_script = threading.BoundedSemaphore(quantidade_provers())
+
+        # Rejeição antecipada de correspondências claramente negativas, sem gerar a prova
+        self.verificacao_similaridade = SimilarityCheck()
+
+        # Arquivos do trusted setup endereçados pelo hash do conteúdo
+        self.artefatos = ArtifactStore()
+
+        # Geradores de witness nativos, indexados pelo hash dos artefatos do trusted setup
+        self.geradores_witness = {}
+
+        if carregar:
+            self.carregar_componentes()
+
+    def carregar_componentes(self):
+        """Cria o detector e o extrator de características em paralelo"""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            detector = executor.submit(self.carregar_componente, 'detector', self.criar_detector)
+            embedder = executor.submit(self.carregar_componente, 'embedder', carregar_resnet, self.device)
+            self.mtcnn = detector.result()
+            self.resnet = embedder.result()
+
+        with self.fases.medir('backend'):
+            # Backend de inferência selecionado (eager, grafo exportado ou quantizado)
+            # Com réplicas, nenhuma inferência roda no processo principal antes do fork
+            self.backend = EagerBackend(self.resnet) if self.usar_replicas else criar_backend(self.resnet)
+
+        # Micro-batching das solicitações de embedding concorrentes
+        self.pipeline = FacePipeline(self.mtcnn, self.backend, self.device)
+        self.batcher = MicroBatcher(self.pipeline)
+
+        # Réplicas compartilham os pesos carregados acima e recebem o trabalho deste processo
+        self.replicas = ReplicaPool(self.mtcnn, self.resnet) if self.usar_replicas else None
+        self.gerador_embeddings = self.replicas or self.batcher
+
+    def carregar_componente(self, nome, funcao, *argumentos):
+        with self.fases.medir(nome):
+            componente = funcao(*argumentos)
+        self.fases.concluir(nome)
+        return componente
+
+    def criar_detector(self):
+        """Detector de faces MTCNN"""
         print(Color.RED.value + " Carregando detector de faces MTCNN...")
-        self.mtcnn = MTCNN(
+        return MTCNN(
             image_size=160, 
             margin=20, 
             min_face_size=20,
@@ -38,34 +132,81 @@ class Model:
             keep_all=False,
             device=self.device
         )
-        
-        # Modelo InceptionResnetV1 pré-treinado no VGGFace2
-        print(Color.RED.value + " Carregando modelo de extração de características faciais...")
-        self.resnet = InceptionResnetV1(pretrained='vggface2').eval().to(self.device)
-        
-        # Limiar de similaridade para correspondência facial
-        self.limiar_similaridade = Adjustments.THRESHOLD.value
 
     def executar(self):
         """Método principal que inicia o serviço do modelo"""
-        
-        # Inicia servidor para receber mensagens
-        self.iniciar_servidor()
-    
-    def iniciar_servidor(self):
-        """Inicia servidor TCP para receber mensagens de outros serviços"""
+
+        # As réplicas são criadas por fork antes de qualquer outra thread: travas mantidas por threads
+        # em execução ficariam presas nos processos filhos. O carregamento dos modelos, nesse caso,
+        # não se sobrepõe à abertura do socket e à inicialização dos provers
+        if self.usar_replicas:
+            self.iniciar_geracao_embeddings()
+
+        # O socket é aberto antes do carregamento dos modelos; as solicitações aguardam a prontidão
+        with self.fases.medir('socket'):
+            servidor = self.abrir_socket()
+        threading.Thread(target=self.iniciar_servidor, args=(servidor,), daemon=True).start()
+
+        # Os provers (processos Node) iniciam em paralelo com o carregamento dos modelos
+        provers = threading.Thread(target=self.iniciar_provers)
+        provers.start()
+
+        if not self.usar_replicas:
+            self.iniciar_geracao_embeddings()
+
+        self.cache.iniciar()
+        provers.join()
+
+        self.pronto.set()
+        print("=" * 60)
+        print(Color.RED.value + " MODELO DE IA INICIALIZADO COM SUCESSO")
+        print("=" * 60 + "\n")
+        self.fases.imprimir_relatorio()
+
+        # Mantém o serviço rodando
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                s.bind((self.host, self.port))
-                s.listen(5)
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n" + Color.RED.value + " Encerrando serviço do modelo...")
 
-                print(Color.RED.value + f" Servidor escutando em {self.host}:{self.port}")
+    def iniciar_geracao_embeddings(self):
+        """Carrega os modelos (se ainda não carregados) e inicia as réplicas ou o micro-batching"""
+        # Modelo de extração de características faciais (pesos mapeados de arquivo local)
+        if self.gerador_embeddings is None:
+            print(Color.RED.value + " Carregando modelo de extração de características faciais...")
+            self.carregar_componentes()
 
-                print("=" * 60)
-                print(Color.RED.value + " MODELO DE IA INICIALIZADO COM SUCESSO")
-                print("=" * 60 + "\n")
-                
+        # Inicia as réplicas ou as etapas de detecção e de embedding em lote
+        with self.fases.medir('warmup'):
+            if self.usar_replicas:
+                # Cada réplica executa o próprio aquecimento antes de atender solicitações
+                self.replicas.iniciar()
+            else:
+                self.pipeline.aquecer()
+                self.batcher.iniciar()
+        self.fases.concluir('warmup')
+
+    def iniciar_provers(self):
+        with self.fases.medir('provers'):
+            if self.provers:
+                self.provers.iniciar()
+        self.fases.concluir('provers')
+
+    def abrir_socket(self):
+        """Cria o socket de escuta do serviço"""
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind((self.host, self.port))
+        s.listen(5)
+
+        print(Color.RED.value + f" Servidor escutando em {self.host}:{self.port}")
+        return s
+    
+    def iniciar_servidor(self, servidor):
+        """Atende as conexões de outros serviços"""
+        try:
+            with servidor as s:
                 while True:
                     try:
                         conn, addr = s.accept()
@@ -74,16 +215,21 @@ class Model:
                         thread.start()
                     except Exception as e:
                         print(Color.RED.value + f"❌ Erro no servidor: {e}")
-        except KeyboardInterrupt:
-            print("\n" + Color.RED.value + " Encerrando serviço do modelo...")
         except Exception as e:
             print(Color.RED.value + f"❌ Erro crítico no servidor: {e}")
+
+    def aguardar_pronto(self):
+        """Aguarda o carregamento e o aquecimento dos modelos"""
+        if not self.pronto.is_set():
+            print(Color.RED.value + " Aguardando o modelo ficar pronto...")
+        return self.pronto.wait(Startup.READY_TIMEOUT.value)
     
     def processar_cliente(self, conn, addr):
         """Processa mensagens recebidas de outros serviços"""
         try:
             with conn:
                 # Recebe dados em chunks para mensagens grandes
+                inicio = time.time()
                 dados_completos = b''
                 while True:
                     chunk = conn.recv(4096)
@@ -94,10 +240,14 @@ class Model:
                 if dados_completos:
                     print(Color.RED.value + f" Mensagem recebida de {addr} - Tamanho: {len(dados_completos)} bytes")
                     
-                    # Converte dados recebidos para JSON
-                    mensagem = json.loads(dados_completos.decode())
+                    # Converte dados recebidos (JSON, ou JSON com anexos binários) para a mensagem
+                    mensagem = decodificar(dados_completos)
                     tipo_mensagem = mensagem.get('type', 'desconhecido')
                     print(Color.RED.value + f" Tipo da mensagem: {tipo_mensagem}")
+
+                    self.rastreamento.fechar(self.rastreamento.abrir(
+                        'receber', pai=mensagem.get('trace'), inicio=inicio, tipo=tipo_mensagem, bytes=len(dados_completos)
+                    ))
                     
                     # Processa mensagem baseada no tipo
                     self.processar_mensagem(mensagem)
@@ -108,19 +258,53 @@ class Model:
             print(Color.RED.value + f"❌ Erro ao processar cliente: {e}")
     
     def processar_mensagem(self, mensagem):
-        """Roteia mensagens baseado no tipo"""
+        """Atende a mensagem no contexto de correlação e de rastreamento recebido"""
         tipo_mensagem = mensagem.get('type')
         dados = mensagem.get('data')
         endereco_retorno = mensagem.get('return_to')
-        
-        if tipo_mensagem == 'generate_embedding':
+
+        # As respostas enviadas por esta thread repetem o identificador de correlação da solicitação
+        self.contexto.correlacao = mensagem.get('correlation_id')
+
+        # Os spans desta solicitação são filhos do span de origem informado na mensagem
+        self.rastreamento.definir_contexto(mensagem.get('trace'))
+        with self.rastreamento.span(tipo_mensagem or 'desconhecido'):
+            self.rotear_mensagem(tipo_mensagem, dados, endereco_retorno)
+
+    def rotear_mensagem(self, tipo_mensagem, dados, endereco_retorno):
+        """Roteia mensagens baseado no tipo"""
+        if tipo_mensagem in ('generate_embedding', 'generate_embeddings', 'prepare_embedding', 'generate_snark_proof') and not self.aguardar_pronto():
+            self.enviar_resposta(endereco_retorno, {
+                'type': 'snark_proof_error' if tipo_mensagem == 'generate_snark_proof' else 'embedding_error',
+                'data': {
+                    'error': 'Modelo de IA ainda não está pronto'
+                }
+            })
+        elif tipo_mensagem == 'generate_embedding':
             self.processar_solicitacao_embedding(dados, endereco_retorno)
+        elif tipo_mensagem == 'generate_embeddings':
+            self.processar_solicitacao_embeddings_lote(dados, endereco_retorno)
+        elif tipo_mensagem == 'prepare_embedding':
+            self.processar_preparacao_embedding(dados, endereco_retorno)
         elif tipo_mensagem == 'generate_snark_proof':
             self.processar_solicitacao_prova_snark(dados, endereco_retorno)
+        elif tipo_mensagem == 'get_status':
+            self.enviar_resposta(endereco_retorno, {
+                'type': 'status',
+                'data': dict(self.fases.relatorio(), ready=self.pronto.is_set())
+            })
+        elif tipo_mensagem == 'get_metrics':
+            self.enviar_resposta(endereco_retorno, {
+                'type': 'metrics',
+                'data': {
+                    'embedding_cache': self.cache.relatorio(),
+                    'fail_fast': self.verificacao_similaridade.relatorio()
+                }
+            })
         else:
             print(Color.RED.value + f"⚠️ Tipo de mensagem desconhecido: {tipo_mensagem}")
     
-    def processar_solicitacao_embedding(self, foto_base64, endereco_retorno):
+    def processar_solicitacao_embedding(self, foto, endereco_retorno):
         """Processa solicitação de geração de embedding (fase de registro)"""
         print("\n" + "=" * 60)
         print(Color.RED.value + " INICIANDO FASE DE REGISTRO")
@@ -131,7 +315,7 @@ class Model:
         Benchmark.EMBEDDING_GENERATION = time.time()
 
         # Gera embedding da foto
-        embedding = self.gerar_embedding(foto_base64)
+        embedding = self.gerar_embedding(foto)
 
         # Calcula tempo de geração de embedding
         Benchmark.EMBEDDING_GENERATION = time.time() - Benchmark.EMBEDDING_GENERATION
@@ -144,7 +328,8 @@ class Model:
             # Envia embedding de volta para o usuário
             self.enviar_resposta(endereco_retorno, {
                 'type': 'embedding',
-                'data': embedding
+                'data': embedding,
+                'projection': self.hash_projecao()
             })
         else:
             print(Color.RED.value + "❌ Falha ao gerar embedding")
@@ -160,6 +345,58 @@ class Model:
                 }
             })
     
+    def processar_solicitacao_embeddings_lote(self, fotos, endereco_retorno):
+        """Gera as embeddings de um lote de fotos (registro em lote)
+
+        As fotos são decodificadas em paralelo e chegam juntas ao micro-batching, que as agrupa
+        em lotes de detecção e de embedding; a resposta segue a ordem das fotos (None sem face).
+        """
+        print(Color.RED.value + f" Gerando embeddings de um lote de {len(fotos)} foto(s)...")
+
+        # As threads do executor continuam o rastro da solicitação
+        rastro = self.rastreamento.contexto_atual()
+
+        def gerar(foto):
+            self.rastreamento.definir_contexto(rastro)
+            return self.gerar_embedding(foto)
+
+        inicio = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, min(len(fotos), Batching.MAX_SIZE.value))) as executor:
+            embeddings = list(executor.map(gerar, fotos))
+
+        geradas = sum(1 for embedding in embeddings if embedding is not None)
+        print(Color.RED.value + f" {geradas}/{len(embeddings)} embedding(s) gerada(s) em {time.time() - inicio:.2f} s")
+
+        self.enviar_resposta(endereco_retorno, {
+            'type': 'embeddings',
+            'data': embeddings,
+            'projection': self.hash_projecao()
+        })
+
+    def processar_preparacao_embedding(self, dados, endereco_retorno):
+        """Calcula a embedding da foto de autenticação enquanto o usuário busca os templates no servidor"""
+        print(Color.RED.value + " Preparando embedding da foto de autenticação...")
+
+        referencia = dados['ref']
+        self.embeddings_preparadas.iniciar(referencia)
+
+        Benchmark.EMBEDDING_GENERATION = time.time()
+        embedding = None
+        try:
+            embedding = self.gerar_embedding(dados['image'])
+        finally:
+            # Libera a solicitação de prova que já estiver aguardando, mesmo sem face detectada
+            self.embeddings_preparadas.concluir(referencia, embedding)
+        Benchmark.EMBEDDING_GENERATION = time.time() - Benchmark.EMBEDDING_GENERATION
+
+        # Permite ao usuário encerrar a autenticação sem face antes de solicitar a prova
+        self.enviar_resposta(endereco_retorno, {
+            'type': 'prepared_embedding',
+            'data': {
+                'ready': embedding is not None
+            }
+        })
+
     def processar_solicitacao_prova_snark(self, dados, endereco_retorno):
         """Processa solicitação de geração de prova zk-SNARK (fase de autenticação)"""
         print("\n" + "=" * 60)
@@ -167,11 +404,88 @@ class Model:
         print("=" * 60)
         print(Color.RED.value + " Gerando prova zk-SNARK...")
         
+        # Os arquivos do trusted setup chegam apenas como hashes; os ausentes são solicitados
+        try:
+            faltantes = self.verificar_artefatos(dados)
+        except ValueError as e:
+            print(Color.RED.value + f"❌ Arquivos do trusted setup inválidos: {e}")
+            self.enviar_resposta(endereco_retorno, {
+                'type': 'snark_proof_error',
+                'data': {
+                    'error': f'Arquivos do trusted setup inválidos: {e}'
+                }
+            })
+            return
+
+        # Templates gerados com outra matriz de projeção não são comparáveis com a embedding nova
+        try:
+            self.verificar_projecao(dados)
+        except ValueError as e:
+            print(Color.RED.value + f"❌ {e}")
+            self.enviar_resposta(endereco_retorno, {
+                'type': 'snark_proof_error',
+                'data': {
+                    'error': str(e)
+                }
+            })
+            return
+
+        if faltantes:
+            print(Color.RED.value + f" Solicitando {len(faltantes)} arquivo(s) do trusted setup ausente(s)...")
+            self.enviar_resposta(endereco_retorno, {
+                'type': 'missing_artifacts',
+                'data': {
+                    'hashes': faltantes
+                }
+            })
+            return
+
+        # Foto enviada antes, em 'prepare_embedding': aguarda a embedding se ainda estiver em cálculo
+        embedding_nova = None
+        if 'new_image' not in dados:
+            try:
+                with self.rastreamento.span('aguardar_embedding_preparada'):
+                    embedding_nova = self.embeddings_preparadas.obter(dados['new_image_ref'])
+            except KeyError:
+                print(Color.RED.value + " Embedding preparada não encontrada, solicitando a foto de autenticação...")
+                self.enviar_resposta(endereco_retorno, {
+                    'type': 'missing_image',
+                    'data': {
+                        'ref': dados.get('new_image_ref')
+                    }
+                })
+                return
+
+            if embedding_nova is None:
+                print(Color.RED.value + "❌ Não foi possível extrair embedding da nova foto")
+                self.enviar_resposta(endereco_retorno, {
+                    'type': 'snark_proof_error',
+                    'data': {
+                        'error': 'Nenhuma face detectada na foto de autenticação'
+                    }
+                })
+                return
+
         # Inicia cronômetro para calcular tempo de geração de prova
         Benchmark.PROOF_GENERATION = time.time()
 
         # Gera prova zk-SNARK
-        dados_prova = self.gerar_prova_snark(dados)
+        try:
+            dados_prova = self.gerar_prova_snark(dados, embedding_nova)
+        except RejeicaoAntecipada as e:
+            print(Color.RED.value + f"❌ {e}")
+            print("=" * 60)
+            print(Color.RED.value + " FASE DE AUTENTICAÇÃO FALHOU")
+            print("=" * 60)
+
+            self.enviar_resposta(endereco_retorno, {
+                'type': 'snark_proof_error',
+                'data': {
+                    'error': str(e),
+                    'rejected': True
+                }
+            })
+            return
         
         # Calcula tempo de geração de prova
         Benchmark.PROOF_GENERATION = time.time() - Benchmark.PROOF_GENERATION
@@ -183,6 +497,7 @@ class Model:
             
             print(Color.RED.value + f" TEMPO DE GERAÇÂO DE EMBEDDINGS: {Benchmark.EMBEDDING_GENERATION:.2f} SEGUNDOS")
             print(Color.RED.value + f" TEMPO DE GERAÇÂO DE PROVA: {Benchmark.PROOF_GENERATION:.2f} SEGUNDOS" + "\n")
+            self.cache.imprimir_relatorio()
 
             # Envia prova de volta para o usuário
             self.enviar_resposta(endereco_retorno, {
@@ -206,36 +521,44 @@ class Model:
                 }
             })
     
-    def gerar_embedding(self, foto_base64):
-        """Gera embedding biométrica a partir da foto em base64"""
+    @rastreado('gerar_embedding')
+    def gerar_embedding(self, foto):
+        """Gera embedding biométrica a partir da foto (bytes da imagem, ou base64 de clientes anteriores)"""
         try:
-            print(Color.RED.value + " Decodificando imagem base64...")
-            
-            # Decodifica imagem base64
-            dados_imagem = base64.b64decode(foto_base64)
-            imagem = Image.open(BytesIO(dados_imagem))
-            
-            print(Color.RED.value + " Detectando face na imagem...")
-            
-            # Detecta e extrai face da imagem
-            face = self.mtcnn(imagem)
-            
-            if face is None:
-                print(Color.RED.value + "❌ Nenhuma face detectada na imagem")
-                return None
+            # Os bytes chegam como anexo binário; o base64 é decodificado apenas para clientes anteriores
+            dados_imagem = foto if isinstance(foto, bytes) else base64.b64decode(foto)
 
-            print(Color.RED.value + " Extraindo características faciais...")
-            
-            # Gera embedding facial usando o modelo InceptionResnetV1
-            with torch.no_grad():
-                embedding = self.resnet(face.unsqueeze(0).to(self.device))
-            
-            # Converte tensor para lista para serialização JSON
-            embedding_list = embedding.squeeze().cpu().numpy().tolist()
+            # Imagens reenviadas reaproveitam a embedding já calculada
+            chave = self.cache.chave(dados_imagem)
+            embedding = self.cache.obter(chave)
+
+            if embedding is not None:
+                print(Color.RED.value + " Embedding encontrada no cache")
+                embedding = torch.from_numpy(embedding)
+            else:
+                # Decodifica em resolução reduzida para a detecção, mantendo uma versão maior para o recorte
+                with self.rastreamento.span('decodificar_imagem', bytes=len(dados_imagem)):
+                    imagem = preparar_imagem(dados_imagem)
+                
+                print(Color.RED.value + " Detectando face e extraindo características faciais em micro-lote...")
+                
+                # Detecta a face (MTCNN) e gera a embedding (ResNet) junto com as demais solicitações concorrentes;
+                # os lotes de cada etapa que processaram a imagem são registrados como spans filhos
+                etapas = {}
+                with self.rastreamento.span('mtcnn_resnet'):
+                    embedding = self.gerador_embeddings.gerar(imagem, etapas=etapas)
+                    for nome, (inicio, fim, lote) in etapas.items():
+                        self.rastreamento.registrar(nome, inicio, fim, lote=lote)
+                
+                if embedding is None:
+                    print(Color.RED.value + "❌ Nenhuma face detectada na imagem")
+                    return None
 
+                # Cópia própria: a embedding pode ser uma visão do tensor do lote inteiro
+                self.cache.armazenar(chave, embedding.numpy().copy())
+            
             # Ajusta o vetor para ser aceito pelo circom
-            for i in range(Adjustments.DIMENSIONS.value):
-                embedding_list[i] = int(embedding_list[i] * Adjustments.SCALE.value)
+            embedding_list = self.escalar_embedding(embedding)
             
             print(Color.RED.value + f" Embedding gerada - Dimensões: {len(embedding_list)}")
             return embedding_list
@@ -244,32 +567,90 @@ class Model:
             print(Color.RED.value + f"❌ Erro ao gerar embedding: {e}")
             return None
     
-    def gerar_prova_snark(self, dados_mensagem):
-        """Gera prova zk-SNARK para verificação de similaridade facial"""
+    def escalar_embedding(self, embedding):
+        """Converte o tensor da embedding em lista de inteiros de ponto fixo para o circom"""
+        vetor = embedding.numpy()
+        if self.projecao is not None:
+            vetor = self.projecao.aplicar(vetor)
+
+        # Quantização vetorizada; a lista de inteiros Python é serializável em JSON
+        return quantizar(vetor).tolist()
+
+    def hash_projecao(self):
+        """Hash da matriz de projeção das embeddings geradas aqui (None sem projeção)"""
+        return self.projecao.hash if self.projecao is not None else None
+
+    def verificar_projecao(self, dados_mensagem):
+        """Levanta ValueError se algum template foi registrado com outra matriz de projeção
+
+        O usuário envia, em 'template_projections', o hash registrado no envelope de cada template
+        (None para templates sem projeção); sem a lista, todos são tratados como sem projeção.
+        """
+        quantidade = len(dados_mensagem.get('old_embeddings') or [None])
+        projecoes = dados_mensagem.get('template_projections') or [None] * quantidade
+        esperado = self.hash_projecao()
+
+        divergentes = sum(1 for projecao in projecoes if projecao != esperado)
+        if divergentes:
+            raise ValueError(f"{divergentes} template(s) registrado(s) com outra projeção das embeddings "
+                             f"(esperada: {esperado[:12] if esperado else 'nenhuma'}) - registre-os novamente")
+
+    @rastreado('verificar_artefatos')
+    def verificar_artefatos(self, dados_mensagem):
+        """Grava os artefatos recebidos e retorna os hashes referenciados ainda ausentes
+
+        Levanta ValueError se as referências forem inválidas ou se os artefatos reenviados não
+        corresponderem aos hashes (eles não são solicitados de novo).
+        """
         try:
-            foto_nova_base64 = dados_mensagem['new_image']
-            embedding_antiga = dados_mensagem['old_embedding']
-            proving_key_b64 = dados_mensagem['proving_key']
-            circuit_wasm_b64 = dados_mensagem['circuit']
-            
-            print(Color.RED.value + " Salvando arquivos do trusted setup recebidos...")
-            
-            # Salva a chave de prova (proving_key.zkey)
-            proving_key_data = base64.b64decode(proving_key_b64)
-            with open(SnarkPath.PROVING_KEY.value, 'wb') as f:
-                f.write(proving_key_data)
-            print(Color.RED.value + f" Chave de prova salva em: {SnarkPath.PROVING_KEY.value}")
-            
-            # Salva o circuit.wasm (decodifica de base64)
-            circuit_wasm_data = base64.b64decode(circuit_wasm_b64)
-            with open(SnarkPath.CIRCUIT.value, 'wb') as f:
-                f.write(circuit_wasm_data)
-            print(Color.RED.value + f" Circuit WASM salvo em: {SnarkPath.CIRCUIT.value}")
-            
-            print(Color.RED.value + " Gerando embedding da nova foto...")
+            # Formato anterior: arquivos completos em base64 na própria mensagem
+            if 'artifacts' not in dados_mensagem:
+                dados_mensagem['artifacts'] = self.armazenar_artefatos_embutidos(dados_mensagem)
+
+            conteudos = dados_mensagem.pop('artifact_contents', None)
+            if conteudos:
+                self.artefatos.salvar_base64(conteudos)
+
+            faltantes = self.artefatos.faltantes(dados_mensagem['artifacts'].values())
+        except KeyError as e:
+            raise ValueError(f"Referência ausente: {e}") from e
+
+        # Os artefatos já foram enviados uma vez: não solicita de novo
+        if faltantes and conteudos is not None:
+            raise ValueError("Artefatos recebidos não correspondem aos hashes solicitados")
+        return faltantes
+
+    def armazenar_artefatos_embutidos(self, dados_mensagem):
+        """Grava os arquivos enviados por completo na mensagem e retorna as referências por hash"""
+        referencias = {}
+        for nome in ('proving_key', 'circuit', 'symbols'):
+            conteudo = dados_mensagem.pop(nome, None)
+            if conteudo is None:
+                continue
+            conteudo = conteudo.encode('utf-8') if nome == 'symbols' else base64.b64decode(conteudo)
+            referencias[nome] = hash_conteudo(conteudo)
+            self.artefatos.salvar(referencias[nome], conteudo)
+        return referencias
+
+    @rastreado('gerar_prova_snark')
+    def gerar_prova_snark(self, dados_mensagem, embedding_nova=None):
+        """Gera prova zk-SNARK para verificação de similaridade facial (com a embedding já preparada, se houver)"""
+        try:
+            referencias = dados_mensagem['artifacts']
+
+            # Templates registrados da identidade (formato anterior: uma única embedding)
+            registradas = dados_mensagem.get('old_embeddings') or [dados_mensagem['old_embedding']]
+
+            # Os arquivos do trusted setup já estão no armazenamento local
+            caminho_zkey = self.artefatos.caminho(referencias['proving_key'])
+            caminho_wasm = self.artefatos.caminho(referencias['circuit'])
+            artefato = identificador_artefato(referencias['proving_key'], referencias['circuit'])
             
-            # Gera nova embedding da foto atual
-            embedding_nova = self.gerar_embedding(foto_nova_base64)
+            if embedding_nova is None:
+                print(Color.RED.value + " Gerando embedding da nova foto...")
+
+                # Gera nova embedding da foto atual
+                embedding_nova = self.gerar_embedding(dados_mensagem['new_image'])
             
             if embedding_nova is None:
                 print(Color.RED.value + "❌ Não foi possível extrair embedding da nova foto")
@@ -277,53 +658,99 @@ class Model:
 
             print(Color.RED.value + " Preparando dados para geração da prova zk-SNARK...")
 
-            # Salva dados temporariamente para o script zk-SNARK
-            dados_witness = {
-                'embedding1': embedding_antiga,
-                'embedding2': embedding_nova,
-                'threshold': self.limiar_similaridade
-            }
-            
-            with open(SnarkPath.WITNESS.value, 'w') as arquivo:
-                json.dump(dados_witness, arquivo)
-            
-            print(Color.RED.value + " Executando script zk-SNARK...")
-
-            # Executa o script de geração da prova zk-SNARK
-            resultado = subprocess.run(
-                SnarkPath.GENERATE_PROOF_SCRIPT.value,
-                capture_output=True,
-                text=True,
-                shell=True
+            # A quantidade de templates do circuito é deduzida dos símbolos (0: um único template)
+            gerador = self.obter_gerador_witness(artefato, referencias.get('symbols'))
+            capacidade = gerador.templates if gerador else 0
+            templates = preparar_templates(registradas, embedding_nova, max(capacidade, 1))
+
+            if capacidade:
+                print(Color.RED.value + f" Comparando com {len(registradas)} template(s) em uma única prova (K = {capacidade})...")
+                dados_witness = {
+                    'templates': templates,
+                    'embedding': embedding_nova,
+                    'threshold': self.limiar_similaridade
+                }
+            else:
+                # Circuito de um único template: prova com o template mais semelhante
+                dados_witness = {
+                    'embedding1': templates[0],
+                    'embedding2': embedding_nova,
+                    'threshold': self.limiar_similaridade
+                }
+
+            # Não gasta o prover quando a prova codificaria apenas result = 0
+            self.verificacao_similaridade.verificar_templates(
+                templates, embedding_nova, self.limiar_similaridade, gerador.bits if gerador else None
             )
-            
-            if resultado.returncode != 0:
-                print(Color.RED.value + f"❌ Erro ao executar script SNARK: {resultado.stderr}")
-                return None
 
-            print(Color.RED.value + " Carregando arquivos da prova zk-SNARK...")
-            
-            # Carrega os arquivos gerados pelo script zk-SNARK
-            prova = self.carregar_arquivo_json(SnarkPath.PROOF.value)
-            parametros_publicos = self.carregar_arquivo_json(SnarkPath.PUBLIC_PARAMETERS.value)
+            # Witness calculada em Python, dispensando a execução do circuit.wasm
+            with self.rastreamento.span('witness'):
+                wtns = self.gerar_witness_nativa(gerador, dados_witness) if self.provers else None
+
+            # Prova no prover persistente (ou no script), registrada como um único span
+            with self.rastreamento.span('prova'):
+                if wtns is not None:
+                    print(Color.RED.value + " Enviando witness ao prover persistente...")
+                    prova, parametros_publicos = self.provers.provar_witness(
+                        artefato,
+                        caminho_zkey,
+                        caminho_wasm,
+                        wtns
+                    )
+                elif self.provers:
+                    print(Color.RED.value + " Enviando dados ao prover persistente...")
+
+                    # O prover já mantém a proving key e o circuito carregados em memória
+                    prova, parametros_publicos = self.provers.provar(
+                        artefato,
+                        caminho_zkey,
+                        caminho_wasm,
+                        dados_witness
+                    )
+                else:
+                    # Limita as execuções simultâneas do script à quantidade de núcleos
+                    with self.limite_script:
+                        prova, parametros_publicos = executar_script_prova(caminho_zkey, caminho_wasm, dados_witness)
+                    if prova is None:
+                        return None
 
             print(Color.RED.value + " ✅ Prova zk-SNARK gerada com sucesso")
             return (prova, parametros_publicos)
             
+        except RejeicaoAntecipada:
+            raise
         except Exception as e:
             print(Color.RED.value + f"❌ Erro ao gerar prova zk-SNARK: {e}")
             return None
     
-    def carregar_arquivo_json(self, caminho_arquivo):
-        """Carrega e retorna conteúdo de arquivo JSON"""
+    def obter_gerador_witness(self, artefato, hash_simbolos):
+        """Gerador de witness do circuito, criado a partir dos símbolos; None se indisponível"""
+        if not hash_simbolos:
+            return None
+
         try:
-            with open(caminho_arquivo, 'r') as arquivo:
-                conteudo = json.load(arquivo)
-            return conteudo
-        except Exception as e:
-            print(Color.RED.value + f"❌ Erro ao carregar arquivo {caminho_arquivo}: {e}")
+            if artefato not in self.geradores_witness:
+                simbolos = self.artefatos.ler(hash_simbolos).decode('utf-8')
+                self.geradores_witness[artefato] = WitnessGenerator(simbolos)
+            return self.geradores_witness[artefato]
+
+        except (OSError, ValueError) as e:
+            print(Color.RED.value + f"⚠️ Símbolos do circuito indisponíveis: {e}")
             return None
-    
+
+    def gerar_witness_nativa(self, gerador, dados_witness):
+        """Calcula a witness .wtns em Python; retorna None para recorrer ao circuit.wasm"""
+        if Witness.MODE.value != 'native' or gerador is None:
+            return None
+
+        try:
+            print(Color.RED.value + " Calculando witness nativa...")
+            return gerador.gerar(dados_witness)
+
+        except (KeyError, ValueError) as e:
+            print(Color.RED.value + f"⚠️ Witness nativa indisponível ({e}), usando circuit.wasm")
+            return None
+
     def enviar_resposta(self, endereco_retorno, mensagem):
         """Envia resposta de volta para o serviço solicitante"""
         try:
@@ -331,6 +758,14 @@ class Model:
             host, porta = endereco_retorno.split(':')
             porta = int(porta)
             
+            correlacao = getattr(self.contexto, 'correlacao', None)
+            if correlacao is not None:
+                mensagem = dict(mensagem, correlation_id=correlacao)
+
+            rastro = self.rastreamento.contexto_atual()
+            if rastro is not None:
+                mensagem = dict(mensagem, trace=rastro)
+            
             # Envia mensagem
             sucesso = self.enviar_mensagem(host, porta, mensagem)
             
@@ -345,6 +780,7 @@ class Model:
             print(Color.RED.value + f"❌ Erro ao processar endereço de retorno: {e}")
             return False
     
+    @rastreado('enviar')
     def enviar_mensagem(self, host, porta, mensagem):
         """Envia mensagem JSON para outros serviços via TCP"""
         try:
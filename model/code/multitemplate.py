@@ -0,0 +1,12 @@
+from failfast import similaridade_cosseno
+
+
+def preparar_templates(registradas, embedding, capacidade):
+    """Templates enviados ao circuito: os mais semelhantes à embedding, completados até a capacidade
+
+    Quando a identidade tem menos templates que o circuito, o mais semelhante é repetido: repetir
+    um template não altera a decisão, enquanto um vetor nulo seria aceito (0 >= 0).
+    """
+    ordenadas = sorted(registradas, key=lambda template: similaridade_cosseno(template, embedding), reverse=True)
+    selecionadas = ordenadas[:capacidade]
+    return selecionadas + [selecionadas[0]] * (capacidade - len(selecionadas))
@@ -0,0 +1,61 @@
+import torch
+from PIL import Image
+from enums import Color
+
+from preprocessing import ImagemPreparada
+
+
+class FacePipeline:
+    """Etapas de detecção (MTCNN) e extração de características (InceptionResnetV1) em lote"""
+
+    def __init__(self, mtcnn, backend, device):
+        self.mtcnn = mtcnn
+        self.backend = backend
+        self.device = device
+
+    def detectar_lote(self, imagens):
+        """Detecta uma face por imagem, retornando um tensor 3x160x160 ou None para cada entrada"""
+        faces = [None] * len(imagens)
+
+        # O MTCNN só processa em lote imagens com as mesmas dimensões
+        grupos = {}
+        for indice, imagem in enumerate(imagens):
+            grupos.setdefault(imagem.size, []).append(indice)
+
+        for indices in grupos.values():
+            preparadas = [self.preparar(imagens[i]) for i in indices]
+            try:
+                faces_grupo = self.detectar_grupo(preparadas)
+            except Exception as e:
+                print(Color.RED.value + f"❌ Erro na detecção de faces: {e}")
+                continue
+
+            for indice, face in zip(indices, faces_grupo):
+                faces[indice] = face
+
+        return faces
+
+    def preparar(self, imagem):
+        return imagem if isinstance(imagem, ImagemPreparada) else ImagemPreparada(imagem)
+
+    def detectar_grupo(self, preparadas):
+        """Detecta nas imagens reduzidas e recorta as faces das versões em resolução maior"""
+        deteccao = [p.deteccao for p in preparadas]
+        caixas, probabilidades, pontos = self.mtcnn.detect(deteccao, landmarks=True)
+        caixas, _, _ = self.mtcnn.select_boxes(
+            caixas, probabilidades, pontos, deteccao, method=self.mtcnn.selection_method
+        )
+
+        # Converte as caixas para as coordenadas da imagem de recorte
+        caixas = [None if c is None else c * p.escala for c, p in zip(caixas, preparadas)]
+        return self.mtcnn.extract([p.recorte for p in preparadas], caixas, None)
+
+    def embedar_lote(self, faces):
+        """Executa o InceptionResnetV1 sobre uma pilha de faces e retorna um tensor Nx512"""
+        lote = torch.stack(faces).to(self.device)
+        return self.backend(lote).cpu()
+
+    def aquecer(self):
+        """Executa uma detecção e uma inferência descartáveis para alocar memória e preparar os kernels"""
+        self.detectar_lote([Image.new('RGB', (640, 480))])
+        self.embedar_lote([torch.randn(3, 160, 160).clamp(-1, 1)])
@@ -0,0 +1,58 @@
+import time
+import threading
+
+from enums import Color, Prefetch
+
+
+class PreparedEmbeddings:
+    """Embeddings das fotos de autenticação calculadas antes da solicitação de prova
+
+    O usuário envia a foto no início da autenticação ('prepare_embedding'), enquanto busca e
+    descriptografa os templates no servidor; a solicitação de prova referencia a foto pelo
+    identificador e aguarda a embedding que ainda estiver sendo calculada.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = Prefetch.TTL.value if ttl is None else ttl
+        self.entradas = {}
+        self.trava = threading.Lock()
+
+    def iniciar(self, referencia):
+        """Reserva a entrada antes do cálculo, para que a solicitação de prova aguarde por ela"""
+        with self.trava:
+            self.remover_expiradas()
+            self.entradas[referencia] = {'pronta': threading.Event(), 'embedding': None, 'inicio': time.monotonic()}
+
+    def concluir(self, referencia, embedding):
+        with self.trava:
+            entrada = self.entradas.get(referencia)
+        if entrada is not None:
+            entrada['embedding'] = embedding
+            entrada['pronta'].set()
+
+    def obter(self, referencia, timeout=None):
+        """Retira a embedding da referência, aguardando o cálculo em andamento
+
+        Levanta KeyError se a referência não existe (expirada, ou preparada em outra instância).
+        """
+        with self.trava:
+            entrada = self.entradas.get(referencia)
+        if entrada is None:
+            raise KeyError(referencia)
+
+        if not entrada['pronta'].wait(Prefetch.WAIT_TIMEOUT.value if timeout is None else timeout):
+            raise KeyError(referencia)
+
+        with self.trava:
+            self.entradas.pop(referencia, None)
+        return entrada['embedding']
+
+    def remover_expiradas(self):
+        """Descarta as embeddings preparadas que nunca foram usadas (chamado com a trava adquirida)"""
+        limite = time.monotonic() - self.ttl
+        expiradas = [referencia for referencia, entrada in self.entradas.items()
+                     if entrada['pronta'].is_set() and entrada['inicio'] < limite]
+        for referencia in expiradas:
+            del self.entradas[referencia]
+        if expiradas:
+            print(Color.RED.value + f" {len(expiradas)} embedding(s) preparada(s) descartada(s) sem uso")
@@ -0,0 +1,49 @@
+from io import BytesIO
+
+from PIL import Image
+from enums import Preprocessing
+
+
+class ImagemPreparada:
+    """Imagem reduzida para a detecção e a versão em resolução maior usada no recorte da face"""
+
+    def __init__(self, deteccao, recorte=None):
+        self.deteccao = deteccao
+        self.recorte = recorte or deteccao
+        self.escala = self.recorte.width / self.deteccao.width
+
+    @property
+    def size(self):
+        # O MTCNN agrupa as imagens em lote pelas dimensões da imagem de detecção
+        return self.deteccao.size
+
+
+def reduzir(imagem, lado_maximo):
+    """Reduz a imagem para que o maior lado não ultrapasse lado_maximo (0 mantém o tamanho)"""
+    if not lado_maximo or max(imagem.size) <= lado_maximo:
+        return imagem
+
+    fator = lado_maximo / max(imagem.size)
+    tamanho = (max(1, round(imagem.width * fator)), max(1, round(imagem.height * fator)))
+    return imagem.resize(tamanho, Image.BILINEAR, reducing_gap=2.0)
+
+
+def preparar_imagem(dados_imagem, lado_deteccao=None, lado_recorte=None):
+    """Decodifica a imagem na menor resolução necessária e gera a versão reduzida para a detecção
+
+    Em JPEG, o modo draft decodifica diretamente em 1/2, 1/4 ou 1/8 da resolução, sem
+    descompactar a imagem completa. A caixa detectada na imagem reduzida é mapeada de volta
+    para a versão de recorte, preservando a qualidade da face de 160x160.
+    """
+    lado_deteccao = Preprocessing.DETECTION_SIZE.value if lado_deteccao is None else lado_deteccao
+    lado_recorte = Preprocessing.CROP_SIZE.value if lado_recorte is None else lado_recorte
+
+    imagem = Image.open(BytesIO(dados_imagem))
+
+    # O draft escolhe a maior redução que mantém os dois lados acima do tamanho pedido
+    if lado_recorte and imagem.format == 'JPEG':
+        imagem.draft('RGB', (lado_recorte, lado_recorte))
+
+    recorte = reduzir(imagem.convert('RGB'), lado_recorte)
+    deteccao = reduzir(recorte, lado_deteccao)
+    return ImagemPreparada(deteccao, recorte)
@@ -0,0 +1,117 @@
+import os
+import sys
+import hashlib
+import tempfile
+
+import numpy as np
+
+from enums import Adjustments, Color, Projection
+
+
+def matriz_aleatoria(dimensoes, entrada=None, semente=None):
+    """Projeção aleatória com linhas ortonormais (dimensoes x entrada), reprodutível pela semente"""
+    entrada = Adjustments.EMBEDDING_DIMENSIONS.value if entrada is None else entrada
+    semente = Projection.SEED.value if semente is None else semente
+
+    gaussiana = np.random.default_rng(semente).standard_normal((entrada, dimensoes))
+    ortonormal, _ = np.linalg.qr(gaussiana)
+    return ortonormal.T.astype(np.float32)
+
+
+def matriz_pca(embeddings, dimensoes):
+    """Componentes principais (não centralizadas) das embeddings de referência
+
+    Sem centralização, a projeção preserva a maior parte da energia dos produtos internos
+    entre as embeddings originais, que é o que a similaridade de cossenos compara.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    if len(embeddings) < dimensoes:
+        raise ValueError(f"São necessárias ao menos {dimensoes} embeddings para ajustar a PCA ({len(embeddings)} fornecidas)")
+
+    _, _, componentes = np.linalg.svd(embeddings, full_matrices=False)
+    return componentes[:dimensoes].astype(np.float32)
+
+
+def salvar_matriz(matriz, caminho):
+    """Grava a matriz de projeção de forma atômica"""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.parcial')
+    with os.fdopen(descritor, 'wb') as arquivo:
+        np.save(arquivo, matriz)
+    os.replace(temporario, caminho)
+    print(Color.RED.value + f" Matriz de projeção salva em: {caminho}")
+
+
+class EmbeddingProjection:
+    """Projeção linear das embeddings para menos dimensões, seguida de renormalização
+
+    As embeddings projetadas voltam a ter norma unitária, o que mantém válida a largura do
+    comparador calculada para o circuito. O hash da matriz identifica as embeddings geradas
+    com ela: embeddings registradas com outra matriz não são comparáveis.
+    """
+
+    def __init__(self, matriz):
+        self.matriz = np.ascontiguousarray(matriz, dtype=np.float32)
+        self.hash = hashlib.sha256(self.matriz.tobytes()).hexdigest()
+
+    @property
+    def dimensoes(self):
+        return self.matriz.shape[0]
+
+    def aplicar(self, embeddings):
+        """Projeta um vetor ou uma matriz de embeddings (uma por linha)"""
+        projetadas = np.asarray(embeddings, dtype=np.float32) @ self.matriz.T
+        normas = np.linalg.norm(projetadas, axis=-1, keepdims=True)
+        return projetadas / np.maximum(normas, np.finfo(np.float32).tiny)
+
+
+def carregar_projecao(dimensoes=None, metodo=None, caminho=None):
+    """Projeção configurada em Projection, ou None quando as embeddings mantêm as 512 dimensões
+
+    A matriz é lida do arquivo local; no método 'random', é gerada e salva na primeira execução.
+    """
+    dimensoes = Projection.DIMENSIONS.value if dimensoes is None else dimensoes
+    metodo = metodo or Projection.METHOD.value
+    entrada = Adjustments.EMBEDDING_DIMENSIONS.value
+
+    if not dimensoes or dimensoes == entrada:
+        return None
+    if dimensoes > entrada:
+        raise ValueError(f"A projeção deve reduzir as embeddings ({dimensoes} > {entrada} dimensões)")
+
+    caminho = caminho or Projection.MATRIX_FILE.value.format(dimensoes=dimensoes)
+
+    if os.path.isfile(caminho):
+        matriz = np.load(caminho)
+        if matriz.shape != (dimensoes, entrada):
+            raise ValueError(f"Matriz de projeção em {caminho} tem formato {matriz.shape}, esperado {(dimensoes, entrada)}")
+    elif metodo == 'random':
+        matriz = matriz_aleatoria(dimensoes, entrada)
+        try:
+            salvar_matriz(matriz, caminho)
+        except OSError as e:
+            print(Color.RED.value + f"⚠️ Não foi possível salvar a matriz de projeção: {e}")
+    else:
+        raise FileNotFoundError(
+            f"Matriz de projeção PCA não encontrada em {caminho} - "
+            "ajuste-a com: python3 projection.py [DIRETÓRIO DE IMAGENS]"
+        )
+
+    projecao = EmbeddingProjection(matriz)
+    print(Color.RED.value + f" Projeção das embeddings ({metodo}): {entrada} -> {dimensoes} dimensões, "
+          f"matriz {projecao.hash[:12]}")
+    return projecao
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python3 projection.py [DIRETÓRIO DE IMAGENS] [DIMENSÕES]")
+        sys.exit(1)
+
+    from benchmark_projection import carregar_faces, embeddings_faces
+    from model import Model
+
+    dimensoes = int(sys.argv[2]) if len(sys.argv) > 2 else Projection.DIMENSIONS.value
+    embeddings, _ = embeddings_faces(Model(), carregar_faces(sys.argv[1]))
+
+    salvar_matriz(matriz_pca(embeddings, dimensoes), Projection.MATRIX_FILE.value.format(dimensoes=dimensoes))
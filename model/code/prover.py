@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import queue
+import base64
+import hashlib
+import shlex
+import itertools
+import selectors
+import subprocess
+
+from enums import Color, Prover, SnarkPath
+from workspace import ProofWorkspace
+
+
+def hash_artefato(*conteudos):
+    """Identifica um conjunto de artefatos (proving key e circuito) pelo hash do seu conteúdo"""
+    sha256 = hashlib.sha256()
+    for conteudo in conteudos:
+        sha256.update(hashlib.sha256(conteudo).digest())
+    return sha256.hexdigest()
+
+
+def ambiente_node():
+    """Ambiente do processo Node com o diretório global de módulos (onde está o snarkjs)"""
+    ambiente = dict(os.environ)
+    try:
+        modulos = subprocess.run(['npm', 'root', '-g'], capture_output=True, text=True).stdout.strip()
+        if modulos:
+            ambiente['NODE_PATH'] = modulos
+    except OSError:
+        pass
+    return ambiente
+
+
+def quantidade_provers():
+    """Tamanho do pool de provers: configurado ou igual aos núcleos disponíveis"""
+    if Prover.WORKERS.value:
+        return Prover.WORKERS.value
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def carregar_json(caminho):
+    """Carrega e retorna conteúdo de arquivo JSON (None em caso de erro)"""
+    try:
+        with open(caminho, 'r') as arquivo:
+            return json.load(arquivo)
+    except Exception as e:
+        print(Color.RED.value + f"❌ Erro ao carregar arquivo {caminho}: {e}")
+        return None
+
+
+def executar_script_prova(caminho_zkey, caminho_wasm, dados_witness):
+    """Gera a prova executando o script do snarkjs (groth16 fullprove) em uma área de trabalho própria"""
+    with ProofWorkspace() as area:
+        caminho_entrada = area.caminho('input.json')
+        caminho_prova = area.caminho('proof.json')
+        caminho_parametros = area.caminho('public_parameters.json')
+
+        # Salva dados temporariamente para o script zk-SNARK
+        with open(caminho_entrada, 'w') as arquivo:
+            json.dump(dados_witness, arquivo)
+
+        print(Color.RED.value + f" Executando script zk-SNARK em {area.diretorio}...")
+
+        # Executa o script de geração da prova zk-SNARK
+        argumentos = [caminho_entrada, caminho_wasm, caminho_zkey, caminho_prova, caminho_parametros]
+        resultado = subprocess.run(
+            SnarkPath.GENERATE_PROOF_SCRIPT.value + ' ' + ' '.join(shlex.quote(a) for a in argumentos),
+            capture_output=True,
+            text=True,
+            shell=True
+        )
+
+        if resultado.returncode != 0:
+            print(Color.RED.value + f"❌ Erro ao executar script SNARK: {resultado.stderr}")
+            return None, None
+
+        print(Color.RED.value + " Carregando arquivos da prova zk-SNARK...")
+
+        # Carrega os arquivos gerados pelo script zk-SNARK
+        return carregar_json(caminho_prova), carregar_json(caminho_parametros)
+
+
+class ProverWorker:
+    """Processo Node de longa duração que atende provas pela entrada e saída padrão"""
+
+    def __init__(self, indice, ambiente):
+        self.indice = indice
+        self.ambiente = ambiente
+        self.processo = None
+        self.artefatos = set()
+        self.pendente = b'' # Saída recebida após a última linha completa
+        self.contador = itertools.count()
+        self.iniciar()
+
+    def iniciar(self):
+        self.processo = subprocess.Popen(
+            ['node', Prover.DAEMON_SCRIPT.value],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=self.ambiente
+        )
+        self.artefatos = set()
+        self.pendente = b''
+        print(Color.RED.value + f" Prover {self.indice} iniciado - PID: {self.processo.pid}")
+
+    def ativo(self):
+        return self.processo.poll() is None
+
+    def solicitar(self, pedido):
+        """Envia um pedido ao processo Node e aguarda a resposta correspondente"""
+        pedido['id'] = next(self.contador)
+        self.processo.stdin.write(json.dumps(pedido).encode() + b'\n')
+        self.processo.stdin.flush()
+
+        linha = self.ler_linha(Prover.TIMEOUT.value)
+        if linha is None:
+            raise BrokenPipeError(f"Prover {self.indice} encerrado (código {self.processo.wait()})")
+
+        resposta = json.loads(linha)
+        if not resposta.get('ok'):
+            raise RuntimeError(resposta.get('error', 'Erro desconhecido no prover'))
+        return resposta
+
+    def ler_linha(self, timeout):
+        """Próxima linha da saída do prover (None se ele encerrou); levanta TimeoutError após 'timeout' segundos
+
+        A saída é lida diretamente do descritor, sem o buffer do Python, para que a espera não
+        bloqueie em dados que já chegaram nem em uma linha incompleta.
+        """
+        prazo = time.monotonic() + timeout
+        descritor = self.processo.stdout.fileno()
+        with selectors.DefaultSelector() as seletor:
+            seletor.register(descritor, selectors.EVENT_READ)
+            while b'\n' not in self.pendente:
+                restante = prazo - time.monotonic()
+                if restante <= 0 or not seletor.select(restante):
+                    raise TimeoutError(f"Prover {self.indice} sem resposta após {timeout} s")
+                bloco = os.read(descritor, 65536)
+                if not bloco:
+                    return None
+                self.pendente += bloco
+
+        linha, _, self.pendente = self.pendente.partition(b'\n')
+        return linha
+
+    def provar(self, artefato, caminho_zkey, caminho_wasm, pedido):
+        # Cada artefato é lido do disco uma única vez por processo
+        if artefato not in self.artefatos:
+            self.solicitar({'op': 'load', 'artifact': artefato, 'zkey': caminho_zkey, 'wasm': caminho_wasm})
+            self.artefatos.add(artefato)
+
+        resposta = self.solicitar(dict(pedido, artifact=artefato))
+        return resposta['proof'], resposta['publicSignals']
+
+    def encerrar(self):
+        try:
+            self.processo.stdin.close()
+            self.processo.wait(timeout=5)
+        except Exception:
+            self.processo.kill()
+
+
+class ProverPool:
+    """Pool de provers persistentes, reiniciados automaticamente quando falham"""
+
+    def __init__(self, processos=None):
+        self.processos = processos or quantidade_provers()
+        self.livres = queue.Queue()
+        self.workers = []
+
+    def iniciar(self):
+        ambiente = ambiente_node()
+        for indice in range(self.processos):
+            worker = ProverWorker(indice, ambiente)
+            self.workers.append(worker)
+            self.livres.put(worker)
+
+        print(Color.RED.value + f" Pool de provers ativo - Processos: {self.processos}")
+
+    def provar(self, artefato, caminho_zkey, caminho_wasm, entrada):
+        """Gera a prova (witness e Groth16) a partir da entrada do circuito"""
+        return self.executar(artefato, caminho_zkey, caminho_wasm, {'op': 'prove', 'input': entrada})
+
+    def provar_witness(self, artefato, caminho_zkey, caminho_wasm, wtns):
+        """Gera a prova Groth16 a partir de uma witness .wtns já calculada"""
+        pedido = {'op': 'prove_wtns', 'wtns': base64.b64encode(wtns).decode()}
+        return self.executar(artefato, caminho_zkey, caminho_wasm, pedido)
+
+    def executar(self, artefato, caminho_zkey, caminho_wasm, pedido):
+        """Executa o pedido em um prover livre; um prover que falhar é reiniciado e o pedido, repetido"""
+        worker = self.livres.get()
+        try:
+            for _ in range(2):
+                if not worker.ativo():
+                    print(Color.RED.value + f"⚠️ Prover {worker.indice} encerrado, reiniciando...")
+                    worker.iniciar()
+                try:
+                    return worker.provar(artefato, caminho_zkey, caminho_wasm, pedido)
+                except (BrokenPipeError, OSError, ValueError) as e:
+                    # Inclui TimeoutError: um prover travado é encerrado e reiniciado como um que falhou
+                    print(Color.RED.value + f"❌ Falha de comunicação com o prover {worker.indice}: {e}")
+                    worker.processo.kill()
+                    worker.processo.wait()
+            raise RuntimeError("Prover indisponível após reinicialização")
+        finally:
+            self.livres.put(worker)
+
+    def encerrar(self):
+        for worker in self.workers:
+            worker.encerrar()
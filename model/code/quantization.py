@@ -0,0 +1,38 @@
+import math
+
+import numpy as np
+
+from enums import Adjustments
+
+
+def quantizar(embeddings, bits_fracao=None):
+    """Converte embeddings reais (vetor ou matriz) em inteiros de ponto fixo com bits_fracao bits fracionários"""
+    bits_fracao = Adjustments.FRACTIONAL_BITS.value if bits_fracao is None else bits_fracao
+    return np.rint(np.asarray(embeddings, dtype=np.float64) * (1 << bits_fracao)).astype(np.int64)
+
+
+def limiar_ponto_fixo(similaridade=None, bits_fracao=None):
+    """Limiar de similaridade de cossenos codificado com a mesma precisão das embeddings"""
+    similaridade = Adjustments.SIMILARITY_THRESHOLD.value if similaridade is None else similaridade
+    bits_fracao = Adjustments.FRACTIONAL_BITS.value if bits_fracao is None else bits_fracao
+    return round(similaridade * (1 << bits_fracao))
+
+
+def largura_comparador(dimensoes=None, bits_fracao=None):
+    """Largura do GreaterEqThan do circuito para embeddings unitárias quantizadas
+
+    Cada componente quantizado tem erro de até 1/2, logo |q|² <= (2^f + sqrt(n)/2)². O produto
+    escalar é limitado pelo produto das normas e o limiar por 2^f, o que limita os dois lados da
+    comparação (dot * 2^f)² >= threshold² * |q1|² * |q2|² pelo mesmo valor.
+    """
+    dimensoes = Adjustments.DIMENSIONS.value if dimensoes is None else dimensoes
+    bits_fracao = Adjustments.FRACTIONAL_BITS.value if bits_fracao is None else bits_fracao
+
+    escala = 1 << bits_fracao
+    norma_maxima = (escala + math.isqrt(dimensoes) // 2 + 1) ** 2
+    lado_maximo = (norma_maxima * escala) ** 2
+
+    bits = lado_maximo.bit_length()
+    if bits > 252:
+        raise ValueError(f"Precisão de {bits_fracao} bits excede o comparador do circuito ({bits} > 252 bits)")
+    return bits
@@ -0,0 +1,302 @@
+import io
+import os
+import time
+import itertools
+import threading
+import multiprocessing
+from multiprocessing import connection
+
+import torch
+from enums import Batching, Color, Replicas
+
+from batching import EmbeddingRequest
+from inference import criar_backend
+from pipeline import FacePipeline
+
+
+def distribuir_nucleos(processos):
+    """Divide os núcleos disponíveis ao contêiner em grupos contíguos, um por processo"""
+    if hasattr(os, 'sched_getaffinity'):
+        nucleos = sorted(os.sched_getaffinity(0))
+    else:
+        nucleos = list(range(os.cpu_count() or 1))
+
+    tamanho = max(1, len(nucleos) // processos)
+    return [nucleos[(i * tamanho) % len(nucleos):][:tamanho] for i in range(processos)]
+
+
+def executar_replica(indice, mtcnn, backend, nucleos, entrada, saida):
+    """Laço de um processo de réplica: detecção e embedding em lote com threads fixas"""
+    # Fixa o processo nos seus núcleos e limita as threads intra-op a eles
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, nucleos)
+    threads = Replicas.THREADS_PER_PROCESS.value or len(nucleos)
+    torch.set_num_threads(threads)
+
+    # O pool inter-op só pode ser ajustado antes do primeiro trabalho paralelo, e o estado é herdado do processo principal
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    # O backend (pesos e grafo já rastreado, quantizado ou exportado) é herdado do processo principal
+    backend.ajustar_threads(threads)
+    pipeline = FacePipeline(mtcnn, backend, 'cpu')
+    pipeline.aquecer()
+    print(Color.RED.value + f" Réplica {indice} pronta - Núcleos: {nucleos}, Threads: {torch.get_num_threads()}")
+
+    encerrar = False
+    while not encerrar:
+        try:
+            item = entrada.recv()
+        except EOFError:
+            break
+        if item is None:
+            break
+
+        # Agrupa o que já estiver no canal, sem esperar por novas solicitações
+        lote = [item]
+        try:
+            while len(lote) < Batching.MAX_SIZE.value and entrada.poll():
+                proximo = entrada.recv()
+                if proximo is None:
+                    encerrar = True
+                    break
+                lote.append(proximo)
+        except EOFError:
+            encerrar = True
+
+        # Os intervalos de cada etapa (em segundos desde a época) voltam com as embeddings para o rastreamento
+        identificadores = [identificador for identificador, _ in lote]
+        etapas = [{} for _ in lote]
+        try:
+            inicio = time.time()
+            faces = pipeline.detectar_lote([imagem for _, imagem in lote])
+            for etapas_imagem in etapas:
+                etapas_imagem['mtcnn'] = (inicio, time.time(), len(lote))
+
+            detectadas = [i for i, face in enumerate(faces) if face is not None]
+            embeddings = [None] * len(lote)
+            if detectadas:
+                inicio = time.time()
+                resultado = pipeline.embedar_lote([faces[i] for i in detectadas])
+                for posicao, i in enumerate(detectadas):
+                    embeddings[i] = resultado[posicao].numpy()
+                    etapas[i]['resnet'] = (inicio, time.time(), len(detectadas))
+        except Exception as e:
+            print(Color.RED.value + f"❌ Erro na réplica {indice}: {e}")
+            embeddings = [None] * len(lote)
+
+        for identificador, embedding, etapas_imagem in zip(identificadores, embeddings, etapas):
+            saida.send((identificador, embedding, etapas_imagem))
+
+
+def executar_replica_serializada(indice, componentes, nucleos, entrada, saida):
+    """Réplica recriada pelo forkserver: o MTCNN e o backend já preparado chegam serializados por torch.save"""
+    mtcnn, backend = torch.load(io.BytesIO(componentes))
+    executar_replica(indice, mtcnn, backend, nucleos, entrada, saida)
+
+
+class ReplicaProcess:
+    """Processo de réplica, os seus canais exclusivos e as solicitações enviadas a ele"""
+
+    def __init__(self, processo, entrada, saida):
+        self.processo = processo
+        self.entrada = entrada # Imagens enviadas pelo processo principal
+        self.saida = saida # Embeddings devolvidas pela réplica
+        self.trava_envio = threading.Lock()
+        self.pendentes = {}
+        self.encerrada = False
+
+
+class ReplicaPool:
+    """Pool de processos que executam o pipeline de detecção e embedding em paralelo
+
+    Cada réplica tem canais próprios: uma réplica encerrada no meio de uma leitura ou escrita não
+    bloqueia as demais, e o pool sabe quais solicitações estavam com ela. A cada
+    Replicas.HEALTH_INTERVAL segundos, as réplicas encerradas são recriadas e as suas solicitações
+    concluídas sem embedding, em vez de aguardarem até Replicas.TIMEOUT.
+
+    As réplicas iniciais são criadas por fork, antes das demais threads do serviço. As recriadas
+    partem do forkserver (um processo novo, sem outras threads), pois o processo principal já
+    está atendendo: o MTCNN e o backend pronto seguem serializados (uma cópia dos pesos, sem
+    preparar o backend de novo), já que os tensores compartilhados excederiam os descritores
+    que o forkserver transfere.
+    """
+
+    def __init__(self, mtcnn, resnet, processos=None, backend=None):
+        self.mtcnn = mtcnn
+        self.resnet = resnet
+        self.backend = backend
+        self.processos = processos or Replicas.PROCESSES.value
+
+        # O fork herda os pesos sem copiá-los; share_memory os mantém em memória compartilhada
+        self.contexto = multiprocessing.get_context('fork')
+
+        # Réplicas recriadas com o serviço em execução não são forks do processo principal
+        self.contexto_reinicio = multiprocessing.get_context('forkserver')
+        self.contexto_reinicio.set_forkserver_preload(['replicas'])
+
+        self.nucleos = distribuir_nucleos(self.processos)
+        self.replicas = [None] * self.processos
+
+        self.trava = threading.Lock()
+        self.contador = itertools.count()
+        self.ativo = False
+
+    def iniciar(self):
+        """Prepara o backend, carrega os pesos em memória compartilhada e cria os processos de réplica
+
+        Deve ser chamado antes de qualquer outra thread do processo ser iniciada: o fork copia apenas
+        a thread atual, e travas mantidas por outras threads ficariam presas nas réplicas.
+        """
+        # O backend é preparado uma única vez e herdado pelas réplicas. Com uma única thread intra-op,
+        # o processo principal não cria o pool de threads do Torch antes do fork
+        if self.backend is None:
+            torch.set_num_threads(1)
+            self.backend = criar_backend(self.resnet)
+
+        self.resnet.share_memory()
+        self.mtcnn.share_memory()
+
+        for indice in range(self.processos):
+            self.criar_replica(indice)
+
+        self.ativo = True
+        threading.Thread(target=self.coletar_resultados, daemon=True).start()
+        threading.Thread(target=self.monitorar_replicas, daemon=True).start()
+
+        print(Color.RED.value + f" Pool de réplicas ativo - Processos: {self.processos}")
+
+    def criar_replica(self, indice, reinicio=False):
+        contexto = self.contexto_reinicio if reinicio else self.contexto
+        entrada_replica, entrada = contexto.Pipe(duplex=False)
+        saida, saida_replica = contexto.Pipe(duplex=False)
+
+        if reinicio:
+            componentes = io.BytesIO()
+            torch.save((self.mtcnn, self.backend), componentes)
+            alvo, argumentos = executar_replica_serializada, (componentes.getvalue(),)
+        else:
+            alvo, argumentos = executar_replica, (self.mtcnn, self.backend)
+
+        processo = contexto.Process(
+            target=alvo,
+            args=(indice, *argumentos, self.nucleos[indice], entrada_replica, saida_replica),
+            daemon=True
+        )
+        processo.start()
+
+        # Apenas a réplica mantém as suas pontas: se ela for encerrada, o envio e o recebimento falham em vez de bloquear
+        entrada_replica.close()
+        saida_replica.close()
+
+        with self.trava:
+            self.replicas[indice] = ReplicaProcess(processo, entrada, saida)
+
+    def gerar(self, imagem, timeout=None, etapas=None):
+        """Envia uma imagem à réplica com menos solicitações e bloqueia até que a sua embedding (ou None) esteja pronta
+
+        Se 'etapas' for informado, recebe os intervalos de detecção ('mtcnn') e de embedding ('resnet') medidos na réplica.
+        """
+        solicitacao = EmbeddingRequest(imagem)
+        identificador = next(self.contador)
+
+        with self.trava:
+            candidatas = [replica for replica in self.replicas if not replica.encerrada] or self.replicas
+            replica = min(candidatas, key=lambda candidata: len(candidata.pendentes))
+            replica.pendentes[identificador] = solicitacao
+
+        try:
+            with replica.trava_envio:
+                replica.entrada.send((identificador, imagem))
+        except (OSError, ValueError) as e:
+            # Réplica encerrada: as próximas solicitações vão para as demais até ela ser recriada
+            replica.encerrada = True
+            print(Color.RED.value + f"❌ Falha ao enviar a imagem à réplica: {e}")
+            self.concluir(replica, identificador, None)
+
+        if not solicitacao.evento.wait(timeout or Replicas.TIMEOUT.value):
+            with self.trava:
+                replica.pendentes.pop(identificador, None)
+            print(Color.RED.value + "❌ Tempo esgotado aguardando a réplica")
+            return None
+
+        if etapas is not None:
+            etapas.update(solicitacao.etapas)
+        return solicitacao.embedding
+
+    def concluir(self, replica, identificador, embedding, etapas=None):
+        with self.trava:
+            solicitacao = replica.pendentes.pop(identificador, None)
+        if solicitacao is not None:
+            solicitacao.etapas.update(etapas or {})
+            solicitacao.concluir(None if embedding is None else torch.from_numpy(embedding))
+
+    def coletar_resultados(self):
+        """Entrega cada embedding ao seu solicitante"""
+        while self.ativo:
+            with self.trava:
+                canais = {replica.saida: replica for replica in self.replicas if not replica.encerrada}
+
+            try:
+                prontos = connection.wait(list(canais), timeout=1)
+            except (OSError, ValueError):
+                # Canal fechado por verificar_replicas durante a espera
+                continue
+
+            for canal in prontos:
+                replica = canais[canal]
+                try:
+                    identificador, embedding, etapas = canal.recv()
+                except (EOFError, OSError):
+                    # Réplica encerrada: verificar_replicas a recria e conclui as suas solicitações
+                    replica.encerrada = True
+                    continue
+                self.concluir(replica, identificador, embedding, etapas)
+
+    def monitorar_replicas(self):
+        while self.ativo:
+            time.sleep(Replicas.HEALTH_INTERVAL.value)
+            self.verificar_replicas()
+
+    def verificar_replicas(self):
+        """Recria as réplicas encerradas (pelo forkserver) e conclui, sem embedding, as solicitações que estavam com elas"""
+        for indice, replica in enumerate(self.replicas):
+            if not self.ativo or replica.processo.is_alive():
+                continue
+
+            print(Color.RED.value + f"⚠️ Réplica {indice} encerrada (código {replica.processo.exitcode}), reiniciando...")
+            with self.trava:
+                replica.encerrada = True
+                pendentes = list(replica.pendentes.values())
+                replica.pendentes.clear()
+
+            try:
+                self.criar_replica(indice, reinicio=True)
+            except Exception as e:
+                # A réplica continua marcada como encerrada e é recriada na próxima verificação
+                print(Color.RED.value + f"❌ Falha ao recriar a réplica {indice}: {e}")
+            for solicitacao in pendentes:
+                solicitacao.concluir(None)
+            if pendentes:
+                print(Color.RED.value + f"❌ {len(pendentes)} solicitação(ões) da réplica {indice} concluída(s) sem embedding")
+
+            replica.entrada.close()
+            replica.saida.close()
+
+    def encerrar(self):
+        """Encerra os processos de réplica"""
+        self.ativo = False
+        for replica in self.replicas:
+            try:
+                with replica.trava_envio:
+                    replica.entrada.send(None)
+            except (OSError, ValueError):
+                pass
+        for replica in self.replicas:
+            replica.processo.join(timeout=5)
+            if replica.processo.is_alive():
+                replica.processo.terminate()
+            replica.entrada.close()
+            replica.saida.close()
@@ -4,12 +4,13 @@ INPUT_DIR=inputs
 OUTPUT_DIR=outputs
 SNARKJS_DIR=/home/model/snarkjs/proof_generation/
 
-INPUT=${INPUT_DIR}/input.json
-CIRCUIT=${INPUT_DIR}/circuit.wasm
-PROVING_KEY=${INPUT_DIR}/proving_key.zkey
+# Os caminhos podem ser informados como argumentos (área de trabalho exclusiva da prova)
+INPUT=${1:-${INPUT_DIR}/input.json}
+CIRCUIT=${2:-${INPUT_DIR}/circuit.wasm}
+PROVING_KEY=${3:-${INPUT_DIR}/proving_key.zkey}
 
-PROOF=${OUTPUT_DIR}/proof.json
-PUBLIC_PARAMETERS=${OUTPUT_DIR}/public_parameters.json
+PROOF=${4:-${OUTPUT_DIR}/proof.json}
+PUBLIC_PARAMETERS=${5:-${OUTPUT_DIR}/public_parameters.json}
 
 set -e  # Interrompe no primeiro erro
 set -x  # Mostra todos os comandos executados
@@ -0,0 +1,88 @@
+// Prover persistente: mantém snarkjs, a proving key e o circuito compilado em memória
+// e atende solicitações de prova recebidas pela entrada padrão.
+//
+// Protocolo (uma mensagem JSON por linha):
+//   entrada: {"id": 1, "op": "load", "artifact": "<hash>", "zkey": "<caminho>", "wasm": "<caminho>"}
+//            {"id": 2, "op": "prove", "artifact": "<hash>", "input": {...}}
+//            {"id": 3, "op": "prove_wtns", "artifact": "<hash>", "wtns": "<witness .wtns em base64>"}
+//   saída:   {"id": 1, "ok": true}
+//            {"id": 2, "ok": true, "proof": {...}, "publicSignals": [...]}
+//            {"id": N, "ok": false, "error": "<mensagem>"}
+
+const fs = require("fs");
+const readline = require("readline");
+const { createRequire } = require("module");
+const snarkjs = require("snarkjs");
+
+// Dependências do próprio snarkjs (instaladas junto com ele)
+const requireSnarkjs = createRequire(require.resolve("snarkjs"));
+const { WitnessCalculatorBuilder } = requireSnarkjs("circom_runtime");
+const { utils: { unstringifyBigInts } } = requireSnarkjs("ffjavascript");
+
+// Artefatos carregados, indexados pelo hash do conteúdo: a proving key em memória e a calculadora
+// de witness com o circuit.wasm já compilado, reutilizados por todas as provas do processo
+const artefatos = new Map();
+
+function responder(mensagem) {
+    process.stdout.write(JSON.stringify(mensagem) + "\n");
+}
+
+async function carregar(pedido) {
+    if (!artefatos.has(pedido.artifact)) {
+        artefatos.set(pedido.artifact, {
+            // Arquivo em memória no formato aceito pelo snarkjs (sem releitura do disco)
+            zkey: { type: "mem", data: new Uint8Array(fs.readFileSync(pedido.zkey)) },
+            // O circuit.wasm é compilado e instanciado uma única vez
+            calculadora: await WitnessCalculatorBuilder(new Uint8Array(fs.readFileSync(pedido.wasm)))
+        });
+    }
+    return {};
+}
+
+function obterArtefato(pedido) {
+    const artefato = artefatos.get(pedido.artifact);
+    if (!artefato) {
+        throw new Error(`Artefato não carregado: ${pedido.artifact}`);
+    }
+    return artefato;
+}
+
+// Witness calculada pela calculadora em cache e prova Groth16 (equivalente ao groth16.fullProve)
+async function provar(pedido) {
+    const artefato = obterArtefato(pedido);
+    const wtns = await artefato.calculadora.calculateWTNSBin(unstringifyBigInts(pedido.input), 0);
+    const { proof, publicSignals } = await snarkjs.groth16.prove(artefato.zkey, wtns);
+    return { proof, publicSignals };
+}
+
+// Prova a partir de uma witness já calculada, sem executar o circuit.wasm
+async function provarWitness(pedido) {
+    const artefato = obterArtefato(pedido);
+    const wtns = new Uint8Array(Buffer.from(pedido.wtns, "base64"));
+    const { proof, publicSignals } = await snarkjs.groth16.prove(artefato.zkey, wtns);
+    return { proof, publicSignals };
+}
+
+const operacoes = { load: carregar, prove: provar, prove_wtns: provarWitness };
+
+// As solicitações são atendidas em ordem: o paralelismo vem de vários processos prover
+let fila = Promise.resolve();
+
+readline.createInterface({ input: process.stdin }).on("line", (linha) => {
+    fila = fila.then(async () => {
+        let pedido = {};
+        try {
+            pedido = JSON.parse(linha);
+            const operacao = operacoes[pedido.op];
+            if (!operacao) {
+                throw new Error(`Operação desconhecida: ${pedido.op}`);
+            }
+            responder({ id: pedido.id, ok: true, ...(await operacao(pedido)) });
+        } catch (erro) {
+            responder({ id: pedido.id, ok: false, error: String(erro && erro.message || erro) });
+        }
+    });
+}).on("close", async () => {
+    await fila;
+    process.exit(0);
+});
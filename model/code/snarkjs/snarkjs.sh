@@ -11,6 +11,7 @@ INPUT_DIR=/home/model/snarkjs/proof_generation/inputs
 # Renomeia as saidas do trusted setup e move-as para as entradas do proof generator
 mv ${OUTPUT_DIR}/cosine_similarity.wasm ${INPUT_DIR}/circuit.wasm
 mv ${OUTPUT_DIR}/cosine_similarity_final.zkey ${INPUT_DIR}/proving_key.zkey
+mv ${OUTPUT_DIR}/cosine_similarity.sym ${INPUT_DIR}/circuit.sym
 
 # Gera a prova
 /bin/bash ${SNARKJS_DIR}/proof_generation/generate_proof.sh
@@ -0,0 +1,88 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import torch
+from enums import Color, Startup
+from facenet_pytorch import InceptionResnetV1
+
+
+class StartupPhases:
+    """Duração de cada fase da inicialização e componentes já disponíveis"""
+
+    def __init__(self, componentes):
+        self.inicio = time.perf_counter()
+        self.trava = threading.Lock()
+        self.fases = {}
+        self.componentes = {nome: False for nome in componentes}
+
+    @contextmanager
+    def medir(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(nome, time.perf_counter() - inicio)
+
+    def registrar(self, nome, duracao):
+        with self.trava:
+            self.fases[nome] = duracao
+        print(Color.RED.value + f" Fase de inicialização '{nome}': {duracao:.2f} s")
+
+    def concluir(self, componente):
+        """Marca um componente como disponível"""
+        with self.trava:
+            self.componentes[componente] = True
+            prontos = sum(self.componentes.values())
+        print(Color.RED.value + f" Componente pronto: {componente} ({prontos}/{len(self.componentes)})")
+
+    def relatorio(self):
+        with self.trava:
+            return {
+                'componentes': dict(self.componentes),
+                'fases': dict(self.fases),
+                'total': time.perf_counter() - self.inicio
+            }
+
+    def imprimir_relatorio(self):
+        relatorio = self.relatorio()
+        print(Color.RED.value + " FASE                 | DURAÇÃO (s)")
+        for nome, duracao in relatorio['fases'].items():
+            print(Color.RED.value + f" {nome:<20} | {duracao:>11.2f}")
+        print(Color.RED.value + f" {'total até pronto':<20} | {relatorio['total']:>11.2f}")
+
+
+def salvar_pesos(resnet, caminho):
+    """Serializa os pesos usados na extração de embeddings (sem a camada de classificação)"""
+    estado = {nome: valor for nome, valor in resnet.state_dict().items() if not nome.startswith('logits.')}
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + '.parcial'
+    torch.save(estado, temporario)
+    os.replace(temporario, caminho)
+    print(Color.RED.value + f" Pesos do InceptionResnetV1 salvos em: {caminho}")
+
+
+def carregar_resnet(device):
+    """InceptionResnetV1 com os pesos do VGGFace2, lidos de um arquivo local mapeado em memória
+
+    Na primeira execução, os pesos pré-treinados são obtidos pelo facenet_pytorch e salvos
+    localmente. Nas seguintes, o modelo é criado sem inicializar parâmetros (dispositivo meta)
+    e recebe diretamente os tensores mapeados do arquivo, sem cópias.
+    """
+    caminho = Startup.WEIGHTS_FILE.value
+
+    if not os.path.isfile(caminho):
+        resnet = InceptionResnetV1(pretrained='vggface2')
+        try:
+            salvar_pesos(resnet, caminho)
+        except OSError as e:
+            print(Color.RED.value + f"⚠️ Não foi possível salvar os pesos localmente: {e}")
+        return resnet.eval().to(device)
+
+    estado = torch.load(caminho, mmap=True, weights_only=True, map_location='cpu')
+    with torch.device('meta'):
+        resnet = InceptionResnetV1()
+    resnet.load_state_dict(estado, assign=True)
+    return resnet.eval().to(device)
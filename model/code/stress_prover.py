@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import tempfile
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from batching import percentil
+from benchmark_prover import entrada_sintetica
+from enums import Adjustments, Color, SnarkPath
+from artifacts import ArtifactStore, hash_conteudo, identificador_artefato
+from prover import ProverPool, executar_script_prova
+from witness import bits_comparador, calcular_sinais, carregar_simbolos
+from workspace import diretorio_temporario
+
+
+def gerar_casos(quantidade, bits):
+    """Entradas com thresholds distintos e o resultado esperado de cada uma
+
+    Os parâmetros públicos [result, threshold] identificam a solicitação que originou a prova,
+    o que permite detectar respostas trocadas entre provas concorrentes.
+    """
+    casos = []
+    while len(casos) < quantidade:
+        entrada = entrada_sintetica(ruido=0.02 if random.random() < 0.5 else None)
+        entrada['threshold'] = len(casos) + 1
+        try:
+            esperado = calcular_sinais(
+                entrada['embedding1'], entrada['embedding2'], entrada['threshold'], bits, Adjustments.SCALE.value
+            )
+        except ValueError:
+            # Entrada que o circuito rejeita na geração da witness
+            continue
+        casos.append((entrada, [str(esperado['main.result']), str(entrada['threshold'])]))
+    return casos
+
+
+def medir(provar, casos, concorrencia):
+    """Executa todas as provas com a concorrência informada e confere os parâmetros públicos"""
+    def solicitar(caso):
+        entrada, esperado = caso
+        inicio = time.perf_counter()
+        _, parametros_publicos = provar(entrada)
+        return time.perf_counter() - inicio, parametros_publicos == esperado
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(solicitar, casos))
+    duracao = time.perf_counter() - inicio
+
+    latencias = [latencia for latencia, _ in resultados]
+    trocadas = sum(not correta for _, correta in resultados)
+    return len(casos) / duracao, percentil(latencias, 99), trocadas
+
+
+def areas_restantes():
+    """Áreas de trabalho de provas ainda presentes no diretório temporário"""
+    raiz = diretorio_temporario() or tempfile.gettempdir()
+    return [nome for nome in os.listdir(raiz) if nome.startswith('prova-')]
+
+
+def modo_daemon(caminho_zkey, caminho_wasm, artefato, processos):
+    provers = ProverPool(processos=processos)
+    provers.iniciar()
+
+    def provar(entrada):
+        return provers.provar(artefato, caminho_zkey, caminho_wasm, entrada)
+    return provar, provers.encerrar
+
+
+def modo_script(caminho_zkey, caminho_wasm, processos):
+    # Usa o mesmo caminho do serviço: área de trabalho exclusiva e limite de execuções simultâneas
+    limite_script = threading.BoundedSemaphore(processos)
+
+    def provar(entrada):
+        with limite_script:
+            return executar_script_prova(caminho_zkey, caminho_wasm, entrada)
+    return provar, lambda: None
+
+
+if __name__ == "__main__":
+    modo = sys.argv[1] if len(sys.argv) > 1 else 'daemon'
+    solicitacoes = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    maximo = int(sys.argv[3]) if len(sys.argv) > 3 else len(os.sched_getaffinity(0))
+
+    # Publica os artefatos de proof_generation/inputs/ no armazenamento por hash usado pelo serviço
+    with open(SnarkPath.PROVING_KEY.value, 'rb') as zkey, open(SnarkPath.CIRCUIT.value, 'rb') as wasm:
+        proving_key, circuito = zkey.read(), wasm.read()
+    with open(SnarkPath.SYMBOLS.value) as arquivo:
+        simbolos = arquivo.read()
+
+    artefatos = ArtifactStore()
+    hash_zkey, hash_wasm = hash_conteudo(proving_key), hash_conteudo(circuito)
+    artefatos.salvar(hash_zkey, proving_key)
+    artefatos.salvar(hash_wasm, circuito)
+    caminho_zkey, caminho_wasm = artefatos.caminho(hash_zkey), artefatos.caminho(hash_wasm)
+    artefato = identificador_artefato(hash_zkey, hash_wasm)
+
+    casos = gerar_casos(solicitacoes, bits_comparador(carregar_simbolos(simbolos)))
+
+    processos = 1
+    referencia = None
+    falhas = 0
+    print(Color.RED.value + f" Modo: {modo} - Solicitações: {solicitacoes}")
+    print(Color.RED.value + " PROVERS | VAZÃO (provas/s) | ACELERAÇÃO | P99 (s) | TROCADAS")
+    while processos <= maximo:
+        if modo == 'daemon':
+            provar, encerrar = modo_daemon(caminho_zkey, caminho_wasm, artefato, processos)
+            # Aquecimento: cada prover carrega os artefatos fora da medição
+            medir(provar, casos[:processos], processos)
+        else:
+            provar, encerrar = modo_script(caminho_zkey, caminho_wasm, processos)
+
+        vazao, p99, trocadas = medir(provar, casos, processos * 2)
+        encerrar()
+
+        referencia = referencia or vazao
+        falhas += trocadas
+        print(Color.RED.value + f" {processos:>7} | {vazao:>16.2f} | {vazao / referencia:>9.2f}x | {p99:>7.2f} | {trocadas:>8}")
+        processos = processos * 2 if processos * 2 <= maximo or processos == maximo else maximo
+
+    # Nenhuma área de trabalho pode sobrar após as provas
+    restantes = areas_restantes()
+    print(Color.RED.value + f" {'✅' if not falhas else '❌'} Provas com parâmetros públicos divergentes: {falhas}")
+    print(Color.RED.value + f" {'✅' if not restantes else '❌'} Áreas de trabalho não removidas: {len(restantes)}")
+    sys.exit(1 if falhas or restantes else 0)
@@ -0,0 +1,56 @@
+import time
+import threading
+
+from batching import MicroBatcher
+
+
+class PipelineLento:
+    """Detecção instantânea e embedding lenta: os lotes detectados se acumulam na fila intermediária"""
+
+    def __init__(self):
+        self.tamanhos = []
+        self.liberar = threading.Event()
+
+    def detectar_lote(self, imagens):
+        return list(imagens)
+
+    def embedar_lote(self, faces):
+        self.tamanhos.append(len(faces))
+        self.liberar.wait(5)
+        return [face * 2 for face in faces]
+
+
+def test_forward_nao_excede_o_lote_maximo():
+    pipeline = PipelineLento()
+    batcher = MicroBatcher(pipeline, janela=0.005, tamanho_maximo=4)
+    batcher.iniciar()
+
+    resultados = {}
+
+    def gerar(indice):
+        resultados[indice] = batcher.gerar(indice, timeout=10)
+
+    # Chegadas em grupos de 3, espaçados além da janela: lotes de detecção incompletos (3 de 4)
+    threads = [threading.Thread(target=gerar, args=(indice,)) for indice in range(1, 23)]
+    for inicio in range(0, len(threads), 3):
+        for thread in threads[inicio:inicio + 3]:
+            thread.start()
+        time.sleep(0.03)
+
+    # Libera a embedding apenas com vários lotes detectados aguardando
+    prazo = time.monotonic() + 5
+    while batcher.fila_embedding.qsize() < 3 and time.monotonic() < prazo:
+        time.sleep(0.005)
+    pipeline.liberar.set()
+    for thread in threads:
+        thread.join()
+
+    assert resultados == {indice: indice * 2 for indice in range(1, 23)}
+    assert max(pipeline.tamanhos) <= 4
+    assert sum(pipeline.tamanhos) == 22
+
+
+def test_gerar_sem_resposta_expira():
+    batcher = MicroBatcher(PipelineLento(), janela=0.001, tamanho_maximo=2)
+    # Sem as threads das etapas, a solicitação nunca é processada
+    assert batcher.gerar(1, timeout=0.05) is None
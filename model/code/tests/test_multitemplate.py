@@ -0,0 +1,20 @@
+from multitemplate import preparar_templates
+
+
+EMBEDDING = [10, 0, 0]
+PROXIMO = [9, 1, 0]
+MEDIO = [5, 5, 0]
+DISTANTE = [0, 0, 10]
+
+
+def test_ordena_pelos_mais_semelhantes():
+    assert preparar_templates([DISTANTE, PROXIMO, MEDIO], EMBEDDING, 3) == [PROXIMO, MEDIO, DISTANTE]
+
+
+def test_descarta_os_excedentes():
+    assert preparar_templates([DISTANTE, MEDIO, PROXIMO], EMBEDDING, 2) == [PROXIMO, MEDIO]
+
+
+def test_completa_com_o_mais_semelhante():
+    # Um vetor nulo seria aceito pelo circuito (0 >= 0); o template mais semelhante é repetido
+    assert preparar_templates([DISTANTE, MEDIO], EMBEDDING, 4) == [MEDIO, DISTANTE, MEDIO, MEDIO]
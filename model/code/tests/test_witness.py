@@ -0,0 +1,102 @@
+import random
+import struct
+
+import pytest
+
+from witness import (PRIMO, bits_comparador, calcular_sinais, calcular_sinais_enxuto, calcular_sinais_templates,
+                     carregar_simbolos, comparador, ler_wtns, montar_witness, resultado_circuito, serializar_wtns)
+
+
+ESCALA = 16
+LIMIAR = 11 # 0.7 na escala 16
+BITS = 40
+
+
+def decisao(embedding1, embedding2, threshold=LIMIAR, escala=ESCALA):
+    """Decisão do circuito sobre os inteiros: (dot * escala)² >= threshold² * |e1|² * |e2|²"""
+    produto = sum(a * b for a, b in zip(embedding1, embedding2))
+    normas = sum(a * a for a in embedding1) * sum(b * b for b in embedding2)
+    return int((produto * escala) ** 2 >= threshold ** 2 * normas)
+
+
+def embeddings(gerador, quantidade, dimensoes=8):
+    return [[gerador.randint(-ESCALA, ESCALA) for _ in range(dimensoes)] for _ in range(quantidade)]
+
+
+def test_wtns_ida_e_volta():
+    witness = [1, 0, 2, PRIMO - 1, 1 << 200]
+    assert ler_wtns(serializar_wtns(witness)) == witness
+
+
+def test_wtns_cabecalho():
+    dados = serializar_wtns([1, 5])
+    assert dados[:4] == b'wtns'
+    assert struct.unpack_from('<II', dados, 4) == (2, 2)
+
+    # Seção 1: n8, primo e quantidade de valores; seção 2: valores de 32 bytes
+    tipo, tamanho = struct.unpack_from('<IQ', dados, 12)
+    assert (tipo, tamanho) == (1, 4 + 32 + 4)
+    assert int.from_bytes(dados[28:60], 'little') == PRIMO
+    assert len(dados) == 12 + 12 + tamanho + 12 + 2 * 32
+
+
+def test_wtns_invalido():
+    with pytest.raises(ValueError):
+        ler_wtns(b'nope' + bytes(16))
+
+
+@pytest.mark.parametrize('esquerda, direita', [(0, 0), (5, 4), (4, 5), (255, 0), (0, 255), (255, 255)])
+def test_comparador(esquerda, direita):
+    sinais = {}
+    assert comparador(sinais, 'c', esquerda, direita, 8) == int(esquerda >= direita)
+
+    # Os bits do Num2Bits recompõem a entrada e são binários
+    bits = [sinais[f'c.lt.n2b.out[{i}]'] for i in range(9)]
+    assert set(bits) <= {0, 1}
+    assert sum(bit << i for i, bit in enumerate(bits)) == sinais['c.lt.n2b.in']
+    assert sinais['c.out'] == sinais['c.lt.out']
+
+
+def test_comparador_excede_largura():
+    with pytest.raises(ValueError):
+        comparador({}, 'c', 0, 1 << 9, 8)
+
+
+def test_sinais_seguem_a_decisao_do_circuito():
+    gerador = random.Random(7)
+    for _ in range(200):
+        e1, e2 = embeddings(gerador, 2)
+        esperado = decisao(e1, e2)
+        assert calcular_sinais(e1, e2, LIMIAR, BITS, ESCALA)['main.result'] == esperado
+        assert calcular_sinais_enxuto(e1, e2, LIMIAR, BITS, ESCALA)['main.result'] == esperado
+        assert resultado_circuito(e1, e2, LIMIAR, BITS, ESCALA) == esperado
+
+
+def test_sinais_de_varios_templates():
+    gerador = random.Random(11)
+    for _ in range(100):
+        templates = embeddings(gerador, 3)
+        embedding = embeddings(gerador, 1)[0]
+        esperado = int(any(decisao(template, embedding) for template in templates))
+        assert calcular_sinais_templates(templates, embedding, LIMIAR, BITS, ESCALA)['main.result'] == esperado
+
+
+def test_simbolos_e_witness():
+    simbolos = '\n'.join([
+        '1,1,0,main.result',
+        '2,-1,0,main.eliminado',
+        '3,2,0,main.ge_check.lt.n2b.out[0]',
+        '4,3,0,main.ge_check.lt.n2b.out[1]',
+        '5,4,0,main.ge_check.lt.n2b.out[2]',
+    ])
+    indices = carregar_simbolos(simbolos)
+    assert 'main.eliminado' not in indices
+    assert bits_comparador(indices) == 2
+
+    sinais = {'main.result': 1, 'main.ge_check.lt.n2b.out[0]': 1,
+              'main.ge_check.lt.n2b.out[1]': 0, 'main.ge_check.lt.n2b.out[2]': 1}
+    assert montar_witness(indices, sinais) == [1, 1, 1, 0, 1]
+
+    del sinais['main.result']
+    with pytest.raises(KeyError):
+        montar_witness(indices, sinais)
@@ -0,0 +1,80 @@
+import sys
+import time
+from itertools import combinations
+
+import torch
+
+from benchmark_batching import carregar_imagens
+from enums import Adjustments, Color, Inference
+from inference import BACKENDS, EagerBackend, criar_backend
+from model import Model
+
+
+def decisao_similaridade(embedding1, embedding2):
+    """Decisão do circuito (dot * escala)² >= threshold² * |e1|² * |e2|² sobre as embeddings em ponto fixo"""
+    produto_escalar = sum(a * b for a, b in zip(embedding1, embedding2))
+    norma1 = sum(a * a for a in embedding1)
+    norma2 = sum(b * b for b in embedding2)
+    limiar = Adjustments.THRESHOLD.value
+    return (produto_escalar * Adjustments.SCALE.value) ** 2 >= limiar ** 2 * norma1 * norma2
+
+
+def medir(backend, faces):
+    """Executa o backend sobre as faces e retorna as embeddings e o tempo gasto"""
+    inicio = time.perf_counter()
+    embeddings = backend(faces).float().cpu()
+    return embeddings, time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python3 validate_backend.py [DIRETÓRIO DE IMAGENS] [BACKENDS...]")
+        sys.exit(1)
+
+    diretorio = sys.argv[1]
+    nomes = sys.argv[2:] or [nome for nome in BACKENDS if nome != 'eager']
+
+    model = Model()
+
+    # Detecta as faces uma única vez; todos os backends recebem os mesmos tensores
+    faces = [face for face in model.pipeline.detectar_lote(carregar_imagens(diretorio)) if face is not None]
+    if len(faces) < 2:
+        print(Color.RED.value + f"❌ São necessárias ao menos duas faces detectadas em {diretorio}")
+        sys.exit(1)
+
+    lote = torch.stack(faces).to(model.device)
+    amostras_calibracao = list(torch.split(lote.cpu(), 8))
+
+    referencia, tempo_referencia = medir(EagerBackend(model.resnet), lote)
+    referencia_escalada = [model.escalar_embedding(e) for e in referencia]
+    pares = list(combinations(range(len(faces)), 2))
+    decisoes_referencia = [decisao_similaridade(referencia_escalada[i], referencia_escalada[j]) for i, j in pares]
+
+    print(Color.RED.value + f" {len(faces)} faces, {len(pares)} pares - Limiar: {Adjustments.SIMILARITY_THRESHOLD.value}")
+    print(Color.RED.value + f" eager: {tempo_referencia * 1000:.1f} ms")
+
+    aprovado = True
+    for nome in nomes:
+        backend = criar_backend(model.resnet, nome, amostras_calibracao)
+        if backend.nome != nome:
+            print(Color.RED.value + f"⚠️ {nome}: indisponível, ignorado")
+            continue
+
+        # Aquecimento do grafo antes da medição
+        medir(backend, lote)
+        embeddings, tempo = medir(backend, lote)
+
+        distancia = (1 - torch.nn.functional.cosine_similarity(embeddings, referencia)).max().item()
+        escaladas = [model.escalar_embedding(e) for e in embeddings]
+        divergencias = sum(
+            decisao_similaridade(escaladas[i], escaladas[j]) != decisao
+            for (i, j), decisao in zip(pares, decisoes_referencia)
+        )
+
+        ok = distancia <= Inference.MAX_COSINE_DISTANCE.value and divergencias == 0
+        aprovado = aprovado and ok
+        print(Color.RED.value + f" {'✅' if ok else '❌'} {nome}: {tempo * 1000:.1f} ms "
+              f"({tempo_referencia / tempo:.2f}x) - Distância de cosseno máx.: {distancia:.5f}, "
+              f"Decisões divergentes: {divergencias}/{len(pares)}")
+
+    sys.exit(0 if aprovado else 1)
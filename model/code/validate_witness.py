@@ -0,0 +1,100 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import statistics
+import subprocess
+
+from benchmark_prover import entrada_sintetica
+from enums import Color, SnarkPath
+from prover import ProverPool, hash_artefato
+from witness import WitnessGenerator, ler_wtns
+
+
+def witness_wasm(entrada, diretorio):
+    """Calcula a witness de referência executando o circuit.wasm pelo snarkjs"""
+    caminho_entrada = os.path.join(diretorio, 'input.json')
+    caminho_wtns = os.path.join(diretorio, 'witness.wtns')
+
+    with open(caminho_entrada, 'w') as arquivo:
+        json.dump(entrada, arquivo)
+
+    resultado = subprocess.run(
+        ['snarkjs', 'wtns', 'calculate', SnarkPath.CIRCUIT.value, caminho_entrada, caminho_wtns],
+        capture_output=True, text=True
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr or resultado.stdout)
+
+    with open(caminho_wtns, 'rb') as arquivo:
+        return ler_wtns(arquivo.read())
+
+
+def validar(gerador, quantidade):
+    """Compara a witness nativa com a do circuit.wasm em entradas aleatórias semelhantes e distintas"""
+    divergencias = 0
+    with tempfile.TemporaryDirectory() as diretorio:
+        for i in range(quantidade):
+            entrada = entrada_sintetica(ruido=0.02 if i % 2 == 0 else None)
+            referencia = witness_wasm(entrada, diretorio)
+            nativa = ler_wtns(gerador.gerar(entrada))
+
+            igual = nativa == referencia
+            divergencias += not igual
+            print(Color.RED.value + f" {'✅' if igual else '❌'} Entrada {i + 1}: {len(nativa)} sinais, "
+                  f"resultado {nativa[1] if len(nativa) > 1 else '?'}")
+    return divergencias
+
+
+def medir(provers, gerador, artefato, repeticoes):
+    """Tempo médio de fullProve (witness pelo wasm) e de prove com a witness nativa"""
+    tempos_wasm = []
+    tempos_nativa = []
+    tempos_witness = []
+
+    for _ in range(repeticoes):
+        entrada = entrada_sintetica(ruido=0.02)
+
+        inicio = time.perf_counter()
+        provers.provar(artefato, SnarkPath.PROVING_KEY.value, SnarkPath.CIRCUIT.value, entrada)
+        tempos_wasm.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        wtns = gerador.gerar(entrada)
+        tempos_witness.append(time.perf_counter() - inicio)
+        provers.provar_witness(artefato, SnarkPath.PROVING_KEY.value, SnarkPath.CIRCUIT.value, wtns)
+        tempos_nativa.append(time.perf_counter() - inicio)
+
+    return statistics.mean(tempos_wasm), statistics.mean(tempos_nativa), statistics.mean(tempos_witness)
+
+
+if __name__ == "__main__":
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    # Usa a chave de prova, o circuito e os símbolos presentes em proof_generation/inputs/
+    with open(SnarkPath.SYMBOLS.value) as arquivo:
+        gerador = WitnessGenerator(arquivo.read())
+    with open(SnarkPath.PROVING_KEY.value, 'rb') as zkey, open(SnarkPath.CIRCUIT.value, 'rb') as wasm:
+        artefato = hash_artefato(zkey.read(), wasm.read())
+
+    divergencias = validar(gerador, quantidade)
+    print(Color.RED.value + f" Witness divergentes: {divergencias}/{quantidade}")
+
+    provers = ProverPool(processos=1)
+    provers.iniciar()
+
+    # Aquecimento: carrega os artefatos no prover antes da medição
+    provers.provar(artefato, SnarkPath.PROVING_KEY.value, SnarkPath.CIRCUIT.value, entrada_sintetica())
+
+    wasm, nativa, witness = medir(provers, gerador, artefato, repeticoes)
+    provers.encerrar()
+
+    print(Color.RED.value + " MODO                    | MÉDIA (s)")
+    print(Color.RED.value + f" fullProve (wasm)        | {wasm:>9.3f}")
+    print(Color.RED.value + f" witness nativa + prove  | {nativa:>9.3f}")
+    print(Color.RED.value + f" (cálculo da witness)    | {witness:>9.3f}")
+    print(Color.RED.value + f" Redução: {(1 - nativa / wasm) * 100:.1f}%")
+
+    sys.exit(1 if divergencias else 0)
@@ -0,0 +1,288 @@
+import struct
+
+from enums import Adjustments
+from quantization import largura_comparador
+
+# Ordem do corpo finito escalar da curva BN254 (bn128 no snarkjs/circom)
+PRIMO = 21888242871839275222246405745257275088548364400416034343698204186575808495617
+N8 = 32
+
+
+def carregar_simbolos(conteudo):
+    """Lê o arquivo .sym do circom e retorna o mapa nome do sinal -> índice na witness"""
+    indices = {}
+    for linha in conteudo.splitlines():
+        partes = linha.strip().split(',', 3)
+        if len(partes) != 4:
+            continue
+        # Sinais eliminados pela otimização do circom possuem índice -1
+        indice = int(partes[1])
+        if indice >= 0:
+            indices[partes[3]] = indice
+    return indices
+
+
+def quantidade_templates(indices):
+    """Quantidade K de templates do circuito CosineSimilarityAny (0 nos circuitos de um único template)"""
+    return sum(1 for nome in indices if nome.startswith('main.templates[') and nome.endswith('][0]'))
+
+
+def bits_comparador(indices):
+    """Largura do comparador GreaterEqThan(n), deduzida dos sinais do Num2Bits(n + 1)"""
+    prefixo = 'main.ge_check[0].lt.n2b.out[' if quantidade_templates(indices) else 'main.ge_check.lt.n2b.out['
+    saidas = [nome for nome in indices if nome.startswith(prefixo)]
+    if not saidas:
+        raise ValueError("Sinais do comparador não encontrados no arquivo de símbolos")
+    return len(saidas) - 1
+
+
+def comparador(sinais, prefixo, esquerda, direita, bits):
+    """Sinais do GreaterEqThan(bits) do circomlib: in[0] >= in[1]"""
+    esquerda %= PRIMO
+    direita %= PRIMO
+
+    # GreaterEqThan -> LessThan(in[1], in[0] + 1) -> Num2Bits(bits + 1)
+    entrada_lt = (esquerda + 1) % PRIMO
+    entrada_n2b = (direita + (1 << bits) - entrada_lt) % PRIMO
+    if entrada_n2b >> (bits + 1):
+        raise ValueError(f"Entrada do comparador excede {bits + 1} bits")
+
+    saida_lt = 1 - ((entrada_n2b >> bits) & 1)
+
+    sinais[f'{prefixo}.in[0]'] = esquerda
+    sinais[f'{prefixo}.in[1]'] = direita
+    sinais[f'{prefixo}.out'] = saida_lt
+    sinais[f'{prefixo}.lt.in[0]'] = direita
+    sinais[f'{prefixo}.lt.in[1]'] = entrada_lt
+    sinais[f'{prefixo}.lt.out'] = saida_lt
+    sinais[f'{prefixo}.lt.n2b.in'] = entrada_n2b
+    for i in range(bits + 1):
+        sinais[f'{prefixo}.lt.n2b.out[{i}]'] = (entrada_n2b >> i) & 1
+
+    return saida_lt
+
+
+def vetor(sinais, nome, valores):
+    for i, valor in enumerate(valores):
+        sinais[f'{nome}[{i}]'] = valor
+
+
+def somas_parciais(valores, primeiro=None):
+    """Somas acumuladas módulo p, como os sinais partial_sums do circuito"""
+    somas = []
+    acumulado = valores[0] if primeiro is None else primeiro
+    somas.append(acumulado)
+    for valor in valores[1:]:
+        acumulado = (acumulado + valor) % PRIMO
+        somas.append(acumulado)
+    return somas
+
+
+def calcular_sinais(embedding1, embedding2, threshold, bits, escala):
+    """Calcula todos os sinais do circuito CosineSimilarity(n, escala, bits) no corpo finito"""
+    e1 = [v % PRIMO for v in embedding1]
+    e2 = [v % PRIMO for v in embedding2]
+    threshold %= PRIMO
+    sinais = {}
+
+    vetor(sinais, 'main.embedding1', e1)
+    vetor(sinais, 'main.embedding2', e2)
+    sinais['main.threshold'] = threshold
+
+    # DotProduct(n)
+    produtos = [a * b % PRIMO for a, b in zip(e1, e2)]
+    parciais_produto = somas_parciais(produtos)
+    vetor(sinais, 'main.dot_product.vec1', e1)
+    vetor(sinais, 'main.dot_product.vec2', e2)
+    vetor(sinais, 'main.dot_product.products', produtos)
+    vetor(sinais, 'main.dot_product.partial_sums', parciais_produto)
+    sinais['main.dot_product.out'] = parciais_produto[-1]
+
+    # VectorNorm(n)
+    normas = []
+    for nome, valores in (('main.norm1', e1), ('main.norm2', e2)):
+        quadrados = [v * v % PRIMO for v in valores]
+        parciais = somas_parciais(quadrados)
+        vetor(sinais, f'{nome}.vec', valores)
+        vetor(sinais, f'{nome}.squares', quadrados)
+        vetor(sinais, f'{nome}.partial_sums', parciais)
+        sinais[f'{nome}.out'] = parciais[-1]
+        normas.append(parciais[-1])
+
+    dot_prod = parciais_produto[-1] * escala % PRIMO
+    norms_product = normas[0] * normas[1] % PRIMO
+    left_side = dot_prod * dot_prod % PRIMO
+    threshold_squared = threshold * threshold % PRIMO
+    right_side = threshold_squared * norms_product % PRIMO
+
+    sinais['main.dot_prod'] = dot_prod
+    sinais['main.norm1_sq'] = normas[0]
+    sinais['main.norm2_sq'] = normas[1]
+    sinais['main.norms_product'] = norms_product
+    sinais['main.left_side'] = left_side
+    sinais['main.threshold_squared'] = threshold_squared
+    sinais['main.right_side'] = right_side
+
+    sinais['main.result'] = comparador(sinais, 'main.ge_check', left_side, right_side, bits)
+    return sinais
+
+
+def calcular_sinais_enxuto(embedding1, embedding2, threshold, bits, escala):
+    """Calcula os sinais do circuito CosineSimilarityLean(n, escala, bits), sem somas parciais"""
+    e1 = [v % PRIMO for v in embedding1]
+    e2 = [v % PRIMO for v in embedding2]
+    threshold %= PRIMO
+    sinais = {}
+
+    vetor(sinais, 'main.embedding1', e1)
+    vetor(sinais, 'main.embedding2', e2)
+    sinais['main.threshold'] = threshold
+
+    produtos = [a * b % PRIMO for a, b in zip(e1, e2)]
+    quadrados1 = [v * v % PRIMO for v in e1]
+    quadrados2 = [v * v % PRIMO for v in e2]
+    vetor(sinais, 'main.products', produtos)
+    vetor(sinais, 'main.squares1', quadrados1)
+    vetor(sinais, 'main.squares2', quadrados2)
+
+    dot_prod = sum(produtos) * escala % PRIMO
+    norms_product = sum(quadrados1) * sum(quadrados2) % PRIMO
+    left_side = dot_prod * dot_prod % PRIMO
+    threshold_squared = threshold * threshold % PRIMO
+    right_side = threshold_squared * norms_product % PRIMO
+
+    sinais['main.left_side'] = left_side
+    sinais['main.norms_product'] = norms_product
+    sinais['main.threshold_squared'] = threshold_squared
+    sinais['main.right_side'] = right_side
+
+    sinais['main.result'] = comparador(sinais, 'main.ge_check', left_side, right_side, bits)
+    return sinais
+
+
+def calcular_sinais_templates(templates, embedding, threshold, bits, escala):
+    """Calcula os sinais do circuito CosineSimilarityAny(k, n, escala, bits)"""
+    e = [v % PRIMO for v in embedding]
+    threshold %= PRIMO
+    sinais = {}
+
+    vetor(sinais, 'main.embedding', e)
+    sinais['main.threshold'] = threshold
+
+    quadrados = [v * v % PRIMO for v in e]
+    vetor(sinais, 'main.squares', quadrados)
+    norma = sum(quadrados) % PRIMO
+
+    threshold_squared = threshold * threshold % PRIMO
+    sinais['main.threshold_squared'] = threshold_squared
+
+    misses = 1
+    for j, template in enumerate(templates):
+        t = [v % PRIMO for v in template]
+        produtos = [a * b % PRIMO for a, b in zip(t, e)]
+        quadrados_template = [v * v % PRIMO for v in t]
+        vetor(sinais, f'main.templates[{j}]', t)
+        vetor(sinais, f'main.products[{j}]', produtos)
+        vetor(sinais, f'main.template_squares[{j}]', quadrados_template)
+
+        dot_prod = sum(produtos) * escala % PRIMO
+        norms_product = sum(quadrados_template) * norma % PRIMO
+        left_side = dot_prod * dot_prod % PRIMO
+        right_side = threshold_squared * norms_product % PRIMO
+
+        sinais[f'main.left_side[{j}]'] = left_side
+        sinais[f'main.norms_product[{j}]'] = norms_product
+        sinais[f'main.right_side[{j}]'] = right_side
+
+        saida = comparador(sinais, f'main.ge_check[{j}]', left_side, right_side, bits)
+        misses = misses * (1 - saida) % PRIMO
+        sinais[f'main.misses[{j}]'] = misses
+
+    sinais['main.result'] = (1 - misses) % PRIMO
+    return sinais
+
+
+def resultado_circuito(embedding1, embedding2, threshold, bits=None, escala=None):
+    """Saída result do circuito, calculada pelos mesmos sinais e pelo mesmo comparador da witness
+
+    Levanta ValueError quando a entrada excede o comparador (a witness não pode ser gerada).
+    """
+    bits = largura_comparador() if bits is None else bits
+    escala = Adjustments.SCALE.value if escala is None else escala
+
+    # A variante enxuta tem a mesma decisão das demais, sem as somas parciais
+    return calcular_sinais_enxuto(embedding1, embedding2, threshold, bits, escala)['main.result']
+
+
+def montar_witness(indices, sinais):
+    """Ordena os valores dos sinais pelos índices da witness (o índice 0 é a constante 1)"""
+    witness = [0] * (max(indices.values()) + 1)
+    witness[0] = 1
+    for nome, indice in indices.items():
+        if nome not in sinais:
+            raise KeyError(f"Sinal sem valor calculado: {nome}")
+        witness[indice] = sinais[nome]
+    return witness
+
+
+def serializar_wtns(witness):
+    """Serializa a witness no formato binário .wtns (versão 2) lido pelo snarkjs"""
+    cabecalho = struct.pack('<I', N8) + PRIMO.to_bytes(N8, 'little') + struct.pack('<I', len(witness))
+    valores = b''.join(valor.to_bytes(N8, 'little') for valor in witness)
+
+    return b''.join([
+        b'wtns', struct.pack('<II', 2, 2),
+        struct.pack('<IQ', 1, len(cabecalho)), cabecalho,
+        struct.pack('<IQ', 2, len(valores)), valores
+    ])
+
+
+def ler_wtns(dados):
+    """Lê os valores de um arquivo .wtns"""
+    if dados[:4] != b'wtns':
+        raise ValueError("Arquivo .wtns inválido")
+
+    _, secoes = struct.unpack_from('<II', dados, 4)
+    posicao = 12
+    n8 = quantidade = None
+    valores = None
+    for _ in range(secoes):
+        tipo, tamanho = struct.unpack_from('<IQ', dados, posicao)
+        posicao += 12
+        if tipo == 1:
+            n8 = struct.unpack_from('<I', dados, posicao)[0]
+            quantidade = struct.unpack_from('<I', dados, posicao + 4 + n8)[0]
+        elif tipo == 2:
+            valores = [
+                int.from_bytes(dados[posicao + i * n8:posicao + (i + 1) * n8], 'little')
+                for i in range(quantidade)
+            ]
+        posicao += tamanho
+    return valores
+
+
+class WitnessGenerator:
+    """Gerador de witness nativo para o circuito de similaridade de cossenos
+
+    A variante do circuito (CosineSimilarity, CosineSimilarityLean ou CosineSimilarityAny) é
+    deduzida dos símbolos.
+    """
+
+    def __init__(self, simbolos, escala=None):
+        self.indices = carregar_simbolos(simbolos)
+        self.templates = quantidade_templates(self.indices)
+        self.bits = bits_comparador(self.indices)
+        self.escala = Adjustments.SCALE.value if escala is None else escala
+        self.calcular = calcular_sinais_enxuto if 'main.products[0]' in self.indices else calcular_sinais
+
+    def gerar(self, entrada):
+        """Calcula a witness a partir da mesma entrada do input.json e retorna o .wtns serializado"""
+        if self.templates:
+            sinais = calcular_sinais_templates(
+                entrada['templates'], entrada['embedding'], entrada['threshold'], self.bits, self.escala
+            )
+        else:
+            sinais = self.calcular(
+                entrada['embedding1'], entrada['embedding2'], entrada['threshold'], self.bits, self.escala
+            )
+        return serializar_wtns(montar_witness(self.indices, sinais))
@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+
+from enums import Workspace
+
+
+def diretorio_temporario():
+    """Raiz das áreas de trabalho: tmpfs quando disponível, senão o diretório temporário padrão"""
+    raiz = Workspace.ROOT.value
+    if os.path.isdir(raiz) and os.access(raiz, os.W_OK):
+        return raiz
+    return None
+
+
+class ProofWorkspace:
+    """Área de trabalho exclusiva de uma prova, removida ao final do processamento"""
+
+    def __init__(self):
+        self.diretorio = None
+
+    def __enter__(self):
+        self.diretorio = tempfile.mkdtemp(prefix='prova-', dir=diretorio_temporario())
+        return self
+
+    def __exit__(self, *excecao):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
+        return False
+
+    def caminho(self, nome):
+        return os.path.join(self.diretorio, nome)
+
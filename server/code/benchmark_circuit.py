@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import math
+import shlex
+import random
+import shutil
+import struct
+import tempfile
+import statistics
+import subprocess
+
+from circuit import gerar_circuito
+from enums import Circuit, Color, SnarkPath
+
+
+PRECISOES = [16, 24, 32] # Bits fracionários avaliados por padrão
+PARES = 20 # Pares de embeddings por precisão
+
+
+def contar_restricoes(caminho_r1cs):
+    """Número de restrições lido do cabeçalho do arquivo .r1cs gerado pelo circom"""
+    with open(caminho_r1cs, 'rb') as arquivo:
+        if arquivo.read(4) != b'r1cs':
+            raise ValueError(f"Arquivo R1CS inválido: {caminho_r1cs}")
+        _, secoes = struct.unpack('<II', arquivo.read(8))
+
+        for _ in range(secoes):
+            tipo, tamanho = struct.unpack('<IQ', arquivo.read(12))
+            if tipo != 1:
+                arquivo.seek(tamanho, os.SEEK_CUR)
+                continue
+
+            # Cabeçalho: tamanho do primo, primo, wires, saídas, entradas públicas e privadas, labels, restrições
+            tamanho_primo, = struct.unpack('<I', arquivo.read(4))
+            arquivo.seek(tamanho_primo + 16 + 8, os.SEEK_CUR)
+            restricoes, = struct.unpack('<I', arquivo.read(4))
+            return restricoes
+
+    raise ValueError(f"Cabeçalho não encontrado em {caminho_r1cs}")
+
+
+def par_sintetico(cosseno, dimensoes, gerador=random):
+    """Par de embeddings unitárias com similaridade de cossenos exatamente igual a cosseno"""
+    def normalizar(vetor):
+        norma = math.sqrt(sum(v * v for v in vetor))
+        return [v / norma for v in vetor]
+
+    primeira = normalizar([gerador.gauss(0, 1) for _ in range(dimensoes)])
+    ruido = [gerador.gauss(0, 1) for _ in range(dimensoes)]
+
+    # Componente de ruído ortogonal à primeira embedding
+    projecao = sum(a * b for a, b in zip(primeira, ruido))
+    ortogonal = normalizar([r - projecao * p for r, p in zip(ruido, primeira)])
+
+    seno = math.sqrt(1 - cosseno * cosseno)
+    segunda = [cosseno * p + seno * o for p, o in zip(primeira, ortogonal)]
+    return primeira, segunda
+
+
+def executar(comando):
+    inicio = time.perf_counter()
+    resultado = subprocess.run(comando, capture_output=True, text=True, shell=True)
+    duracao = time.perf_counter() - inicio
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr or resultado.stdout)
+    return resultado, duracao
+
+
+def medir(bits_fracao, pares, dimensoes=None, variante=None, semente=None):
+    """Restrições, tamanhos dos artefatos, tempos de prova e de verificação e acurácia das decisões
+
+    Com a mesma semente, os pares avaliados são os mesmos, o que permite comparar as decisões
+    de variantes diferentes do circuito.
+    """
+    dimensoes = Circuit.DIMENSIONS.value if dimensoes is None else dimensoes
+    gerador = random.Random(semente)
+    escala = 1 << bits_fracao
+    limiar = Circuit.SIMILARITY_THRESHOLD.value
+
+    diretorio = tempfile.mkdtemp(prefix=f'circuito-{dimensoes}-{bits_fracao}-')
+    try:
+        caminho_circuito = os.path.join(diretorio, 'cosine_similarity.circom')
+        parametros = gerar_circuito(caminho_circuito, dimensoes, bits_fracao, variante)
+
+        argumentos = ' '.join(shlex.quote(arg) for arg in (caminho_circuito, diretorio))
+        executar(f"{SnarkPath.TRUSTED_SETUP_SCRIPT.value} {argumentos}")
+
+        restricoes = contar_restricoes(os.path.join(diretorio, 'cosine_similarity.r1cs'))
+        wasm = os.path.join(diretorio, 'cosine_similarity.wasm')
+        zkey = os.path.join(diretorio, 'cosine_similarity_final.zkey')
+        chave_verificacao = os.path.join(diretorio, 'verification_key.json')
+        entrada = os.path.join(diretorio, 'input.json')
+        prova = os.path.join(diretorio, 'proof.json')
+        publicos = os.path.join(diretorio, 'public.json')
+
+        tempos_prova = []
+        tempos_verificacao = []
+        decisoes = []
+        esperadas = []
+
+        for _ in range(pares):
+            # Similaridades próximas do limiar, onde o arredondamento pode alterar a decisão
+            cosseno = gerador.uniform(limiar - 0.15, limiar + 0.15)
+            primeira, segunda = par_sintetico(cosseno, dimensoes, gerador)
+            esperadas.append(int(cosseno >= limiar))
+
+            with open(entrada, 'w') as arquivo:
+                json.dump({
+                    'embedding1': [round(v * escala) for v in primeira],
+                    'embedding2': [round(v * escala) for v in segunda],
+                    'threshold': round(limiar * escala)
+                }, arquivo)
+
+            _, duracao = executar(
+                f"snarkjs groth16 fullprove {shlex.quote(entrada)} {shlex.quote(wasm)} "
+                f"{shlex.quote(zkey)} {shlex.quote(prova)} {shlex.quote(publicos)}"
+            )
+            tempos_prova.append(duracao)
+
+            argumentos = ' '.join(shlex.quote(arg) for arg in (chave_verificacao, publicos, prova))
+            resultado, duracao = executar(f"{SnarkPath.VERIFY_PROOF_SCRIPT.value} {argumentos}")
+            if 'OK!' not in resultado.stdout:
+                raise RuntimeError(f"Prova inválida com {bits_fracao} bits fracionários")
+            tempos_verificacao.append(duracao)
+
+            with open(publicos) as arquivo:
+                decisoes.append(int(json.load(arquivo)[0]))
+
+        return {
+            'bits': parametros['bits'],
+            'restricoes': restricoes,
+            'wasm': os.path.getsize(wasm),
+            'zkey': os.path.getsize(zkey),
+            'decisoes': decisoes,
+            'prova': statistics.mean(tempos_prova),
+            'verificacao': statistics.mean(tempos_verificacao),
+            'acuracia': sum(d == e for d, e in zip(decisoes, esperadas)) / pares
+        }
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    pares = int(sys.argv[1]) if len(sys.argv) > 1 else PARES
+    precisoes = [int(arg) for arg in sys.argv[2:]] or PRECISOES
+
+    print(Color.BLUE.value + " BITS FRAC. | COMPARADOR | RESTRIÇÕES | PROVA (s) | VERIFICAÇÃO (s) | ACURÁCIA")
+    for bits_fracao in precisoes:
+        dados = medir(bits_fracao, pares)
+        print(Color.BLUE.value + f" {bits_fracao:>10} | {dados['bits']:>10} | {dados['restricoes']:>10} | "
+              f"{dados['prova']:>9.2f} | {dados['verificacao']:>15.2f} | {dados['acuracia'] * 100:>7.1f}%")
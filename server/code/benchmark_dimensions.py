@@ -0,0 +1,20 @@
+import sys
+
+from benchmark_circuit import PARES, medir
+from enums import Circuit, Color
+
+
+DIMENSOES = [512, 256, 128] # Dimensões das embeddings avaliadas por padrão
+
+
+if __name__ == "__main__":
+    pares = int(sys.argv[1]) if len(sys.argv) > 1 else PARES
+    dimensoes = [int(arg) for arg in sys.argv[2:]] or DIMENSOES
+    bits_fracao = Circuit.FRACTIONAL_BITS.value
+
+    print(Color.BLUE.value + f" Precisão: {bits_fracao} bits fracionários")
+    print(Color.BLUE.value + " DIMENSÕES | RESTRIÇÕES | PROVA (s) | VERIFICAÇÃO (s) | ACURÁCIA")
+    for dimensao in dimensoes:
+        dados = medir(bits_fracao, pares, dimensao)
+        print(Color.BLUE.value + f" {dimensao:>9} | {dados['restricoes']:>10} | {dados['prova']:>9.2f} | "
+              f"{dados['verificacao']:>15.2f} | {dados['acuracia'] * 100:>7.1f}%")
@@ -0,0 +1,31 @@
+import sys
+import random
+
+from benchmark_circuit import PARES, medir
+from circuit import TEMPLATES
+from enums import Circuit, Color
+
+
+if __name__ == "__main__":
+    pares = int(sys.argv[1]) if len(sys.argv) > 1 else PARES
+    variantes = sys.argv[2:] or list(TEMPLATES)
+    bits_fracao = Circuit.FRACTIONAL_BITS.value
+
+    # Todas as variantes provam os mesmos pares de embeddings
+    semente = random.randrange(1 << 32)
+    resultados = {variante: medir(bits_fracao, pares, variante=variante, semente=semente) for variante in variantes}
+
+    print(Color.BLUE.value + f" Dimensões: {Circuit.DIMENSIONS.value}, Precisão: {bits_fracao} bits fracionários, Pares: {pares}")
+    print(Color.BLUE.value + " VARIANTE | RESTRIÇÕES | WASM (KiB) | ZKEY (KiB) | PROVA (s) | VERIFICAÇÃO (s) | ACURÁCIA")
+    for variante, dados in resultados.items():
+        print(Color.BLUE.value + f" {variante:>8} | {dados['restricoes']:>10} | {dados['wasm'] / 1024:>10.1f} | "
+              f"{dados['zkey'] / 1024:>10.1f} | {dados['prova']:>9.2f} | {dados['verificacao']:>15.2f} | "
+              f"{dados['acuracia'] * 100:>7.1f}%")
+
+    # As variantes devem tomar exatamente as mesmas decisões
+    referencia = next(iter(resultados.values()))['decisoes']
+    divergentes = [variante for variante, dados in resultados.items() if dados['decisoes'] != referencia]
+    if divergentes:
+        print(Color.BLUE.value + f"❌ Decisões divergentes nas variantes: {', '.join(divergentes)}")
+        sys.exit(1)
+    print(Color.BLUE.value + " ✅ Todas as variantes produziram as mesmas decisões")
@@ -0,0 +1,112 @@
+import os
+import math
+
+from enums import Circuit, Color, SnarkPath
+
+
+# Template instanciado por variante do circuito (input/cosine_similarity_templates.circom)
+TEMPLATES = {
+    'standard': 'CosineSimilarity',
+    'lean': 'CosineSimilarityLean'
+}
+
+# Template usado com mais de um template biométrico por identidade
+TEMPLATE_MULTIPLO = 'CosineSimilarityAny'
+
+
+def largura_comparador(dimensoes=None, bits_fracao=None):
+    """Largura do GreaterEqThan para embeddings unitárias quantizadas com bits_fracao bits fracionários
+
+    Mesmo cálculo de model/code/quantization.py: cada componente tem erro de até 1/2, logo
+    |q|² <= (2^f + sqrt(n)/2)², e os dois lados da comparação ficam limitados por (|q|² * 2^f)².
+    """
+    dimensoes = Circuit.DIMENSIONS.value if dimensoes is None else dimensoes
+    bits_fracao = Circuit.FRACTIONAL_BITS.value if bits_fracao is None else bits_fracao
+
+    escala = 1 << bits_fracao
+    norma_maxima = (escala + math.isqrt(dimensoes) // 2 + 1) ** 2
+    lado_maximo = (norma_maxima * escala) ** 2
+
+    bits = lado_maximo.bit_length()
+    if bits > 252:
+        raise ValueError(f"Precisão de {bits_fracao} bits excede o comparador do circuito ({bits} > 252 bits)")
+    return bits
+
+
+def limiar_ponto_fixo(bits_fracao=None, similaridade=None):
+    """Limiar público esperado nas provas: mesmo cálculo de model/code/quantization.py (round(limiar * 2^f))"""
+    bits_fracao = Circuit.FRACTIONAL_BITS.value if bits_fracao is None else bits_fracao
+    similaridade = Circuit.SIMILARITY_THRESHOLD.value if similaridade is None else similaridade
+    return round(similaridade * (1 << bits_fracao))
+
+
+def conferir_sinais_publicos(parametros_publicos, parametros_versao):
+    """Motivo da rejeição dos sinais públicos [result, threshold] da prova, ou None se aceitos
+
+    A prova só mostra que o resultado decorre dos sinais informados pelo cliente: a autenticação
+    exige result = 1 e o limiar configurado, na escala dos bits fracionários da versão do circuito.
+    """
+    try:
+        resultado, limiar = (int(valor) for valor in parametros_publicos)
+    except (TypeError, ValueError):
+        return 'Sinais públicos inválidos'
+
+    esperado = limiar_ponto_fixo(parametros_versao.get('bits_fracao'))
+    if limiar != esperado:
+        return f'Limiar da prova ({limiar}) difere do configurado ({esperado})'
+    if resultado != 1:
+        return 'Faces não correspondem'
+    return None
+
+
+def parametros_configurados():
+    """Parâmetros do circuito definidos em Circuit; uma versão é gerada para cada combinação"""
+    return {
+        'dimensoes': Circuit.DIMENSIONS.value,
+        'bits_fracao': Circuit.FRACTIONAL_BITS.value,
+        'variante': Circuit.VARIANT.value,
+        'templates': Circuit.ENROLLED_TEMPLATES.value
+    }
+
+
+def gerar_circuito(caminho=None, dimensoes=None, bits_fracao=None, variante=None, templates=None):
+    """Gera o circuito principal com os parâmetros correspondentes à precisão configurada
+
+    O arquivo gerado inclui os templates de input/ (passado ao circom com -l) e instancia o
+    template da variante com a dimensão, a escala 2^f e a largura do comparador. Com mais de
+    um template biométrico por identidade, instancia CosineSimilarityAny com K templates.
+    """
+    caminho = caminho or SnarkPath.GENERATED_CIRCUIT.value
+    dimensoes = Circuit.DIMENSIONS.value if dimensoes is None else dimensoes
+    bits_fracao = Circuit.FRACTIONAL_BITS.value if bits_fracao is None else bits_fracao
+    variante = variante or Circuit.VARIANT.value
+    templates = Circuit.ENROLLED_TEMPLATES.value if templates is None else templates
+
+    if variante not in TEMPLATES:
+        raise ValueError(f"Variante de circuito desconhecida: {variante}")
+    if templates < 1:
+        raise ValueError(f"Quantidade de templates inválida: {templates}")
+
+    parametros = {
+        'variante': variante if templates == 1 else 'any',
+        'templates': templates,
+        'dimensoes': dimensoes,
+        'escala': 1 << bits_fracao,
+        'bits': largura_comparador(dimensoes, bits_fracao)
+    }
+
+    argumentos = f"{parametros['dimensoes']}, {parametros['escala']}, {parametros['bits']}"
+    instancia = f"{TEMPLATES[variante]}({argumentos})" if templates == 1 else f"{TEMPLATE_MULTIPLO}({templates}, {argumentos})"
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w') as arquivo:
+        arquivo.write(
+            "pragma circom 2.0.0;\n\n"
+            f"// Gerado por server/code/circuit.py ({bits_fracao} bits fracionários, variante {parametros['variante']})\n"
+            f"include \"{SnarkPath.CIRCUIT_TEMPLATES.value}\";\n\n"
+            f"component main {{public [threshold]}} = {instancia};\n"
+        )
+
+    print(Color.BLUE.value + f" Circuito gerado em {caminho} - Dimensões: {dimensoes}, "
+          f"Bits fracionários: {bits_fracao}, Variante: {parametros['variante']}, Templates: {templates}, Comparador: {parametros['bits']} bits")
+    return parametros
@@ -12,27 +12,43 @@ class PostgesData(Enum):
     DATABASE = 'biometrics_db'
     USER = 'server'
     PASSWORD = '123456'
+    SETUP_LOCK = 410001 # Chave do advisory lock que serializa o trusted setup entre as réplicas que compartilham o banco
+
+class Circuit(Enum):
+    DIMENSIONS = 512 # 128 ou 256 com a projeção das embeddings; deve coincidir com Adjustments.DIMENSIONS do Modelo
+    FRACTIONAL_BITS = 16 # Deve coincidir com Adjustments.FRACTIONAL_BITS em model/code/enums.py
+    SIMILARITY_THRESHOLD = 0.7
+    VARIANT = 'standard' # 'standard' (CosineSimilarity) ou 'lean' (CosineSimilarityLean: mesmas decisões, menos restrições)
+    ENROLLED_TEMPLATES = 1 # Templates por identidade (K); com K > 1, uma única prova cobre todos (CosineSimilarityAny)
+    VERSION_GRACE = 600 # Tempo (em segundos) em que provas da versão substituída ainda são verificadas
 
 class SnarkPath(Enum):
     # === DIRETÓRIOS === #
     SNARKJS_DIR = '/home/server/snarkjs/'
+    TRUSTED_SETUP_INPUTS = SNARKJS_DIR + 'trusted_setup/input/'
+    TRUSTED_SETUP_BUILD = SNARKJS_DIR + 'trusted_setup/build/'
     TRUSTED_SETUP_OUTPUTS = SNARKJS_DIR + 'trusted_setup/outputs/'
     PROOF_VERIFICATION_INPUTS = SNARKJS_DIR + 'proof_verification/inputs/'
 
     # === TRUSTED SETUP === #
     TRUSTED_SETUP_SCRIPT = '/bin/bash ' + SNARKJS_DIR + 'trusted_setup/trusted_setup.sh'
 
-    VERIFICATION_KEY_OUTPUT = TRUSTED_SETUP_OUTPUTS + 'verification_key.json'
-    PROVING_KEY = TRUSTED_SETUP_OUTPUTS + 'cosine_similarity_final.zkey'
-    CIRCUIT = TRUSTED_SETUP_OUTPUTS + 'cosine_similarity.wasm'
+    CIRCUIT_TEMPLATES = 'cosine_similarity_templates.circom'
+    GENERATED_CIRCUIT = TRUSTED_SETUP_BUILD + 'cosine_similarity.circom'
 
-    # === PROOF VERIFICATION === #
-    PROOF = PROOF_VERIFICATION_INPUTS + 'proof.json'
-    PUBLIC_PARAMETERS= PROOF_VERIFICATION_INPUTS + 'public_parameters.json'
-    VERIFICATION_KEY_INPUT = PROOF_VERIFICATION_INPUTS + 'verification_key.json'
+    # Arquivos gerados no diretório de cada versão do circuito (TRUSTED_SETUP_OUTPUTS + 'v<versão>/')
+    VERIFICATION_KEY_OUTPUT = 'verification_key.json'
+    PROVING_KEY = 'cosine_similarity_final.zkey'
+    CIRCUIT = 'cosine_similarity.wasm'
+    SYMBOLS = 'cosine_similarity.sym'
 
+    # === PROOF VERIFICATION === #
+    # Cada verificação grava a prova, os parâmetros públicos e a chave da versão em um subdiretório próprio
     VERIFY_PROOF_SCRIPT = '/bin/bash ' + SNARKJS_DIR + 'proof_verification/verify_proof.sh'
 
 class Benchmark:
     CRS_GENERATION = 0
     VERIFICATION_TIME = 0
+
+class Tracing(Enum):
+    FILE = '' # Spans no formato Trace Event (JSON), reunidos com user/code/merge_traces.py (ex.: '/home/server/traces/server.json'); vazio desativa. O arquivo cresce sem limite enquanto ativo
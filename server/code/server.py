@@ -1,13 +1,21 @@
+import os
 import time
 import json
 import socket
 import threading
 import subprocess
+import shlex
 import base64
+import hashlib
+import tempfile
+import uuid
 
 import psycopg2
+from psycopg2.extras import execute_values
 
-from enums import Address, Benchmark, Color, PostgesData, SnarkPath
+from circuit import conferir_sinais_publicos, gerar_circuito, parametros_configurados
+from enums import Address, Benchmark, Circuit, Color, PostgesData, SnarkPath
+from tracing import Tracer, rastreado
 
 
 class Server:
@@ -21,6 +29,15 @@ class Server:
         self.host = Address.HOST.value
         self.port = Address.PORT.value
 
+        # Identificador de correlação da solicitação atendida por cada thread
+        self.contexto = threading.local()
+
+        # Spans das solicitações atendidas, no contexto de rastreamento recebido em cada mensagem
+        self.rastreamento = Tracer('servidor', prefixo=Color.BLUE.value)
+
+        # Apenas um trusted setup por vez; as solicitações continuam sendo atendidas pela versão ativa
+        self.trava_setup = threading.Lock()
+
         # Configurações do banco de dados PostgreSQL
         self.config_banco = {
             'host': PostgesData.HOST.value,
@@ -35,14 +52,8 @@ class Server:
         # Inicializa banco de dados
         self.inicializar_banco_dados()
 
-        # Inicia cronômetro para o cálculo do trusted setup
-        Benchmark.CRS_GENERATION = time.time()
-
-        # Compila o circuito e gera as chaves de prova e de verificação
-        self.executar_trusted_setup()
-
-        # Calcula tempo de geração da CRS
-        Benchmark.CRS_GENERATION = time.time() - Benchmark.CRS_GENERATION
+        # Reaproveita a versão ativa do circuito; o trusted setup só bloqueia sem nenhuma versão
+        self.preparar_versao_circuito()
         
         # Inicia servidor para receber mensagens
         self.iniciar_servidor()
@@ -67,6 +78,21 @@ class Server:
                 )
             """)
             
+            # Envelopes AES-GCM carregam o nonce junto dos dados; apenas os registros AES-CBC têm IV separado
+            cursor.execute("""
+                ALTER TABLE encrypted_embeddings ALTER COLUMN iv DROP NOT NULL
+            """)
+            
+            # Templates adicionais apontam para a identidade (id do primeiro template registrado)
+            cursor.execute("""
+                ALTER TABLE encrypted_embeddings
+                ADD COLUMN IF NOT EXISTS identity_id UUID REFERENCES encrypted_embeddings(id) ON DELETE CASCADE
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS encrypted_embeddings_identity_idx
+                ON encrypted_embeddings (identity_id)
+            """)
+            
             # Cria tabela para armazenar arquivos do trusted setup
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS trusted_setup_files (
@@ -77,6 +103,57 @@ class Server:
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+
+            # Hash do conteúdo, usado para referenciar os arquivos nas mensagens de autenticação
+            cursor.execute("""
+                ALTER TABLE trusted_setup_files
+                ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)
+            """)
+
+            # Versões do circuito: cada trusted setup gera uma nova versão, sem sobrescrever as anteriores
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS circuit_versions (
+                    version SERIAL PRIMARY KEY,
+                    parameters TEXT NOT NULL,
+                    status VARCHAR(20) NOT NULL DEFAULT 'building',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    activated_at TIMESTAMP,
+                    retired_at TIMESTAMP
+                )
+            """)
+
+            # Ponteiro para a versão ativa (linha única)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS active_circuit_version (
+                    singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+                    version INTEGER NOT NULL REFERENCES circuit_versions(version)
+                )
+            """)
+
+            # Os arquivos passam a ser únicos por versão e tipo; os sem versão (formato anterior,
+            # refeitos a cada inicialização) são descartados
+            cursor.execute("""
+                ALTER TABLE trusted_setup_files
+                ADD COLUMN IF NOT EXISTS version INTEGER REFERENCES circuit_versions(version) ON DELETE CASCADE
+            """)
+            cursor.execute("""
+                ALTER TABLE trusted_setup_files
+                DROP CONSTRAINT IF EXISTS trusted_setup_files_file_type_key
+            """)
+            cursor.execute("DELETE FROM trusted_setup_files WHERE version IS NULL")
+            cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS trusted_setup_files_version_type_idx
+                ON trusted_setup_files (version, file_type)
+            """)
+
+            # Versões interrompidas durante o trusted setup não serão concluídas. Se outra réplica
+            # mantém a trava do trusted setup, a versão em construção é dela e não é alterada
+            cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (PostgesData.SETUP_LOCK.value,))
+            if cursor.fetchone()[0]:
+                cursor.execute("""
+                    UPDATE circuit_versions SET status = 'failed'
+                    WHERE status = 'building'
+                """)
             
             conn.commit()
             cursor.close()
@@ -90,12 +167,118 @@ class Server:
             time.sleep(5)
             self.inicializar_banco_dados()
 
-    def executar_trusted_setup(self):
-        """Executa o script que realiza o trusted setup"""
-        print(Color.BLUE.value + " Executando trusted setup...")
-        
+    def preparar_versao_circuito(self):
+        """Garante uma versão ativa do circuito com os parâmetros configurados
+
+        Sem versão ativa, o trusted setup é executado antes de atender às solicitações. Se a
+        versão ativa foi gerada com outros parâmetros, a nova versão é preparada em segundo
+        plano enquanto a atual continua em uso.
+        """
+        ativa = self.recuperar_versao_ativa()
+        parametros = parametros_configurados()
+
+        if ativa is None:
+            print(Color.BLUE.value + " Nenhuma versão do circuito ativa")
+            if not self.executar_trusted_setup(parametros, aguardar=True, reaproveitar=True):
+                raise Exception("Falha no trusted setup - não é possível continuar")
+        elif ativa[1] != parametros:
+            print(Color.BLUE.value + f" Versão ativa v{ativa[0]} gerada com outros parâmetros: {ativa[1]}")
+            self.iniciar_trusted_setup(parametros, reaproveitar=True)
+        else:
+            print(Color.BLUE.value + f" Versão ativa do circuito: v{ativa[0]} {ativa[1]}")
+
+    def iniciar_trusted_setup(self, parametros=None, reaproveitar=False):
+        """Executa o trusted setup de uma nova versão em segundo plano; a versão ativa continua em uso"""
+        if self.trava_setup.locked():
+            print(Color.BLUE.value + "⚠️ Trusted setup já em andamento")
+            return False
+
+        # Parâmetros não informados seguem a configuração em Circuit
+        configurados = parametros_configurados()
+        parametros = parametros if isinstance(parametros, dict) else {}
+        parametros = {chave: parametros.get(chave, valor) for chave, valor in configurados.items()}
+        threading.Thread(
+            target=self.executar_trusted_setup, args=(parametros,), kwargs={'reaproveitar': reaproveitar}, daemon=True
+        ).start()
+        return True
+
+    def obter_trava_setup(self, aguardar=False):
+        """Obtém o advisory lock do trusted setup, compartilhado pelas réplicas que usam o mesmo banco
+
+        Retorna a conexão que mantém a trava (fechá-la libera a trava, inclusive se o processo for
+        encerrado), ou None se outra réplica já executa um trusted setup e 'aguardar' for falso.
+        Com a trava, as versões ainda em construção foram interrompidas e são marcadas como falhas.
+        """
+        try:
+            conn = psycopg2.connect(**self.config_banco)
+            conn.autocommit = True
+            cursor = conn.cursor()
+
+            if aguardar:
+                print(Color.BLUE.value + " Aguardando a trava do trusted setup...")
+                cursor.execute("SELECT pg_advisory_lock(%s)", (PostgesData.SETUP_LOCK.value,))
+            else:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", (PostgesData.SETUP_LOCK.value,))
+                if not cursor.fetchone()[0]:
+                    cursor.close()
+                    conn.close()
+                    return None
+
+            cursor.execute("UPDATE circuit_versions SET status = 'failed' WHERE status = 'building'")
+            cursor.close()
+            return conn
+
+        except Exception as e:
+            print(Color.BLUE.value + f"❌ Erro ao obter a trava do trusted setup: {e}")
+            return None
+
+    def executar_trusted_setup(self, parametros, aguardar=False, reaproveitar=False):
+        """Executa o trusted setup de uma nova versão com a trava compartilhada entre as réplicas
+
+        Com 'aguardar', espera o trusted setup de outra réplica terminar em vez de desistir. Com
+        'reaproveitar', não gera uma nova versão se a ativa (possivelmente gerada por outra réplica
+        enquanto esta aguardava) já tem os mesmos parâmetros.
+        """
+        with self.trava_setup:
+            conn = self.obter_trava_setup(aguardar)
+            if conn is None:
+                print(Color.BLUE.value + "⚠️ Trusted setup já em andamento em outra réplica")
+                return False
+
+            try:
+                ativa = self.recuperar_versao_ativa() if reaproveitar else None
+                if ativa is not None and ativa[1] == parametros:
+                    print(Color.BLUE.value + f" Versão v{ativa[0]} já gerada com estes parâmetros")
+                    return True
+                return self.construir_versao_circuito(parametros)
+            finally:
+                # Libera o advisory lock
+                conn.close()
+
+    def construir_versao_circuito(self, parametros):
+        """Executa o script que realiza o trusted setup de uma nova versão e a ativa ao final"""
+        versao = self.criar_versao_circuito(parametros)
+        if versao is None:
+            return False
+
+        print(Color.BLUE.value + f" Executando trusted setup da versão v{versao}...")
+
+        # Inicia cronômetro para o cálculo do trusted setup
+        inicio = time.time()
+
+        # Instancia o circuito com os parâmetros da versão, em diretórios próprios
+        caminho_circuito = os.path.join(SnarkPath.TRUSTED_SETUP_BUILD.value, f'v{versao}', 'cosine_similarity.circom')
+        diretorio_saida = os.path.join(SnarkPath.TRUSTED_SETUP_OUTPUTS.value, f'v{versao}')
+        try:
+            gerar_circuito(caminho_circuito, **parametros)
+        except (OSError, ValueError) as e:
+            print(Color.BLUE.value + f"❌ Parâmetros do circuito inválidos: {e}")
+            self.atualizar_status_versao(versao, 'failed')
+            return False
+
+        argumentos = ' '.join(shlex.quote(argumento) for argumento in (caminho_circuito, diretorio_saida))
         resultado = subprocess.run(
-            SnarkPath.TRUSTED_SETUP_SCRIPT.value, 
+            f"{SnarkPath.TRUSTED_SETUP_SCRIPT.value} {argumentos}", 
             capture_output=True, 
             text=True,
             shell=True
@@ -107,20 +290,168 @@ class Server:
         if resultado.returncode == 0:
             print(Color.BLUE.value + " ✅ Trusted Setup realizado com sucesso")
             
-            # Armazena os arquivos gerados no banco de dados
-            self.armazenar_arquivos_trusted_setup()
+            # Armazena os arquivos gerados no banco de dados e passa a usar a nova versão
+            try:
+                self.armazenar_arquivos_trusted_setup(versao, diretorio_saida)
+            except Exception:
+                self.atualizar_status_versao(versao, 'failed')
+                return False
+
+            try:
+                self.ativar_versao_circuito(versao)
+            except Exception as e:
+                print(Color.BLUE.value + f"❌ Erro ao ativar a versão v{versao}: {e}")
+                self.atualizar_status_versao(versao, 'failed')
+                return False
+
+            # Calcula tempo de geração da CRS
+            Benchmark.CRS_GENERATION = time.time() - inicio
+            return True
             
-        else:
-            print(Color.BLUE.value + "❌ Trusted Setup falhou")
-            if resultado.stdout:
-                print("\n" + Color.BLUE.value + f" Saída do script: {resultado.stdout}")
-            if resultado.stderr:
-                print(Color.BLUE.value + f" Erro do script: {resultado.stderr}")
-                
-            raise Exception("Falha no trusted setup - não é possível continuar")
+        print(Color.BLUE.value + "❌ Trusted Setup falhou")
+        if resultado.stdout:
+            print("\n" + Color.BLUE.value + f" Saída do script: {resultado.stdout}")
+        if resultado.stderr:
+            print(Color.BLUE.value + f" Erro do script: {resultado.stderr}")
+
+        self.atualizar_status_versao(versao, 'failed')
+        return False
+
+    def criar_versao_circuito(self, parametros):
+        """Registra uma nova versão do circuito (em construção) e retorna seu número"""
+        try:
+            conn = psycopg2.connect(**self.config_banco)
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                INSERT INTO circuit_versions (parameters)
+                VALUES (%s)
+                RETURNING version
+            """, (json.dumps(parametros, sort_keys=True),))
+
+            versao = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
+            conn.close()
+            return versao
+
+        except Exception as e:
+            print(Color.BLUE.value + f"❌ Erro ao registrar versão do circuito: {e}")
+            return None
+
+    def atualizar_status_versao(self, versao, status):
+        try:
+            conn = psycopg2.connect(**self.config_banco)
+            cursor = conn.cursor()
+            cursor.execute("UPDATE circuit_versions SET status = %s WHERE version = %s", (status, versao))
+            conn.commit()
+            cursor.close()
+            conn.close()
+        except Exception as e:
+            print(Color.BLUE.value + f"❌ Erro ao atualizar versão v{versao}: {e}")
+
+    def ativar_versao_circuito(self, versao):
+        """Aponta a versão ativa para a nova versão; a anterior é aceita na verificação por VERSION_GRACE
+
+        Levanta ValueError (sem alterar a versão ativa) se a versão não está mais em construção.
+        """
+        conn = psycopg2.connect(**self.config_banco)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            UPDATE circuit_versions SET status = 'retired', retired_at = CURRENT_TIMESTAMP
+            WHERE version = (SELECT version FROM active_circuit_version)
+        """)
+        cursor.execute("""
+            UPDATE circuit_versions SET status = 'active', activated_at = CURRENT_TIMESTAMP
+            WHERE version = %s AND status = 'building'
+        """, (versao,))
+        if cursor.rowcount == 0:
+            conn.rollback()
+            cursor.close()
+            conn.close()
+            raise ValueError(f"Versão v{versao} não está mais em construção")
+        cursor.execute("""
+            INSERT INTO active_circuit_version (singleton, version)
+            VALUES (TRUE, %s)
+            ON CONFLICT (singleton) DO UPDATE SET version = EXCLUDED.version
+        """, (versao,))
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        print(Color.BLUE.value + f" ✅ Versão v{versao} do circuito ativada")
+
+    @rastreado('db_versao_ativa')
+    def recuperar_versao_ativa(self):
+        """Retorna (versão, parâmetros) da versão ativa do circuito, ou None"""
+        try:
+            conn = psycopg2.connect(**self.config_banco)
+            cursor = conn.cursor()
 
-    def armazenar_arquivos_trusted_setup(self):
-        """Armazena os arquivos do trusted setup no banco de dados"""
+            cursor.execute("""
+                SELECT v.version, v.parameters FROM active_circuit_version a
+                JOIN circuit_versions v ON v.version = a.version
+            """)
+
+            resultado = cursor.fetchone()
+            cursor.close()
+            conn.close()
+
+            if resultado:
+                return resultado[0], json.loads(resultado[1])
+            return None
+
+        except Exception as e:
+            print(Color.BLUE.value + f"❌ Erro ao recuperar versão ativa do circuito: {e}")
+            return None
+
+    @rastreado('db_parametros_versao')
+    def recuperar_parametros_versao(self, versao):
+        """Retorna os parâmetros com que a versão do circuito foi gerada, ou None"""
+        try:
+            conn = psycopg2.connect(**self.config_banco)
+            cursor = conn.cursor()
+
+            cursor.execute("SELECT parameters FROM circuit_versions WHERE version = %s", (versao,))
+
+            resultado = cursor.fetchone()
+            cursor.close()
+            conn.close()
+
+            return json.loads(resultado[0]) if resultado else None
+
+        except Exception as e:
+            print(Color.BLUE.value + f"❌ Erro ao recuperar parâmetros da versão v{versao}: {e}")
+            return None
+
+    @rastreado('db_versao_aceita')
+    def versao_aceita(self, versao):
+        """Provas são verificadas na versão ativa ou em uma substituída há menos de VERSION_GRACE segundos"""
+        try:
+            conn = psycopg2.connect(**self.config_banco)
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT 1 FROM circuit_versions
+                WHERE version = %s AND (
+                    status = 'active' OR
+                    (status = 'retired' AND retired_at > CURRENT_TIMESTAMP - make_interval(secs => %s))
+                )
+            """, (versao, Circuit.VERSION_GRACE.value))
+
+            aceita = cursor.fetchone() is not None
+            cursor.close()
+            conn.close()
+            return aceita
+
+        except Exception as e:
+            print(Color.BLUE.value + f"❌ Erro ao consultar versão v{versao}: {e}")
+            return False
+
+    def armazenar_arquivos_trusted_setup(self, versao, diretorio):
+        """Armazena os arquivos do trusted setup da versão no banco de dados"""
         try:
             print(Color.BLUE.value + " Armazenando arquivos do trusted setup no banco de dados...")
             
@@ -129,9 +460,10 @@ class Server:
             
             # Lista de arquivos para armazenar
             arquivos = [
-                ('verification_key', SnarkPath.VERIFICATION_KEY_OUTPUT.value),
-                ('proving_key', SnarkPath.PROVING_KEY.value),
-                ('circuit', SnarkPath.CIRCUIT.value)
+                ('verification_key', os.path.join(diretorio, SnarkPath.VERIFICATION_KEY_OUTPUT.value)),
+                ('proving_key', os.path.join(diretorio, SnarkPath.PROVING_KEY.value)),
+                ('circuit', os.path.join(diretorio, SnarkPath.CIRCUIT.value)),
+                ('symbols', os.path.join(diretorio, SnarkPath.SYMBOLS.value))
             ]
             
             for tipo_arquivo, caminho_arquivo in arquivos:
@@ -148,16 +480,21 @@ class Server:
                         # Para arquivos JSON, lê como texto
                         with open(caminho_arquivo, 'r') as arquivo:
                             conteudo = arquivo.read()
+                            conteudo_binario = conteudo.encode('utf-8')
+
+                    # Endereço do arquivo: sha256 dos bytes originais
+                    hash_conteudo = hashlib.sha256(conteudo_binario).hexdigest()
                     
-                    # Insere ou atualiza o arquivo no banco
+                    # Insere o arquivo da versão; as versões anteriores permanecem intactas
                     cursor.execute("""
-                        INSERT INTO trusted_setup_files (file_type, file_content)
-                        VALUES (%s, %s)
-                        ON CONFLICT (file_type) 
+                        INSERT INTO trusted_setup_files (version, file_type, file_content, content_hash)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT (version, file_type) 
                         DO UPDATE SET 
                             file_content = EXCLUDED.file_content,
+                            content_hash = EXCLUDED.content_hash,
                             updated_at = CURRENT_TIMESTAMP
-                    """, (tipo_arquivo, conteudo))
+                    """, (versao, tipo_arquivo, conteudo, hash_conteudo))
                     
                     print(Color.BLUE.value + f" ✅ Arquivo {tipo_arquivo} armazenado com sucesso")
                     
@@ -178,16 +515,17 @@ class Server:
             print(Color.BLUE.value + f"❌ Erro ao armazenar arquivos do trusted setup: {e}")
             raise
 
-    def recuperar_arquivo_trusted_setup(self, tipo_arquivo):
-        """Recupera um arquivo do trusted setup do banco de dados"""
+    @rastreado('db_chave_verificacao')
+    def recuperar_arquivo_trusted_setup(self, tipo_arquivo, versao):
+        """Recupera um arquivo do trusted setup da versão informada do banco de dados"""
         try:
             conn = psycopg2.connect(**self.config_banco)
             cursor = conn.cursor()
             
             cursor.execute("""
                 SELECT file_content FROM trusted_setup_files
-                WHERE file_type = %s
-            """, (tipo_arquivo,))
+                WHERE file_type = %s AND version = %s
+            """, (tipo_arquivo, versao))
             
             resultado = cursor.fetchone()
             cursor.close()
@@ -203,6 +541,54 @@ class Server:
             print(Color.BLUE.value + f"❌ Erro ao recuperar arquivo {tipo_arquivo}: {e}")
             return None
 
+    @rastreado('db_hashes_artefatos')
+    def recuperar_hashes_trusted_setup(self, versao):
+        """Recupera os hashes de conteúdo dos arquivos do trusted setup da versão, indexados pelo tipo"""
+        try:
+            conn = psycopg2.connect(**self.config_banco)
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT file_type, content_hash FROM trusted_setup_files
+                WHERE content_hash IS NOT NULL AND version = %s
+            """, (versao,))
+            
+            resultado = dict(cursor.fetchall())
+            cursor.close()
+            conn.close()
+            return resultado
+                
+        except Exception as e:
+            print(Color.BLUE.value + f"❌ Erro ao recuperar hashes do trusted setup: {e}")
+            return {}
+
+    @rastreado('db_artefatos')
+    def recuperar_artefatos(self, hashes):
+        """Recupera arquivos do trusted setup pelo hash, com o conteúdo em base64"""
+        try:
+            conn = psycopg2.connect(**self.config_banco)
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT file_type, file_content, content_hash FROM trusted_setup_files
+                WHERE content_hash = ANY(%s)
+            """, (list(hashes),))
+            
+            artefatos = {}
+            for tipo_arquivo, conteudo, hash_conteudo in cursor.fetchall():
+                # Arquivos de texto são armazenados como texto; os binários já estão em base64
+                if tipo_arquivo in ('symbols', 'verification_key'):
+                    conteudo = base64.b64encode(conteudo.encode('utf-8')).decode('utf-8')
+                artefatos[hash_conteudo] = conteudo
+
+            cursor.close()
+            conn.close()
+            return artefatos
+                
+        except Exception as e:
+            print(Color.BLUE.value + f"❌ Erro ao recuperar artefatos: {e}")
+            return {}
+
     def iniciar_servidor(self):
         """Inicia servidor TCP para receber mensagens de outros serviços"""
         try:
@@ -236,6 +622,7 @@ class Server:
         try:
             with conn:
                 # Recebe dados em chunks para mensagens grandes
+                inicio = time.time()
                 dados_completos = b''
                 while True:
                     chunk = conn.recv(4096)
@@ -250,6 +637,10 @@ class Server:
                     mensagem = json.loads(dados_completos.decode())
                     tipo_mensagem = mensagem.get('type', 'desconhecido')
                     print(Color.BLUE.value + f" Tipo da mensagem: {tipo_mensagem}")
+
+                    self.rastreamento.fechar(self.rastreamento.abrir(
+                        'receber', pai=mensagem.get('trace'), inicio=inicio, tipo=tipo_mensagem, bytes=len(dados_completos)
+                    ))
                     
                     # Processa mensagem baseada no tipo
                     self.processar_mensagem(mensagem)
@@ -260,17 +651,33 @@ class Server:
             print(Color.BLUE.value + f"❌ Erro ao processar cliente: {e}")
     
     def processar_mensagem(self, mensagem):
-        """Roteia mensagens baseado no tipo"""
+        """Atende a mensagem no contexto de correlação e de rastreamento recebido"""
         tipo_mensagem = mensagem.get('type')
         dados = mensagem.get('data')
         endereco_retorno = mensagem.get('return_to')
-        
+
+        # As respostas enviadas por esta thread repetem o identificador de correlação da solicitação
+        self.contexto.correlacao = mensagem.get('correlation_id')
+
+        # Os spans desta solicitação são filhos do span de origem informado na mensagem
+        self.rastreamento.definir_contexto(mensagem.get('trace'))
+        with self.rastreamento.span(tipo_mensagem or 'desconhecido'):
+            self.rotear_mensagem(tipo_mensagem, dados, endereco_retorno)
+
+    def rotear_mensagem(self, tipo_mensagem, dados, endereco_retorno):
+        """Roteia mensagens baseado no tipo"""
         if tipo_mensagem == 'store_embedding':
             self.processar_armazenamento_embedding(dados, endereco_retorno)
+        elif tipo_mensagem == 'store_embeddings':
+            self.processar_armazenamento_embeddings_lote(dados, endereco_retorno)
         elif tipo_mensagem == 'get_embedding':
             self.processar_recuperacao_embedding(dados, endereco_retorno)
         elif tipo_mensagem == 'verify_snark_proof':
             self.processar_verificacao_prova_snark(dados, endereco_retorno)
+        elif tipo_mensagem == 'get_artifacts':
+            self.processar_solicitacao_artefatos(dados, endereco_retorno)
+        elif tipo_mensagem == 'setup_circuit':
+            self.processar_solicitacao_setup(dados, endereco_retorno)
         else:
             print(Color.BLUE.value + f"⚠️ Tipo de mensagem desconhecido: {tipo_mensagem}")
     
@@ -310,6 +717,25 @@ class Server:
                 }
             })
     
+    def processar_armazenamento_embeddings_lote(self, embeddings_criptografadas, endereco_retorno):
+        """Processa o armazenamento de um lote de embeddings de novas identidades (registro em lote)"""
+        print(Color.BLUE.value + f" Armazenando lote de {len(embeddings_criptografadas)} embedding(s) criptografada(s)...")
+
+        ids = self.armazenar_embeddings_lote(embeddings_criptografadas)
+
+        if ids is not None:
+            self.enviar_resposta(endereco_retorno, {
+                'type': 'registration_ids',
+                'data': ids
+            })
+        else:
+            self.enviar_resposta(endereco_retorno, {
+                'type': 'registration_error',
+                'data': {
+                    'error': 'Falha ao armazenar o lote de embeddings no banco de dados'
+                }
+            })
+
     def processar_recuperacao_embedding(self, user_id, endereco_retorno):
         """Processa solicitação de recuperação de embedding (fase de autenticação)"""
         print("\n" + "=" * 60)
@@ -317,30 +743,37 @@ class Server:
         print("=" * 60)
         print(Color.BLUE.value + f" Recuperando embedding para ID: {user_id}")
         
-        # Recupera embedding do banco de dados
-        embedding_criptografada = self.recuperar_embedding(user_id)
+        # Recupera os templates da identidade do banco de dados, com a versão conferida na verificação
+        embeddings_criptografadas, versao_templates = self.recuperar_embeddings(user_id)
         
-        if embedding_criptografada:
+        if embeddings_criptografadas:
             print(Color.BLUE.value + " Embedding recuperada com sucesso")
             
-            # Recupera arquivos do trusted setup
-            print(Color.BLUE.value + " Recuperando arquivos do trusted setup...")
-            proving_key = self.recuperar_arquivo_trusted_setup('proving_key')
-            circuit = self.recuperar_arquivo_trusted_setup('circuit')
+            # Recupera apenas os hashes dos arquivos do trusted setup
+            print(Color.BLUE.value + " Recuperando referências aos arquivos do trusted setup...")
+            ativa = self.recuperar_versao_ativa()
+            versao = ativa[0] if ativa else None
+            hashes = self.recuperar_hashes_trusted_setup(versao) if ativa else {}
+            referencias = {
+                tipo: hashes[tipo] for tipo in ('proving_key', 'circuit', 'symbols') if tipo in hashes
+            }
             
-            if proving_key and circuit:
-                print(Color.BLUE.value + " Arquivos do trusted setup recuperados com sucesso")
+            if 'proving_key' in referencias and 'circuit' in referencias:
+                print(Color.BLUE.value + " Referências do trusted setup recuperadas com sucesso")
                 print("=" * 60)
                 print(Color.BLUE.value + " FASE DE RECUPERAÇÃO CONCLUÍDA")
                 print("=" * 60 + "\n")
                 
-                # Envia embedding criptografada junto com os arquivos do trusted setup
+                # Envia os templates criptografados junto com os hashes dos arquivos do trusted setup;
+                # o conteúdo só é enviado quando o Modelo não possui algum deles
                 self.enviar_resposta(endereco_retorno, {
                     'type': 'snark_ingredients',
                     'data': {
-                        'embedding': embedding_criptografada,
-                        'proving_key': proving_key,
-                        'circuit': circuit
+                        'embedding': embeddings_criptografadas[0],
+                        'embeddings': embeddings_criptografadas,
+                        'artifacts': referencias,
+                        'version': versao,
+                        'template_version': versao_templates
                     }
                 })
             else:
@@ -372,6 +805,39 @@ class Server:
                 }
             })
     
+    def processar_solicitacao_artefatos(self, hashes, endereco_retorno):
+        """Envia o conteúdo dos arquivos do trusted setup ausentes no Modelo"""
+        print(Color.BLUE.value + f" Recuperando {len(hashes)} arquivo(s) do trusted setup por hash...")
+
+        artefatos = self.recuperar_artefatos(hashes)
+        if len(artefatos) != len(set(hashes)):
+            print(Color.BLUE.value + "❌ Arquivos do trusted setup não encontrados para todos os hashes")
+            
+            self.enviar_resposta(endereco_retorno, {
+                'type': 'artifacts_error',
+                'data': {
+                    'error': 'Arquivos do trusted setup não encontrados'
+                }
+            })
+            return
+
+        self.enviar_resposta(endereco_retorno, {
+            'type': 'artifacts',
+            'data': artefatos
+        })
+    
+    def processar_solicitacao_setup(self, parametros, endereco_retorno):
+        """Inicia o trusted setup de uma nova versão do circuito sem interromper a versão ativa"""
+        iniciado = self.iniciar_trusted_setup(parametros)
+
+        if endereco_retorno:
+            self.enviar_resposta(endereco_retorno, {
+                'type': 'circuit_setup',
+                'data': {
+                    'started': iniciado
+                }
+            })
+
     def processar_verificacao_prova_snark(self, dados_prova, endereco_retorno):
         """Processa solicitação de verificação de prova zk-SNARK (fase de autenticação)"""
         print("\n" + "=" * 60)
@@ -382,11 +848,36 @@ class Server:
         # Inicia cronômetro para a verificação
         Benchmark.VERIFICATION_TIME = time.time()
 
-        # Verifica prova zk-SNARK
-        resultado = self.verificar_prova_snark(
-            dados_prova['prova'], 
-            dados_prova['params']
-        )
+        # A prova é verificada com a chave da versão do circuito em que foi gerada
+        versao = dados_prova.get('version')
+        if versao is None:
+            ativa = self.recuperar_versao_ativa()
+            versao = ativa[0] if ativa else None
+
+        # Provas geradas com templates em cache no Usuário informam a versão dos templates usados
+        versao_templates = dados_prova.get('template_version')
+
+        if versao is None or not self.versao_aceita(versao):
+            print(Color.BLUE.value + f"❌ Versão do circuito não aceita: {versao}")
+            resultado = {
+                'authenticated': False,
+                'reason': f'Versão do circuito não aceita: {versao}',
+                'stale': True
+            }
+        elif versao_templates is not None and versao_templates != self.recuperar_versao_templates(dados_prova.get('user_id')):
+            print(Color.BLUE.value + "❌ Prova gerada com templates desatualizados")
+            resultado = {
+                'authenticated': False,
+                'reason': 'Templates desatualizados',
+                'stale': True
+            }
+        else:
+            # Verifica prova zk-SNARK
+            resultado = self.verificar_prova_snark(
+                dados_prova['prova'], 
+                dados_prova['params'],
+                versao
+            )
         
         # Calcula tempo de verificação
         Benchmark.VERIFICATION_TIME = time.time() - Benchmark.VERIFICATION_TIME
@@ -409,22 +900,46 @@ class Server:
             'data': resultado
         })
     
+    @rastreado('db_armazenar_embedding')
     def armazenar_embedding(self, embedding_criptografada):
-        """Armazena embedding criptografada no banco de dados e retorna ID único"""
+        """Armazena embedding criptografada no banco de dados e retorna ID único
+
+        Com 'user_id', a embedding é registrada como template adicional dessa identidade (até
+        Circuit.ENROLLED_TEMPLATES templates) e o ID retornado é o da própria identidade.
+        """
         try:
             print(Color.BLUE.value + " Conectando ao banco de dados para armazenamento...")
             
             conn = psycopg2.connect(**self.config_banco)
             cursor = conn.cursor()
+
+            identidade = embedding_criptografada.get('user_id')
+            if identidade:
+                # Bloqueia a identidade para que registros simultâneos não ultrapassem o limite
+                cursor.execute("""
+                    SELECT id FROM encrypted_embeddings
+                    WHERE id = %s AND identity_id IS NULL
+                    FOR UPDATE
+                """, (identidade,))
+                if cursor.fetchone() is None:
+                    raise ValueError(f"Identidade não encontrada: {identidade}")
+
+                cursor.execute("""
+                    SELECT COUNT(*) FROM encrypted_embeddings
+                    WHERE id = %s OR identity_id = %s
+                """, (identidade, identidade))
+                if cursor.fetchone()[0] >= Circuit.ENROLLED_TEMPLATES.value:
+                    raise ValueError(f"Limite de {Circuit.ENROLLED_TEMPLATES.value} template(s) por identidade atingido")
             
             # Insere embedding criptografada na tabela
             cursor.execute("""
-                INSERT INTO encrypted_embeddings (encrypted_data, iv)
-                VALUES (%s, %s)
+                INSERT INTO encrypted_embeddings (encrypted_data, iv, identity_id)
+                VALUES (%s, %s, %s)
                 RETURNING id
             """, (
                 embedding_criptografada['data'],
-                embedding_criptografada['iv']
+                embedding_criptografada.get('iv'),
+                identidade
             ))
             
             embedding_id = cursor.fetchone()[0]
@@ -433,74 +948,158 @@ class Server:
             conn.close()
             
             print(Color.BLUE.value + f" Embedding armazenada no banco com ID: {embedding_id}")
-            return str(embedding_id)
+            return str(identidade or embedding_id)
             
         except Exception as e:
             print(Color.BLUE.value + f"❌ Erro ao armazenar embedding no banco: {e}")
             return None
     
-    def recuperar_embedding(self, embedding_id):
-        """Recupera embedding criptografada do banco de dados pelo ID"""
+    @rastreado('db_armazenar_embeddings')
+    def armazenar_embeddings_lote(self, embeddings_criptografadas):
+        """Insere as embeddings em uma única instrução e transação e retorna os IDs na ordem recebida"""
+        if not embeddings_criptografadas:
+            return []
+
+        try:
+            conn = psycopg2.connect(**self.config_banco)
+            cursor = conn.cursor()
+
+            # Cada embedding do lote é uma nova identidade; os UUIDs são gerados aqui para que a
+            # resposta siga a ordem do lote, independentemente da ordem das linhas inseridas
+            ids = [str(uuid.uuid4()) for _ in embeddings_criptografadas]
+            execute_values(cursor, """
+                INSERT INTO encrypted_embeddings (id, encrypted_data, iv)
+                VALUES %s
+            """, [
+                (embedding_id, embedding['data'], embedding.get('iv'))
+                for embedding_id, embedding in zip(ids, embeddings_criptografadas)
+            ], page_size=len(embeddings_criptografadas))
+
+            conn.commit()
+            cursor.close()
+            conn.close()
+
+            print(Color.BLUE.value + f" {len(ids)} embedding(s) armazenada(s) no banco")
+            return ids
+
+        except Exception as e:
+            print(Color.BLUE.value + f"❌ Erro ao armazenar lote de embeddings no banco: {e}")
+            return None
+
+    def versao_templates(self, ids):
+        """Versão do conjunto de templates: muda quando um template é adicionado ou removido"""
+        return hashlib.sha256(','.join(str(template_id) for template_id in ids).encode()).hexdigest()[:16]
+
+    @rastreado('db_versao_templates')
+    def recuperar_versao_templates(self, embedding_id):
+        """Versão atual dos templates da identidade (apenas os IDs, sem os dados criptografados)"""
+        try:
+            conn = psycopg2.connect(**self.config_banco)
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                SELECT id FROM encrypted_embeddings
+                WHERE id = %s OR identity_id = %s
+                ORDER BY created_at, id
+            """, (embedding_id, embedding_id))
+
+            ids = [linha[0] for linha in cursor.fetchall()]
+            cursor.close()
+            conn.close()
+
+            return self.versao_templates(ids) if ids else None
+
+        except Exception as e:
+            print(Color.BLUE.value + f"❌ Erro ao consultar versão dos templates: {e}")
+            return None
+
+    @rastreado('recuperar_embedding')
+    def recuperar_embeddings(self, embedding_id):
+        """Recupera as embeddings criptografadas (templates) da identidade pelo ID, com a versão dos templates"""
         try:
             print(Color.BLUE.value + f" Conectando ao banco de dados para recuperação do ID: {embedding_id}")
             
             conn = psycopg2.connect(**self.config_banco)
             cursor = conn.cursor()
             
-            # Busca embedding por ID na tabela
+            # Busca os templates da identidade (o primeiro registrado e os adicionais)
             cursor.execute("""
-                SELECT encrypted_data, iv FROM encrypted_embeddings
-                WHERE id = %s
-            """, (embedding_id,))
+                SELECT id, encrypted_data, iv FROM encrypted_embeddings
+                WHERE id = %s OR identity_id = %s
+                ORDER BY created_at, id
+            """, (embedding_id, embedding_id))
             
-            resultado = cursor.fetchone()
+            resultados = cursor.fetchall()
             cursor.close()
             conn.close()
             
-            if resultado:
-                embedding_criptografada = {
-                    'data': resultado[0],
-                    'iv': resultado[1]
-                }
-                print(Color.BLUE.value + f" Embedding recuperada do banco para ID: {embedding_id}")
-                return embedding_criptografada
+            if resultados:
+                embeddings_criptografadas = [
+                    {'data': encrypted_data, 'iv': iv} if iv else {'data': encrypted_data}
+                    for _, encrypted_data, iv in resultados
+                ]
+                print(Color.BLUE.value + f" {len(embeddings_criptografadas)} embedding(s) recuperada(s) do banco para ID: {embedding_id}")
+                return embeddings_criptografadas, self.versao_templates(linha[0] for linha in resultados)
             else:
                 print(Color.BLUE.value + f"❌ Nenhuma embedding encontrada para ID: {embedding_id}")
-                return None
+                return None, None
                 
         except Exception as e:
             print(Color.BLUE.value + f"❌ Erro ao recuperar embedding do banco: {e}")
-            return None
+            return None, None
     
-    def verificar_prova_snark(self, prova, parametros_publicos):
-        """Verifica a validade da prova zk-SNARK recebida"""
+    @rastreado('verificar_prova_snark')
+    def verificar_prova_snark(self, prova, parametros_publicos, versao):
+        """Verifica a validade da prova zk-SNARK recebida com a chave de verificação da versão"""
         try:
-            print(Color.BLUE.value + " Iniciando processo de verificação da prova zk-SNARK...")
+            print(Color.BLUE.value + f" Iniciando processo de verificação da prova zk-SNARK (versão v{versao})...")
+
+            # Uma prova válida apenas confirma os sinais públicos enviados: o resultado e o limiar são conferidos aqui
+            parametros_versao = self.recuperar_parametros_versao(versao)
+            if parametros_versao is None:
+                raise Exception(f"Parâmetros da versão v{versao} não encontrados no banco")
+
+            motivo = conferir_sinais_publicos(parametros_publicos, parametros_versao)
+            if motivo:
+                print(Color.BLUE.value + f"❌ Sinais públicos rejeitados: {motivo}")
+                return {
+                    'authenticated': False,
+                    'reason': motivo
+                }
+
+            # Recupera a chave de verificação do banco
+            verification_key = self.recuperar_arquivo_trusted_setup('verification_key', versao)
+            if not verification_key:
+                raise Exception("Chave de verificação não encontrada no banco")
 
             print(Color.BLUE.value + " Salvando arquivos da prova zk-SNARK...")
-            
-            # Salva os dados da prova em arquivos JSON para verificação
-            self.escrever_arquivo_json(SnarkPath.PROOF.value, prova)
-            self.escrever_arquivo_json(SnarkPath.PUBLIC_PARAMETERS.value, parametros_publicos)
-            
-            # Recupera e salva a chave de verificação do banco
-            verification_key = self.recuperar_arquivo_trusted_setup('verification_key')
-            if verification_key:
-                with open(SnarkPath.VERIFICATION_KEY_INPUT.value, 'w') as f:
+
+            # Cada verificação usa um diretório próprio, removido ao final
+            os.makedirs(SnarkPath.PROOF_VERIFICATION_INPUTS.value, exist_ok=True)
+            with tempfile.TemporaryDirectory(dir=SnarkPath.PROOF_VERIFICATION_INPUTS.value) as diretorio:
+                caminho_chave = os.path.join(diretorio, 'verification_key.json')
+                caminho_parametros = os.path.join(diretorio, 'public_parameters.json')
+                caminho_prova = os.path.join(diretorio, 'proof.json')
+
+                with open(caminho_chave, 'w') as f:
                     f.write(verification_key)
                 print(Color.BLUE.value + " Chave de verificação restaurada do banco")
-            else:
-                raise Exception("Chave de verificação não encontrada no banco")
 
-            print(Color.BLUE.value + " Executando script de verificação zk-SNARK...")
-            
-            # Executa o script de verificação SNARK
-            resultado = subprocess.run(
-                SnarkPath.VERIFY_PROOF_SCRIPT.value, 
-                capture_output=True, 
-                text=True,
-                shell=True
-            )
+                # Salva os dados da prova em arquivos JSON para verificação
+                self.escrever_arquivo_json(caminho_prova, prova)
+                self.escrever_arquivo_json(caminho_parametros, parametros_publicos)
+
+                print(Color.BLUE.value + " Executando script de verificação zk-SNARK...")
+
+                # Executa o script de verificação SNARK
+                argumentos = ' '.join(shlex.quote(caminho) for caminho in (caminho_chave, caminho_parametros, caminho_prova))
+                with self.rastreamento.span('snarkjs_verify'):
+                    resultado = subprocess.run(
+                        f"{SnarkPath.VERIFY_PROOF_SCRIPT.value} {argumentos}", 
+                        capture_output=True, 
+                        text=True,
+                        shell=True
+                    )
             
             print(Color.BLUE.value + f" Prova verificada - Código de retorno: {resultado.returncode}")
             
@@ -548,6 +1147,14 @@ class Server:
             host, porta = endereco_retorno.split(':')
             porta = int(porta)
             
+            correlacao = getattr(self.contexto, 'correlacao', None)
+            if correlacao is not None:
+                mensagem = dict(mensagem, correlation_id=correlacao)
+
+            rastro = self.rastreamento.contexto_atual()
+            if rastro is not None:
+                mensagem = dict(mensagem, trace=rastro)
+            
             # Envia mensagem
             sucesso = self.enviar_mensagem(host, porta, mensagem)
             
@@ -562,6 +1169,7 @@ class Server:
             print(Color.BLUE.value + f"❌ Erro ao processar endereço de retorno: {e}")
             return False
     
+    @rastreado('enviar')
     def enviar_mensagem(self, host, porta, mensagem):
         """Envia mensagem JSON para outros serviços via TCP"""
         try:
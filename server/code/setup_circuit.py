@@ -0,0 +1,18 @@
+import sys
+import json
+import socket
+
+from enums import Address, Color
+
+
+if __name__ == "__main__":
+    # Parâmetros no formato chave=valor (dimensoes, bits_fracao, variante, templates); os omitidos seguem Circuit
+    parametros = {}
+    for argumento in sys.argv[1:]:
+        chave, _, valor = argumento.partition('=')
+        parametros[chave] = valor if chave == 'variante' else int(valor)
+
+    with socket.create_connection(('localhost', Address.PORT.value)) as conexao:
+        conexao.sendall(json.dumps({'type': 'setup_circuit', 'data': parametros}).encode())
+
+    print(Color.BLUE.value + f" Trusted setup de uma nova versão solicitado: {parametros or 'parâmetros de Circuit'}")
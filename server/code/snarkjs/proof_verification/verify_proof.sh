@@ -12,5 +12,10 @@ cd ${SNARKJS_DIR}
 #   - public_parameters.json (foi gerado na etapa do proof generation)
 #   - proof.json (foi gerado na etapa do proof generation)
 
+# Argumentos opcionais: chave de verificação, parâmetros públicos e prova
+VERIFICATION_KEY=${1:-verification_key.json}
+PUBLIC_PARAMETERS=${2:-public_parameters.json}
+PROOF=${3:-proof.json}
+
 # Verifica a prova
-snarkjs groth16 verify verification_key.json public_parameters.json proof.json
+snarkjs groth16 verify ${VERIFICATION_KEY} ${PUBLIC_PARAMETERS} ${PROOF}
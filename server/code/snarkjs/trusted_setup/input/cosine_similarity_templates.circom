@@ -0,0 +1,228 @@
+pragma circom 2.0.0;
+
+include "/home/circom-libraries/circomlib/circuits/comparators.circom";
+
+// Template para o cálculo do produto escalar entre dois vetores
+template DotProduct(n) {
+    signal input vec1[n];
+    signal input vec2[n];
+    signal output out;
+    
+    signal products[n];
+    signal partial_sums[n];
+    
+    // Calcula produtos elemento por elemento
+    for (var i = 0; i < n; i++) {
+        products[i] <== vec1[i] * vec2[i];
+    }
+    
+    // Soma acumulativa dos produtos
+    partial_sums[0] <== products[0];
+    for (var i = 1; i < n; i++) {
+        partial_sums[i] <== partial_sums[i-1] + products[i];
+    }
+    
+    out <== partial_sums[n-1];
+}
+
+// Template para calcular a norma de um vetor
+template VectorNorm(n) {
+    signal input vec[n];
+    signal output out;
+    
+    signal squares[n];
+    signal partial_sums[n];
+    
+    // Calcula o quadrado de cada elemento
+    for (var i = 0; i < n; i++) {
+        squares[i] <== vec[i] * vec[i];
+    }
+    
+    // Soma acumulativa dos quadrados
+    partial_sums[0] <== squares[0];
+    for (var i = 1; i < n; i++) {
+        partial_sums[i] <== partial_sums[i-1] + squares[i];
+    }
+    
+    out <== partial_sums[n-1];
+}
+
+// Template principal para verificar similaridade de cossenos
+// Parâmetros: dimensão das embeddings, escala do ponto fixo (2^bits fracionários) e largura do comparador
+template CosineSimilarity(n, scale, bits) {
+    // Sinais de entrada
+    signal input embedding1[n];
+    signal input embedding2[n];
+    signal input threshold;
+    
+    // Sinal de saída público (1 se passou no teste, 0 caso contrário)
+    signal output result;
+    
+    // Componentes para cálculos
+    component dot_product = DotProduct(n);
+    component norm1 = VectorNorm(n);
+    component norm2 = VectorNorm(n);
+    
+    // Conecta as embeddings aos componentes
+    for (var i = 0; i < n; i++) {
+        dot_product.vec1[i] <== embedding1[i];
+        dot_product.vec2[i] <== embedding2[i];
+        norm1.vec[i] <== embedding1[i];
+        norm2.vec[i] <== embedding2[i];
+    }
+    
+    // Calcula produto escalar e normas
+    signal dot_prod <== dot_product.out * scale; // O limiar também está em ponto fixo, ver model/code/enums.py
+    signal norm1_sq <== norm1.out;
+    signal norm2_sq <== norm2.out;
+    
+    // Calcula o produto das normas
+    signal norms_product <== norm1_sq * norm2_sq;
+    
+    // Para evitar o cálculo da divisão e raiz, comparamos:
+    // dot_prod / sqrt(norm1_sq * norm2_sq) >= threshold
+    // Equivalente a: dot_prod >= threshold * sqrt(norm1_sq * norm2_sq)
+    // Elevando ao quadrado: dot_prod² >= threshold² * norm1_sq * norm2_sq
+    signal left_side <== dot_prod * dot_prod;
+
+    signal threshold_squared <== threshold * threshold;
+    signal right_side <== threshold_squared * norms_product;
+    
+    // Verifica se left_side >= right_side
+    component ge_check = GreaterEqThan(bits);
+    ge_check.in[0] <== left_side;
+    ge_check.in[1] <== right_side;
+    
+    result <== ge_check.out;
+}
+
+// Variante enxuta: mesmas entradas, saída e decisão de CosineSimilarity, com menos sinais e restrições
+// As somas são combinações lineares acumuladas em variáveis (sem sinais de somas parciais) e cada
+// restrição quadrática multiplica duas combinações lineares, dispensando os sinais intermediários
+template CosineSimilarityLean(n, scale, bits) {
+    signal input embedding1[n];
+    signal input embedding2[n];
+    signal input threshold;
+
+    signal output result;
+
+    signal products[n];
+    signal squares1[n];
+    signal squares2[n];
+
+    var dot = 0;
+    var norm1 = 0;
+    var norm2 = 0;
+
+    // Uma multiplicação por restrição; as somas não geram restrições próprias
+    for (var i = 0; i < n; i++) {
+        products[i] <== embedding1[i] * embedding2[i];
+        squares1[i] <== embedding1[i] * embedding1[i];
+        squares2[i] <== embedding2[i] * embedding2[i];
+        dot += products[i];
+        norm1 += squares1[i];
+        norm2 += squares2[i];
+    }
+
+    // (dot * scale)^2 >= threshold^2 * norm1 * norm2, com uma restrição por produto
+    signal left_side <== (dot * scale) * (dot * scale);
+    signal norms_product <== norm1 * norm2;
+    signal threshold_squared <== threshold * threshold;
+    signal right_side <== threshold_squared * norms_product;
+
+    component ge_check = GreaterEqThan(bits);
+    ge_check.in[0] <== left_side;
+    ge_check.in[1] <== right_side;
+
+    result <== ge_check.out;
+}
+
+// Variante com vários templates registrados: prova que a embedding corresponde a pelo menos um
+// dos k templates. Os quadrados da embedding e o quadrado do limiar são calculados uma única vez
+// e compartilhados pelas k comparações
+template CosineSimilarityAny(k, n, scale, bits) {
+    signal input templates[k][n];
+    signal input embedding[n];
+    signal input threshold;
+
+    signal output result;
+
+    signal squares[n];
+    signal products[k][n];
+    signal template_squares[k][n];
+    signal left_side[k];
+    signal norms_product[k];
+    signal right_side[k];
+    signal misses[k];
+
+    component ge_check[k];
+
+    var norm = 0;
+    for (var i = 0; i < n; i++) {
+        squares[i] <== embedding[i] * embedding[i];
+        norm += squares[i];
+    }
+
+    signal threshold_squared <== threshold * threshold;
+
+    for (var j = 0; j < k; j++) {
+        var dot = 0;
+        var template_norm = 0;
+        for (var i = 0; i < n; i++) {
+            products[j][i] <== templates[j][i] * embedding[i];
+            template_squares[j][i] <== templates[j][i] * templates[j][i];
+            dot += products[j][i];
+            template_norm += template_squares[j][i];
+        }
+
+        // Mesma comparação de CosineSimilarity para cada template
+        left_side[j] <== (dot * scale) * (dot * scale);
+        norms_product[j] <== template_norm * norm;
+        right_side[j] <== threshold_squared * norms_product[j];
+
+        ge_check[j] = GreaterEqThan(bits);
+        ge_check[j].in[0] <== left_side[j];
+        ge_check[j].in[1] <== right_side[j];
+    }
+
+    // result = 1 - (1 - out[0]) * ... * (1 - out[k-1]): 1 se algum template corresponde
+    misses[0] <== 1 - ge_check[0].out;
+    for (var j = 1; j < k; j++) {
+        misses[j] <== misses[j-1] * (1 - ge_check[j].out);
+    }
+
+    result <== 1 - misses[k-1];
+}
+
+// A instância do circuito principal é gerada por server/code/circuit.py (cosine_similarity.circom),
+// com a dimensão, a escala e a largura do comparador correspondentes à precisão configurada
+
+/*
+EXPLICAÇÃO DO CIRCUITO:
+
+1. **Entradas Privadas**: Duas embeddings de dimensão n
+
+2. **Cálculo da Similaridade de Cossenos**:
+   - Calcula o produto escalar (dot product) entre as duas embeddings
+   - Calcula a norma (magnitude) de cada embedding
+   - Compara se dot_product / (norm1 * norm2) >= threshold
+
+3. **Evitando Divisão**: 
+   - Como divisão é cara em circuitos, reformulamos a comparação
+   - Em vez de A/B >= C, verificamos se A >= B*C
+   - Elevamos ao quadrado para evitar raiz quadrada
+
+4. **Ponto Fixo**:
+   - Embeddings e limiar são inteiros escalados por 2^f (f bits fracionários)
+   - dot_prod é multiplicado pela escala para que a comparação use o limiar escalado
+   - A largura do comparador é a menor que comporta os dois lados para embeddings unitárias
+
+5. **Saída**: 
+   - 1 se a similaridade >= threshold
+   - 0 caso contrário
+
+6. **Zero-Knowledge**: 
+   - As embeddings são sinais privados
+   - Apenas o resultado da comparação é público
+   - Prova que você tem embeddings similares sem revelá-las
+*/
\ No newline at end of file
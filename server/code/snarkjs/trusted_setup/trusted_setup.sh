@@ -1,29 +1,46 @@
 #!/bin/bash
 
-INPUT_DIR=input
-OUTPUT_DIR=outputs
 SNARKJS_DIR=/home/server/snarkjs/trusted_setup/
+INPUT_DIR=${SNARKJS_DIR}input
 
 CIRCUIT=cosine_similarity
 
+# Argumentos opcionais: circuito principal (gerado por server/code/circuit.py) e diretório de saída
+CIRCUIT_FILE=${1:-${SNARKJS_DIR}build/${CIRCUIT}.circom}
+OUTPUT_DIR=${2:-${SNARKJS_DIR}outputs}
+
 set -e  # Interrompe no primeiro erro
 set -x  # Mostra todos os comandos executados
 
-cd ${SNARKJS_DIR}
+# Diretório de trabalho próprio: setups de versões diferentes podem executar ao mesmo tempo
+WORK_DIR=$(mktemp -d)
+trap 'rm -rf ${WORK_DIR}' EXIT
+cd ${WORK_DIR}
 
 # ========== CIRCUIT GENERATION ========== #
 
-# 1. Compilando o circuito
-circom ${INPUT_DIR}/${CIRCUIT}.circom --r1cs --wasm
+# 1. Compilando o circuito (os templates são incluídos a partir de INPUT_DIR)
+mkdir -p ${OUTPUT_DIR}
+circom ${CIRCUIT_FILE} --r1cs --wasm --sym -l ${INPUT_DIR}
 mv ${CIRCUIT}_js/${CIRCUIT}.wasm ${OUTPUT_DIR}/${CIRCUIT}.wasm
+mv ${CIRCUIT}.sym ${OUTPUT_DIR}/${CIRCUIT}.sym
+mv ${CIRCUIT}.r1cs ${OUTPUT_DIR}/${CIRCUIT}.r1cs # Mantido para a contagem de restrições
+rm -rf ${CIRCUIT}_js
 
 # ========== TRUSTED SETUP ========== #
 
 # Gera 16 bytes aleatórios em base64 e limita a saída para os primeiros 16 caracteres
 ENTROPY=$(openssl rand -base64 16 | head -c 16)
 
-# 2. Início da cerimônia de confiança usando a curva BN128, com potência 16
-snarkjs powersoftau new bn128 12 pot_00.ptau -v
+# Menor potência (a partir de 12) cujo domínio comporta as restrições do circuito gerado
+CONSTRAINTS=$(snarkjs r1cs info ${OUTPUT_DIR}/${CIRCUIT}.r1cs | grep -o 'Constraints: [0-9]*' | grep -o '[0-9]*')
+POWER=12
+while [ $((1 << POWER)) -lt $((CONSTRAINTS + 16)) ]; do
+    POWER=$((POWER + 1))
+done
+
+# 2. Início da cerimônia de confiança usando a curva BN128, com a potência calculada acima
+snarkjs powersoftau new bn128 ${POWER} pot_00.ptau -v
 snarkjs powersoftau contribute pot_00.ptau pot_01.ptau --name="First contribution" -v -e="$ENTROPY"
 
 # 3. Prepara os parâmetros para a fase 2 (usada em Groth16), salvando em pot_final.ptau
@@ -33,11 +50,10 @@ snarkjs powersoftau prepare phase2 pot_01.ptau pot_final.ptau -v
 ENTROPY=$(openssl rand -base64 16 | head -c 16)
 
 # 4. Cerimônia de setup
-snarkjs groth16 setup ${CIRCUIT}.r1cs pot_final.ptau ${CIRCUIT}_00.zkey
+snarkjs groth16 setup ${OUTPUT_DIR}/${CIRCUIT}.r1cs pot_final.ptau ${CIRCUIT}_00.zkey
 snarkjs zkey contribute ${CIRCUIT}_00.zkey ${OUTPUT_DIR}/${CIRCUIT}_final.zkey --name="First contributor" -v -e="$ENTROPY"
 
 # 5. Gera proving key (${CIRCUIT}_final.zkey) e verification key
 snarkjs zkey export verificationkey ${OUTPUT_DIR}/${CIRCUIT}_final.zkey ${OUTPUT_DIR}/verification_key.json
 
-# 6. Limpeza de arquivos temporários
-rm -rf *.ptau *.r1cs *_00.zkey
+# 6. Os arquivos temporários são removidos com o diretório de trabalho
@@ -0,0 +1,134 @@
+# Cópias idênticas em model/code, server/code e user/code (cada contêiner monta apenas o próprio
+# diretório): altere as três juntas; tests/test_copias.py do Usuário confere que não divergem.
+import os
+import json
+import time
+import uuid
+import zlib
+import functools
+import threading
+from contextlib import contextmanager
+
+from enums import Tracing
+
+
+def novo_id():
+    return uuid.uuid4().hex[:16]
+
+
+def rastreado(nome):
+    """Registra cada chamada do método como um span do self.rastreamento do serviço"""
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltorio(self, *args, **kwargs):
+            with self.rastreamento.span(nome):
+                return metodo(self, *args, **kwargs)
+        return envoltorio
+    return decorador
+
+
+class Tracer:
+    """Rastreamento distribuído: spans gravados no formato Trace Event (JSON), visualizável como cascata
+
+    O contexto ({'trace_id', 'span_id'}) segue no campo 'trace' de cada mensagem; o serviço que a
+    recebe registra seus spans como filhos do span de origem. Cada serviço grava o próprio arquivo
+    (um evento por linha, com o colchete final omitido, como o formato permite) e merge_traces.py
+    os reúne para o Perfetto (ui.perfetto.dev) ou chrome://tracing.
+    """
+
+    def __init__(self, servico, arquivo=None, prefixo=''):
+        self.servico = servico
+        self.arquivo = Tracing.FILE.value if arquivo is None else arquivo
+        self.prefixo = prefixo # Prefixo colorido das mensagens do serviço
+        self.pid = zlib.crc32(servico.encode()) & 0xffff # Processo estável por serviço no arquivo reunido
+        self.contexto = threading.local()
+        self.trava = threading.Lock()
+        self.saida = None # Aberto no primeiro span gravado
+        self.erro = None
+
+    @property
+    def ativo(self):
+        return bool(self.arquivo) and self.erro is None
+
+    def definir_contexto(self, rastro):
+        """Contexto recebido na mensagem atendida por esta thread (None inicia um novo rastro)"""
+        self.contexto.pilha = [rastro] if rastro else []
+
+    def contexto_atual(self):
+        pilha = getattr(self.contexto, 'pilha', None)
+        return pilha[-1] if pilha else None
+
+    def abrir(self, nome, pai=None, inicio=None, **atributos):
+        """Span aberto em uma thread e fechado em outra (ex.: uma etapa da sessão do usuário)"""
+        pai = pai or self.contexto_atual()
+        return {
+            'nome': nome,
+            'trace_id': pai['trace_id'] if pai else uuid.uuid4().hex,
+            'span_id': novo_id(),
+            'parent_id': pai['span_id'] if pai else None,
+            'inicio': time.time() if inicio is None else inicio,
+            'atributos': atributos
+        }
+
+    def fechar(self, span, fim=None, **atributos):
+        if not self.ativo:
+            return
+        fim = time.time() if fim is None else fim
+        self.gravar({
+            'name': span['nome'],
+            'cat': self.servico,
+            'ph': 'X',
+            'ts': round(span['inicio'] * 1e6),
+            'dur': round((fim - span['inicio']) * 1e6),
+            'pid': self.pid,
+            'tid': threading.get_ident() & 0xffff,
+            'args': dict(span['atributos'], trace_id=span['trace_id'], span_id=span['span_id'],
+                         parent_id=span['parent_id'], **atributos)
+        })
+
+    def registrar(self, nome, inicio, fim, pai=None, **atributos):
+        """Span de um intervalo já medido (ex.: a etapa do lote que processou a solicitação), filho do span atual"""
+        self.fechar(self.abrir(nome, pai, inicio, **atributos), fim)
+
+    @contextmanager
+    def span(self, nome, **atributos):
+        """Span da thread atual; os spans abertos dentro dele são seus filhos"""
+        span = self.abrir(nome, **atributos)
+        pilha = getattr(self.contexto, 'pilha', None)
+        if pilha is None:
+            pilha = self.contexto.pilha = []
+        pilha.append(self.propagacao(span))
+        try:
+            yield span
+        finally:
+            pilha.pop()
+            self.fechar(span)
+
+    def propagacao(self, span=None):
+        """Contexto enviado no campo 'trace' das mensagens (o span informado ou o atual)"""
+        if span is not None:
+            return {'trace_id': span['trace_id'], 'span_id': span['span_id']}
+        return self.contexto_atual()
+
+    def gravar(self, evento):
+        with self.trava:
+            if self.saida is None and not self.abrir_arquivo():
+                return
+            self.saida.write(json.dumps(evento) + ',\n')
+            self.saida.flush()
+
+    def abrir_arquivo(self):
+        """Abre o arquivo de spans (chamado com a trava adquirida); desativa o rastreamento se não for possível"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.arquivo)), exist_ok=True)
+            novo = not os.path.exists(self.arquivo) or os.path.getsize(self.arquivo) == 0
+            self.saida = open(self.arquivo, 'a')
+        except OSError as e:
+            self.erro = e
+            print(self.prefixo + f"⚠️ Rastreamento desativado: {e}")
+            return False
+
+        if novo:
+            self.saida.write('[\n')
+        self.saida.write(json.dumps({'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': self.servico}}) + ',\n')
+        return True
@@ -0,0 +1,126 @@
+import time
+import socket
+import hashlib
+import threading
+
+from enums import Balancing, Color
+
+
+def ler_enderecos(replicas, host, port):
+    """Lista de (host, porta) das réplicas ('host:porta'); sem réplicas, o endereço único configurado"""
+    enderecos = []
+    for replica in replicas:
+        replica_host, _, replica_port = replica.rpartition(':')
+        enderecos.append((replica_host, int(replica_port)))
+    return enderecos or [(host, port)]
+
+
+class Replica:
+    """Uma instância de um serviço, com as solicitações em andamento e o estado de ejeção"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+        self.pendentes = 0
+        self.enviadas = 0
+        self.falhas = 0 # Falhas consecutivas
+        self.ejecoes = 0
+        self.ejetada_ate = 0.0
+
+    @property
+    def endereco(self):
+        return f"{self.host}:{self.port}"
+
+    def disponivel(self, agora):
+        return self.ejetada_ate <= agora
+
+
+class LoadBalancer:
+    """Distribui as solicitações de um serviço entre as réplicas, pela menor quantidade de solicitações em andamento
+
+    Réplicas com Balancing.EJECTION_FAILURES falhas consecutivas (conexão recusada, sessão sem
+    resposta ou verificação de saúde malsucedida) ficam fora da distribuição por EJECTION_TIME
+    segundos. Com 'fixa', as solicitações de uma mesma chave (ex.: o ID da identidade) seguem para
+    a mesma réplica enquanto ela estiver disponível (hashing de rendezvous).
+    """
+
+    def __init__(self, nome, enderecos, fixa=None):
+        self.nome = nome
+        self.replicas = [Replica(host, port) for host, port in enderecos]
+        self.fixa = Balancing.STICKY.value if fixa is None else fixa
+        self.trava = threading.Lock()
+
+    def escolher(self, preferida=None, chave=None, excluir=()):
+        """Reserva e retorna a réplica da próxima solicitação (None se todas já foram tentadas)"""
+        with self.trava:
+            restantes = [replica for replica in self.replicas if replica not in excluir]
+            agora = time.monotonic()
+            # Com todas as réplicas ejetadas, tenta mesmo assim em vez de recusar a solicitação
+            candidatas = [replica for replica in restantes if replica.disponivel(agora)] or restantes
+            if not candidatas:
+                return None
+
+            if preferida in candidatas:
+                escolhida = preferida
+            elif self.fixa and chave is not None:
+                escolhida = max(candidatas, key=lambda replica: hashlib.sha256(f"{chave}|{replica.endereco}".encode()).digest())
+            else:
+                escolhida = min(candidatas, key=lambda replica: (replica.pendentes, replica.enviadas))
+
+            escolhida.pendentes += 1
+            escolhida.enviadas += 1
+            return escolhida
+
+    def liberar(self, replica):
+        """A solicitação terminou (resposta recebida, falha no envio ou sessão encerrada)"""
+        with self.trava:
+            replica.pendentes = max(0, replica.pendentes - 1)
+
+    def registrar_sucesso(self, replica):
+        with self.trava:
+            replica.falhas = 0
+
+    def registrar_falha(self, replica, motivo, ejetar=False):
+        """Conta uma falha da réplica; com 'ejetar' (ex.: réplica fora do ar), ejeta sem aguardar as falhas consecutivas"""
+        with self.trava:
+            replica.falhas += 1
+            if not replica.disponivel(time.monotonic()):
+                return
+            if replica.falhas < Balancing.EJECTION_FAILURES.value and not ejetar:
+                return
+            replica.ejetada_ate = time.monotonic() + Balancing.EJECTION_TIME.value
+            replica.ejecoes += 1
+        print(Color.GREEN.value + f"⚠️ Réplica {replica.endereco} do {self.nome} ejetada por "
+              f"{Balancing.EJECTION_TIME.value:g} s ({motivo})")
+
+    def verificar_saude(self):
+        """Abre uma conexão com cada réplica; as que não aceitam conexões são ejetadas"""
+        for replica in self.replicas:
+            try:
+                with socket.create_connection((replica.host, replica.port), timeout=Balancing.HEALTH_TIMEOUT.value):
+                    pass
+            except OSError as e:
+                self.registrar_falha(replica, f"verificação de saúde: {e}", ejetar=True)
+                continue
+
+            # Uma réplica ejetada volta à distribuição apenas após o tempo de ejeção
+            self.registrar_sucesso(replica)
+
+    def verificar_periodicamente(self):
+        while True:
+            time.sleep(Balancing.HEALTH_INTERVAL.value)
+            self.verificar_saude()
+
+    def relatorio(self):
+        with self.trava:
+            agora = time.monotonic()
+            return {
+                replica.endereco: {
+                    'enviadas': replica.enviadas,
+                    'pendentes': replica.pendentes,
+                    'ejecoes': replica.ejecoes,
+                    'disponivel': replica.disponivel(agora)
+                }
+                for replica in self.replicas
+            }
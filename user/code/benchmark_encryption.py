@@ -0,0 +1,67 @@
+import sys
+import json
+import math
+import time
+import random
+
+from enums import Color
+from envelope import (criptografar_cbc, criptografar_gcm, criptografar_lote, descriptografar, descriptografar_cbc,
+                      descriptografar_lote, gerar_chave)
+
+
+QUANTIDADE = 1000 # Embeddings criptografadas por formato
+DIMENSOES = 512
+
+
+def embedding_sintetica(gerador, bits_fracao, dimensoes=DIMENSOES):
+    """Vetor unitário aleatório quantizado em ponto fixo, como as embeddings enviadas pelo modelo"""
+    vetor = [gerador.gauss(0, 1) for _ in range(dimensoes)]
+    norma = math.sqrt(sum(valor * valor for valor in vetor))
+    return [round(valor / norma * 2 ** bits_fracao) for valor in vetor]
+
+
+def medir(criptografar, descriptografar_pacote, chaves, embeddings):
+    inicio = time.perf_counter()
+    pacotes = [criptografar(chave, embedding) for chave, embedding in zip(chaves, embeddings)]
+    tempo_criptografia = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    abertas = [descriptografar_pacote(chave, pacote) for chave, pacote in zip(chaves, pacotes)]
+    tempo_descriptografia = time.perf_counter() - inicio
+
+    if abertas != embeddings:
+        raise ValueError("As embeddings descriptografadas não coincidem com as originais")
+
+    return {
+        'bytes': sum(len(json.dumps(pacote)) for pacote in pacotes) / len(pacotes),
+        'criptografia': tempo_criptografia / len(pacotes),
+        'descriptografia': tempo_descriptografia / len(pacotes)
+    }
+
+
+if __name__ == "__main__":
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else QUANTIDADE
+    bits = [int(argumento) for argumento in sys.argv[2:]] or [16]
+
+    gerador = random.Random(5448)
+    chaves = [gerar_chave() for _ in range(quantidade)]
+
+    print(Color.GREEN.value + f" Embeddings: {quantidade} de {DIMENSOES} dimensões; tamanho do pacote JSON enviado ao servidor")
+    print(Color.GREEN.value + " BITS | FORMATO    | PACOTE (bytes) | CRIPTOGRAFIA (µs) | DESCRIPTOGRAFIA (µs)")
+    for bits_fracao in bits:
+        embeddings = [embedding_sintetica(gerador, bits_fracao) for _ in range(quantidade)]
+        formatos = {
+            'cbc/json': medir(criptografar_cbc, descriptografar_cbc, chaves, embeddings),
+            'gcm/bin': medir(criptografar_gcm, descriptografar, chaves, embeddings)
+        }
+        for formato, dados in formatos.items():
+            print(Color.GREEN.value + f" {bits_fracao:>4} | {formato:<10} | {dados['bytes']:>14.0f} | "
+                  f"{dados['criptografia'] * 1e6:>17.1f} | {dados['descriptografia'] * 1e6:>20.1f}")
+
+        # Os templates antigos (CBC) continuam legíveis pela API em lote
+        legados = [criptografar_cbc(chaves[0], embedding) for embedding in embeddings[:3]]
+        if descriptografar_lote(chaves[0], legados + criptografar_lote(chaves[:1] * 3, embeddings[:3])) != embeddings[:3] * 2:
+            print(Color.GREEN.value + "❌ Falha ao ler templates nos dois formatos")
+            sys.exit(1)
+
+    print(Color.GREEN.value + " ✅ Os dois formatos são lidos pela mesma API de descriptografia")
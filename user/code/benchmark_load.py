@@ -0,0 +1,349 @@
+import os
+import sys
+import json
+import time
+import random
+import threading
+from io import BytesIO
+from contextlib import redirect_stdout
+
+from PIL import Image
+
+from enums import Color
+from harness import configurar_alvo, ler_parametros, validar_alvo
+from session import Session
+from standins import ALTURA, LARGURA
+
+
+# Parâmetros no formato chave=valor; os omitidos seguem estes valores
+PADRAO = {
+    'alvo': 'local',          # local: stand-ins do modelo e do servidor; servicos: contêineres configurados em Addresses
+    'modo': 'fechado',        # fechado: cada cliente aguarda a resposta; aberto: chegadas de Poisson na taxa dada
+    'concorrencia': 8,        # clientes no modo fechado; máximo de sessões em andamento no modo aberto
+    'taxa': 5.0,              # chegadas por segundo (modo aberto)
+    'duracao': 30.0,          # segundos de geração de carga
+    'operacoes': 0,           # limite de operações (0: apenas a duração)
+    'autenticacao': 0.7,      # fração de autenticações (as demais são registros)
+    'impostores': 0.0,        # fração das autenticações feitas com a foto de outra pessoa
+    'corpus': '',             # diretório com um subdiretório por pessoa; vazio: corpus sintético
+    'pessoas': 50,            # pessoas do corpus sintético
+    'fotos': 3,               # fotos por pessoa do corpus sintético
+    'ruido': 20.0,            # desvio do ruído entre fotos da mesma pessoa no corpus sintético
+    'lado': 256,              # maior lado das imagens do corpus sintético (px)
+    'embedding_ms': 0.0,      # latência simulada da geração de embedding (stand-in)
+    'prova_ms': 0.0,          # latência simulada da prova (stand-in)
+    'verificacao_ms': 0.0,    # latência simulada da verificação (stand-in)
+    'consulta_ms': 0.0,       # latência simulada da busca dos templates no servidor (stand-in)
+    'fluxo': 'pipelined',     # autenticação pipelined (foto enviada ao modelo no início) ou sequential
+    'cache': 256,             # identidades com templates em cache no Usuário (0 desativa)
+    'provers': 4,             # provas simultâneas em cada réplica do stand-in do modelo
+    'replicas_modelo': 1,     # réplicas do stand-in do modelo
+    'replicas_servidor': 1,   # réplicas do stand-in do servidor (mesmo banco em memória)
+    'porta': 18000,           # portas locais: servidor, usuário (+1) e modelo (+2); réplica i soma 10 * i
+    'timeout': 120.0,         # segundos até uma sessão sem resposta contar como erro
+    'saida': 'load_report.json',
+    'rastro': '',             # arquivo de spans do Usuário (vazio desativa; ver merge_traces.py)
+    'semente': 5448,
+    'verbose': 0              # 1 mantém as mensagens de cada sessão
+}
+
+ETAPAS = ['registro', 'autenticacao', 'embedding', 'armazenamento', 'preparacao', 'ingredientes', 'prova', 'verificacao']
+
+
+def codificar(imagem):
+    buffer = BytesIO()
+    imagem.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def corpus_sintetico(pessoas, fotos, ruido, lado, gerador):
+    """Cada pessoa é um padrão aleatório; cada foto é o padrão com ruído, ampliado e codificado em JPEG"""
+    corpus = []
+    for _ in range(pessoas):
+        padrao = [gerador.randrange(256) for _ in range(LARGURA * ALTURA)]
+        imagens = []
+        for _ in range(fotos):
+            pixels = [min(255, max(0, round(valor + gerador.gauss(0, ruido)))) for valor in padrao]
+            imagem = Image.new('L', (LARGURA, ALTURA))
+            imagem.putdata(pixels)
+            imagem = imagem.resize((lado, lado * ALTURA // LARGURA), Image.NEAREST).convert('RGB')
+            imagens.append(codificar(imagem))
+        corpus.append(imagens)
+    return corpus
+
+
+def carregar_corpus(diretorio):
+    """Fotos do diretório agrupadas por subdiretório (uma pessoa por subdiretório)
+
+    Os bytes originais dos arquivos são mantidos, de modo que a carga passa pelo mesmo preparo
+    da foto (envio sem recodificação, quando possível) que as fotos reais; arquivos que não
+    são imagens são ignorados.
+    """
+    corpus = []
+    for raiz, _, arquivos in sorted(os.walk(diretorio)):
+        imagens = []
+        for nome in sorted(arquivos):
+            try:
+                with open(os.path.join(raiz, nome), 'rb') as arquivo:
+                    dados = arquivo.read()
+                Image.open(BytesIO(dados)).verify()
+            except Exception:
+                continue
+            imagens.append(dados)
+        if imagens:
+            corpus.append(imagens)
+    return corpus
+
+
+def percentil(valores, p):
+    """Percentil com interpolação linear entre as amostras ordenadas"""
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+def resumo_latencias(valores):
+    if not valores:
+        return {'amostras': 0}
+    return {
+        'amostras': len(valores),
+        'media': sum(valores) / len(valores),
+        'p50': percentil(valores, 50),
+        'p95': percentil(valores, 95),
+        'p99': percentil(valores, 99),
+        'max': max(valores)
+    }
+
+
+class LoadGenerator:
+    """Gera registros e autenticações concorrentes pelo motor de sessões do Usuário"""
+
+    def __init__(self, user, corpus, parametros):
+        self.user = user
+        self.corpus = corpus
+        self.parametros = parametros
+
+        self.gerador = random.Random(parametros['semente'])
+        self.trava = threading.Lock()
+
+        # Identidades registradas durante a carga: (pessoa, chave simétrica, ID)
+        self.registradas = []
+        self.resultados = []
+        self.iniciadas = 0
+        self.descartadas = 0
+        self.em_andamento = 0
+        self.inicio = None
+        self.fim = None
+
+    def sortear(self):
+        """Escolhe a operação e as fotos; autentica apenas identidades já registradas"""
+        with self.trava:
+            if self.registradas and self.gerador.random() < self.parametros['autenticacao']:
+                pessoa, chave, user_id = self.gerador.choice(self.registradas)
+                impostor = len(self.corpus) > 1 and self.gerador.random() < self.parametros['impostores']
+                if impostor:
+                    outra = self.gerador.choice([indice for indice in range(len(self.corpus)) if indice != pessoa])
+                    foto = self.gerador.choice(self.corpus[outra])
+                else:
+                    foto = self.gerador.choice(self.corpus[pessoa][1:] or self.corpus[pessoa])
+                return 'autenticacao', Session(foto_autenticacao=foto, chave_simetrica=chave, user_id=user_id), pessoa, impostor
+
+            pessoa = self.gerador.randrange(len(self.corpus))
+            return 'registro', Session(foto_registro=self.corpus[pessoa][0]), pessoa, False
+
+    def executar_operacao(self):
+        operacao, sessao, pessoa, impostor = self.sortear()
+        inicio = time.perf_counter()
+
+        if operacao == 'registro':
+            self.user.iniciar_registro(sessao)
+        else:
+            self.user.iniciar_autenticacao(sessao)
+
+        if not sessao.aguardar(self.parametros['timeout']):
+            self.user.encerrar_sessao(sessao, 'Tempo esgotado aguardando resposta')
+        fim = time.perf_counter()
+
+        with self.trava:
+            if operacao == 'registro' and sessao.erro is None:
+                self.registradas.append((pessoa, sessao.chave_simetrica, sessao.user_id))
+            self.resultados.append({
+                'operacao': operacao,
+                'inicio': inicio - self.inicio,
+                'latencia': fim - inicio,
+                'erro': sessao.erro,
+                'autenticado': sessao.autenticado,
+                'impostor': impostor,
+                'tempos': dict(sessao.tempos),
+                'bytes_upload': sessao.bytes_upload,
+                'cpu_upload': sessao.cpu_upload
+            })
+
+    def reservar(self):
+        """Conta uma nova operação, respeitando a duração e o limite de operações"""
+        with self.trava:
+            limite = self.parametros['operacoes']
+            if time.perf_counter() - self.inicio >= self.parametros['duracao'] or (limite and self.iniciadas >= limite):
+                return False
+            self.iniciadas += 1
+            return True
+
+    def cliente_fechado(self):
+        while self.reservar():
+            self.executar_operacao()
+
+    def operacao_aberta(self):
+        try:
+            self.executar_operacao()
+        finally:
+            with self.trava:
+                self.em_andamento -= 1
+
+    def executar(self):
+        self.inicio = time.perf_counter()
+        threads = []
+
+        if self.parametros['modo'] == 'fechado':
+            for _ in range(self.parametros['concorrencia']):
+                thread = threading.Thread(target=self.cliente_fechado)
+                thread.start()
+                threads.append(thread)
+        else:
+            # Chegadas independentes das respostas; acima da concorrência máxima a chegada é descartada
+            proxima = self.inicio
+            while self.reservar():
+                proxima += self.gerador.expovariate(self.parametros['taxa'])
+                time.sleep(max(0.0, proxima - time.perf_counter()))
+                with self.trava:
+                    if self.em_andamento >= self.parametros['concorrencia']:
+                        self.descartadas += 1
+                        continue
+                    self.em_andamento += 1
+                thread = threading.Thread(target=self.operacao_aberta)
+                thread.start()
+                threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+        self.fim = time.perf_counter()
+
+    def relatorio(self):
+        duracao = self.fim - self.inicio
+        operacoes = {}
+        erros = {}
+
+        for operacao in ('registro', 'autenticacao'):
+            resultados = [resultado for resultado in self.resultados if resultado['operacao'] == operacao]
+            sucesso = [resultado for resultado in resultados if resultado['erro'] is None]
+            dados = {
+                'total': len(resultados),
+                'sucesso': len(sucesso),
+                'erros': len(resultados) - len(sucesso),
+                'taxa_erro': (len(resultados) - len(sucesso)) / len(resultados) if resultados else 0.0,
+                'vazao': len(sucesso) / duracao,
+                'latencia': resumo_latencias([resultado['latencia'] for resultado in sucesso])
+            }
+            if operacao == 'autenticacao':
+                dados['aceitas'] = sum(1 for resultado in sucesso if resultado['autenticado'])
+                dados['falsas_aceitacoes'] = sum(1 for resultado in sucesso if resultado['autenticado'] and resultado['impostor'])
+                dados['falsas_rejeicoes'] = sum(1 for resultado in sucesso if not resultado['autenticado'] and not resultado['impostor'])
+            operacoes[operacao] = dados
+
+        for resultado in self.resultados:
+            if resultado['erro'] is not None:
+                erros[resultado['erro']] = erros.get(resultado['erro'], 0) + 1
+
+        concluidas = sum(dados['sucesso'] for dados in operacoes.values())
+        return {
+            'parametros': self.parametros,
+            'duracao': duracao,
+            'vazao': concluidas / duracao,
+            'taxa_erro': 1 - concluidas / len(self.resultados) if self.resultados else 0.0,
+            'descartadas': self.descartadas,
+            'operacoes': operacoes,
+            'etapas': {
+                etapa: resumo_latencias([resultado['tempos'][etapa] for resultado in self.resultados if etapa in resultado['tempos']])
+                for etapa in ETAPAS
+            },
+            'upload': {
+                'bytes_medio': sum(resultado['bytes_upload'] for resultado in self.resultados) / len(self.resultados) if self.resultados else 0,
+                'cpu_medio': sum(resultado['cpu_upload'] for resultado in self.resultados) / len(self.resultados) if self.resultados else 0.0
+            },
+            'cache_templates': self.user.cache_templates.relatorio(),
+            'replicas': {
+                'modelo': self.user.modelo.relatorio(),
+                'servidor': self.user.servidor.relatorio()
+            },
+            'erros': erros
+        }
+
+
+def imprimir_relatorio(relatorio):
+    print(Color.GREEN.value + f" Duração: {relatorio['duracao']:.1f} s, Vazão: {relatorio['vazao']:.2f} op/s, "
+          f"Erros: {relatorio['taxa_erro'] * 100:.1f}%, Descartadas: {relatorio['descartadas']}")
+    print(Color.GREEN.value + f" Upload por operação: {relatorio['upload']['bytes_medio'] / 1024:.1f} KiB, "
+          f"CPU no cliente: {relatorio['upload']['cpu_medio'] * 1000:.2f} ms")
+    for servico, replicas in relatorio['replicas'].items():
+        if len(replicas) > 1:
+            print(Color.GREEN.value + f" Réplicas do {servico}: " + ", ".join(
+                f"{endereco} {dados['enviadas']} enviada(s)" + (f" ({dados['ejecoes']} ejeção(ões))" if dados['ejecoes'] else '')
+                for endereco, dados in replicas.items()))
+    cache = relatorio['cache_templates']
+    print(Color.GREEN.value + f" Templates em cache: {cache['acertos']} acerto(s), {cache['faltas']} falta(s) "
+          f"({cache['taxa_acerto'] * 100:.1f}%), {cache['invalidadas']} invalidada(s)")
+    print(Color.GREEN.value + " OPERAÇÃO     | TOTAL | ERROS (%) | VAZÃO (op/s) | P50 (ms) | P95 (ms) | P99 (ms)")
+    for operacao, dados in relatorio['operacoes'].items():
+        latencia = dados['latencia']
+        if not latencia['amostras']:
+            continue
+        print(Color.GREEN.value + f" {operacao:<12} | {dados['total']:>5} | {dados['taxa_erro'] * 100:>9.1f} | "
+              f"{dados['vazao']:>12.2f} | {latencia['p50'] * 1000:>8.1f} | {latencia['p95'] * 1000:>8.1f} | "
+              f"{latencia['p99'] * 1000:>8.1f}")
+    print(Color.GREEN.value + " ETAPA         | AMOSTRAS | P50 (ms) | P95 (ms) | P99 (ms)")
+    for etapa, latencia in relatorio['etapas'].items():
+        if not latencia['amostras']:
+            continue
+        print(Color.GREEN.value + f" {etapa:<13} | {latencia['amostras']:>8} | {latencia['p50'] * 1000:>8.1f} | "
+              f"{latencia['p95'] * 1000:>8.1f} | {latencia['p99'] * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    try:
+        parametros = ler_parametros(sys.argv[1:], PADRAO)
+        validar_alvo(parametros)
+    except ValueError as e:
+        print(Color.GREEN.value + f"❌ {e}")
+        print("Uso: python3 benchmark_load.py [chave=valor ...] (ver PADRAO em benchmark_load.py)")
+        sys.exit(1)
+
+    gerador = random.Random(parametros['semente'])
+    if parametros['corpus']:
+        corpus = carregar_corpus(parametros['corpus'])
+    else:
+        corpus = corpus_sintetico(parametros['pessoas'], parametros['fotos'], parametros['ruido'], parametros['lado'], gerador)
+    if not corpus:
+        print(Color.GREEN.value + f"❌ Nenhuma imagem encontrada em {parametros['corpus']}")
+        sys.exit(1)
+
+    user, servicos = configurar_alvo(parametros)
+    carga = LoadGenerator(user, corpus, parametros)
+
+    print(Color.GREEN.value + f" Gerando carga ({parametros['modo']}, {parametros['alvo']}) com {len(corpus)} pessoa(s)...")
+    if parametros['verbose']:
+        carga.executar()
+    else:
+        # As mensagens de cada sessão distorceriam as latências medidas
+        with open(os.devnull, 'w') as descarte, redirect_stdout(descarte):
+            carga.executar()
+
+    for servico in servicos:
+        servico.encerrar()
+
+    relatorio = carga.relatorio()
+    with open(parametros['saida'], 'w') as arquivo:
+        json.dump(relatorio, arquivo, indent=2)
+
+    imprimir_relatorio(relatorio)
+    print(Color.GREEN.value + f" Relatório salvo em: {parametros['saida']}")
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import time
+import base64
+from io import BytesIO
+
+from PIL import Image
+
+from enums import Color
+from protocol import codificar
+from upload import preparar_upload
+
+
+def envio_anterior(caminho):
+    """Caminho anterior: decodifica, recodifica em JPEG e envia em base64 dentro do JSON"""
+    imagem = Image.open(caminho)
+    buffer = BytesIO()
+    imagem.save(buffer, format='JPEG')
+    return json.dumps({'type': 'generate_embedding', 'data': base64.b64encode(buffer.getvalue()).decode()}).encode()
+
+
+def envio_atual(caminho):
+    """Bytes originais (ou reduzidos no cliente) como anexo binário"""
+    dados, _ = preparar_upload(caminho)
+    return codificar({'type': 'generate_embedding', 'data': dados})
+
+
+def medir(funcao, caminhos, repeticoes):
+    tamanhos = []
+    inicio = time.process_time()
+    for _ in range(repeticoes):
+        tamanhos = [len(funcao(caminho)) for caminho in caminhos]
+    cpu = (time.process_time() - inicio) / (repeticoes * len(caminhos))
+    return cpu, sum(tamanhos) / len(tamanhos)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python3 benchmark_upload.py [DIRETÓRIO DE IMAGENS] [REPETIÇÕES]")
+        sys.exit(1)
+
+    diretorio = sys.argv[1]
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    caminhos = [
+        os.path.join(raiz, nome) for raiz, _, arquivos in sorted(os.walk(diretorio)) for nome in sorted(arquivos)
+        if nome.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.bmp'))
+    ]
+    if not caminhos:
+        print(Color.GREEN.value + f"❌ Nenhuma imagem encontrada em {diretorio}")
+        sys.exit(1)
+
+    modos = {}
+    for caminho in caminhos:
+        modo = preparar_upload(caminho)[1]
+        modos[modo] = modos.get(modo, 0) + 1
+
+    print(Color.GREEN.value + f" {len(caminhos)} imagem(ns): " + ", ".join(f"{quantidade} {modo}" for modo, quantidade in modos.items()))
+    print(Color.GREEN.value + " ENVIO                      | CPU POR IMAGEM (ms) | MENSAGEM (KiB)")
+    for nome, funcao in (('anterior (JPEG + base64)', envio_anterior), ('atual (binário)', envio_atual)):
+        cpu, tamanho = medir(funcao, caminhos, repeticoes)
+        print(Color.GREEN.value + f" {nome:<26} | {cpu * 1000:>19.2f} | {tamanho / 1024:>14.1f}")
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import base64
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from enums import Color
+from harness import configurar_alvo, ler_parametros, validar_alvo
+from session import BatchSession
+from upload import preparar_upload
+
+
+# Parâmetros no formato chave=valor; os omitidos seguem estes valores
+PADRAO = {
+    'entrada': '',                  # diretório de imagens (recursivo) ou manifesto com um caminho por linha
+    'saida': 'enrollment.jsonl',    # mapeamento arquivo -> ID, também usado como checkpoint
+    'chaves': '',                   # arquivo (0600) com as chaves simétricas exportadas; vazio: as chaves são descartadas
+    'lote': 32,                     # fotos por solicitação ao modelo e ao servidor
+    'lotes_simultaneos': 4,         # lotes em andamento ao mesmo tempo
+    'leitores': 8,                  # threads de leitura e codificação das imagens
+    'timeout': 300.0,               # segundos até um lote sem resposta contar como falha
+    'alvo': 'servicos',             # servicos: contêineres configurados em Addresses; local: stand-ins
+    'porta': 18000,                 # portas dos stand-ins (alvo local)
+    'embedding_ms': 0.0,
+    'prova_ms': 0.0,
+    'verificacao_ms': 0.0,
+    'provers': 1
+}
+
+EXTENSOES = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def listar_imagens(entrada):
+    """Imagens do diretório (em ordem) ou caminhos do manifesto (relativos ao diretório do manifesto)"""
+    if os.path.isdir(entrada):
+        return [
+            os.path.join(raiz, nome)
+            for raiz, _, arquivos in sorted(os.walk(entrada))
+            for nome in sorted(arquivos) if nome.lower().endswith(EXTENSOES)
+        ]
+
+    base = os.path.dirname(os.path.abspath(entrada))
+    with open(entrada) as manifesto:
+        linhas = [linha.strip() for linha in manifesto]
+    return [os.path.join(base, linha) for linha in linhas if linha and not linha.startswith('#')]
+
+
+def ler_checkpoint(saida):
+    """Arquivos já registrados em execuções anteriores (as falhas são tentadas novamente)"""
+    registrados = set()
+    if os.path.isfile(saida):
+        with open(saida) as arquivo:
+            for linha in arquivo:
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    continue # Linha incompleta de uma execução interrompida
+                if registro.get('user_id') is not None:
+                    registrados.add(registro['arquivo'])
+    return registrados
+
+
+def abrir_chaves(caminho):
+    """Abre o arquivo de chaves para acréscimo, legível apenas pelo dono (0600), ou None sem exportação"""
+    if not caminho:
+        return None
+    descritor = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+    # O modo de criação não altera um arquivo existente
+    os.fchmod(descritor, 0o600)
+    return os.fdopen(descritor, 'a')
+
+
+def carregar_foto(caminho):
+    """Bytes da foto prontos para envio (originais ou reduzidos); None se não puder ser lida"""
+    try:
+        return preparar_upload(caminho)[0]
+    except Exception:
+        return None
+
+
+def agrupar(itens, tamanho):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+class BulkEnrollment:
+    """Registra um diretório de fotos em lotes, com leitura paralela e vários lotes em andamento"""
+
+    def __init__(self, user, parametros):
+        self.user = user
+        self.parametros = parametros
+        self.registradas = 0
+        self.falhas = 0
+        self.inicio = None
+
+    def registrar_lote(self, caminhos, fotos):
+        sessao = BatchSession(fotos)
+        self.user.iniciar_registro_lote(sessao)
+
+        if not sessao.aguardar(self.parametros['timeout']):
+            self.user.encerrar_sessao(sessao, 'Tempo esgotado aguardando resposta')
+
+        registros = []
+        chaves = []
+        for indice, caminho in enumerate(caminhos):
+            user_id = sessao.user_ids[indice]
+            if sessao.erro is None and user_id is not None:
+                registros.append({'arquivo': caminho, 'user_id': user_id})
+                # A chave simétrica é necessária para autenticar a pessoa posteriormente
+                chaves.append({
+                    'user_id': user_id,
+                    'chave': base64.b64encode(sessao.chaves[indice]).decode()
+                })
+            else:
+                registros.append({'arquivo': caminho, 'erro': sessao.erro or sessao.erros[indice]})
+        return registros, chaves
+
+    def gravar(self, saida, arquivo_chaves, resultado, total):
+        registros, chaves = resultado
+
+        # As chaves são gravadas antes do mapeamento: uma foto registrada no checkpoint sempre tem a sua chave
+        if arquivo_chaves is not None:
+            for chave in chaves:
+                arquivo_chaves.write(json.dumps(chave) + '\n')
+            arquivo_chaves.flush()
+            os.fsync(arquivo_chaves.fileno())
+
+        for registro in registros:
+            saida.write(json.dumps(registro) + '\n')
+        saida.flush()
+        os.fsync(saida.fileno())
+
+        self.registradas += sum(1 for registro in registros if 'user_id' in registro)
+        self.falhas += sum(1 for registro in registros if 'erro' in registro)
+
+        feitas = self.registradas + self.falhas
+        decorrido = time.perf_counter() - self.inicio
+        vazao = feitas / decorrido if decorrido else 0.0
+        restante = (total - feitas) / vazao if vazao else 0.0
+        print(Color.GREEN.value + f" {feitas}/{total} foto(s) - {vazao:.1f} foto/s, {self.falhas} falha(s), "
+              f"restante estimado: {restante:.0f} s")
+
+    def executar(self, caminhos):
+        self.inicio = time.perf_counter()
+        lote = self.parametros['lote']
+        simultaneos = self.parametros['lotes_simultaneos']
+
+        with open(self.parametros['saida'], 'a') as saida, \
+                abrir_chaves(self.parametros['chaves']) or nullcontext() as arquivo_chaves, \
+                ThreadPoolExecutor(self.parametros['leitores']) as leitura, \
+                ThreadPoolExecutor(simultaneos) as envio:
+            pendentes = set()
+
+            # O próximo lote é lido enquanto os anteriores estão no modelo e no servidor;
+            # no máximo lotes_simultaneos + 1 lotes ficam em memória
+            for grupo in agrupar(caminhos, lote):
+                fotos = list(leitura.map(carregar_foto, grupo))
+
+                while len(pendentes) >= simultaneos:
+                    concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for futuro in concluidos:
+                        self.gravar(saida, arquivo_chaves, futuro.result(), len(caminhos))
+
+                pendentes.add(envio.submit(self.registrar_lote, grupo, fotos))
+
+            for futuro in pendentes:
+                self.gravar(saida, arquivo_chaves, futuro.result(), len(caminhos))
+
+        return time.perf_counter() - self.inicio
+
+
+if __name__ == "__main__":
+    try:
+        parametros = ler_parametros(sys.argv[1:], PADRAO)
+        if not parametros['entrada']:
+            raise ValueError("Informe entrada=DIRETÓRIO ou entrada=MANIFESTO")
+        validar_alvo(parametros)
+    except ValueError as e:
+        print(Color.GREEN.value + f"❌ {e}")
+        print("Uso: python3 bulk_enroll.py entrada=[DIRETÓRIO OU MANIFESTO] [chave=valor ...] (ver PADRAO em bulk_enroll.py)")
+        sys.exit(1)
+
+    if not parametros['chaves']:
+        print(Color.GREEN.value + "⚠️ Sem chaves=ARQUIVO, as chaves simétricas não são exportadas e as pessoas registradas não poderão se autenticar")
+
+    caminhos = listar_imagens(parametros['entrada'])
+    registrados = ler_checkpoint(parametros['saida'])
+    restantes = [caminho for caminho in caminhos if caminho not in registrados]
+    print(Color.GREEN.value + f" {len(caminhos)} foto(s) encontrada(s), {len(caminhos) - len(restantes)} já registrada(s) em {parametros['saida']}")
+
+    user, servicos = configurar_alvo(parametros)
+    cadastro = BulkEnrollment(user, parametros)
+    duracao = cadastro.executar(restantes)
+
+    for servico in servicos:
+        servico.encerrar()
+
+    print(Color.GREEN.value + f" Registro em lote concluído: {cadastro.registradas} registrada(s), {cadastro.falhas} falha(s) "
+          f"em {duracao:.1f} s ({len(restantes) / duracao if duracao else 0:.1f} foto/s)")
+    print(Color.GREEN.value + f" Mapeamento salvo em: {parametros['saida']}")
+    if parametros['chaves']:
+        print(Color.GREEN.value + f" Chaves simétricas salvas em: {parametros['chaves']} (0600)")
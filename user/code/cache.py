@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from enums import Cache, Color
+
+
+class TemplateCache:
+    """Cache local dos templates criptografados de cada identidade, indexado pelo ID do usuário
+
+    Guarda os templates como vieram do servidor (ainda criptografados), as referências aos
+    arquivos do trusted setup, a versão do circuito e a versão dos templates. As entradas
+    expiram após o TTL; as despejadas da memória são gravadas em disco se Cache.SPILL_DIR
+    estiver configurado. O servidor confere a versão dos templates na verificação da prova,
+    então um template desatualizado nunca produz uma autenticação bem-sucedida.
+    """
+
+    def __init__(self, max_entradas=None, ttl=None, diretorio=None):
+        self.max_entradas = Cache.MAX_ENTRIES.value if max_entradas is None else max_entradas
+        self.ttl = Cache.TTL.value if ttl is None else ttl
+        self.diretorio = Cache.SPILL_DIR.value if diretorio is None else diretorio
+
+        self.entradas = OrderedDict()
+        self.trava = threading.Lock()
+
+        self.acertos = 0
+        self.faltas = 0
+        self.invalidadas = 0
+
+        if self.ativo and self.diretorio:
+            os.makedirs(self.diretorio, exist_ok=True)
+
+    @property
+    def ativo(self):
+        return self.max_entradas > 0 and self.ttl > 0
+
+    def caminho(self, user_id):
+        # O nome do arquivo não revela o ID da identidade
+        return os.path.join(self.diretorio, hashlib.sha256(str(user_id).encode()).hexdigest() + '.json')
+
+    def obter(self, user_id):
+        """Retorna os ingredientes da prova armazenados para a identidade, ou None"""
+        if not self.ativo:
+            return None
+
+        with self.trava:
+            entrada = self.entradas.get(user_id)
+            if entrada is None:
+                entrada = self.ler_disco(user_id)
+
+            if entrada is not None and time.time() - entrada['gravado_em'] > self.ttl:
+                self.remover(user_id)
+                entrada = None
+
+            if entrada is None:
+                self.faltas += 1
+                return None
+
+            self.entradas[user_id] = entrada
+            self.entradas.move_to_end(user_id)
+            self.despejar()
+            self.acertos += 1
+            return entrada['ingredientes']
+
+    def armazenar(self, user_id, ingredientes):
+        """Armazena os ingredientes recebidos do servidor (apenas os que informam a versão dos templates)"""
+        if not self.ativo or ingredientes.get('template_version') is None:
+            return
+
+        entrada = {'ingredientes': ingredientes, 'gravado_em': time.time()}
+        with self.trava:
+            self.entradas[user_id] = entrada
+            self.entradas.move_to_end(user_id)
+            self.despejar()
+
+    def invalidar(self, user_id):
+        """Descarta a entrada da identidade (templates alterados ou rejeitados pelo servidor)"""
+        with self.trava:
+            if self.remover(user_id):
+                self.invalidadas += 1
+
+    def limpar(self):
+        with self.trava:
+            for user_id in list(self.entradas):
+                self.remover(user_id)
+            if self.diretorio and os.path.isdir(self.diretorio):
+                for nome in os.listdir(self.diretorio):
+                    if nome.endswith('.json'):
+                        os.remove(os.path.join(self.diretorio, nome))
+
+    def remover(self, user_id):
+        removida = self.entradas.pop(user_id, None) is not None
+        if self.diretorio:
+            try:
+                os.remove(self.caminho(user_id))
+                removida = True
+            except FileNotFoundError:
+                pass
+        return removida
+
+    def despejar(self):
+        """Mantém até max_entradas em memória; as excedentes vão para o disco, se configurado"""
+        while len(self.entradas) > self.max_entradas:
+            user_id, entrada = self.entradas.popitem(last=False)
+            if self.diretorio:
+                self.gravar_disco(user_id, entrada)
+
+    def gravar_disco(self, user_id, entrada):
+        caminho = self.caminho(user_id)
+        try:
+            with open(caminho + '.tmp', 'w') as arquivo:
+                json.dump(entrada, arquivo)
+            os.replace(caminho + '.tmp', caminho)
+        except OSError as e:
+            print(Color.GREEN.value + f"⚠️ Não foi possível gravar templates em cache no disco: {e}")
+
+    def ler_disco(self, user_id):
+        if not self.diretorio:
+            return None
+        try:
+            with open(self.caminho(user_id)) as arquivo:
+                return json.load(arquivo)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def relatorio(self):
+        with self.trava:
+            consultas = self.acertos + self.faltas
+            return {
+                'entradas': len(self.entradas),
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'invalidadas': self.invalidadas
+            }
@@ -15,10 +15,71 @@ class Addresses(Enum):
     MODEL_HOST = 'model-container'
     MODEL_PORT = 8002
 
+    # Réplicas de cada serviço ('host:porta'); vazio usa apenas o endereço acima
+    SERVER_REPLICAS = ()
+    MODEL_REPLICAS = ()
+
 class ImagePath(Enum):
     FACE_IMAGE_REG = '/home/user/faces/1.jpeg'
     FACE_IMAGE_AUT = '/home/user/faces/2.jpeg'
 
-class Benchmark:
-    REGISTRATION_TIME = 0
-    AUTHENTICATION_TIME = 0
+    # Templates adicionais da mesma identidade (ex.: com óculos, barba ou outra iluminação)
+    # Limitados a Circuit.ENROLLED_TEMPLATES - 1 no servidor
+    FACE_IMAGES_EXTRA = ()
+
+class Sessions(Enum):
+    # Sessões de demonstração (registro seguido de autenticação) executadas simultaneamente
+    CONCURRENT = 1
+
+    # Intervalo entre o fim do registro e o início da autenticação (segundos)
+    AUTHENTICATION_DELAY = 3.0
+
+    # Sessões sem resposta após este tempo são encerradas com erro (segundos)
+    TIMEOUT = 300
+
+class Encryption(Enum):
+    # gcm: envelope AES-256-GCM com a embedding empacotada em binário; cbc: formato anterior (JSON com AES-CBC)
+    # Os dois formatos são sempre aceitos na descriptografia
+    FORMAT = 'gcm'
+
+class Upload(Enum):
+    # Formatos enviados sem recodificação (os bytes originais); os demais são recodificados em JPEG
+    FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+    # Fotos com o maior lado acima deste valor são reduzidas no cliente antes do envio; 0 nunca reduz
+    # Deve coincidir com Preprocessing.CROP_SIZE em model/code/enums.py (resolução da qual a face é recortada)
+    MAX_SIDE = 1280
+
+    # Qualidade JPEG das fotos reduzidas ou recodificadas
+    QUALITY = 90
+
+class Cache(Enum):
+    # Templates criptografados mantidos em memória para autenticações repetidas no mesmo dispositivo; 0 desativa
+    MAX_ENTRIES = 256
+
+    # Tempo (em segundos) que os templates permanecem em cache após serem recebidos do servidor
+    TTL = 600
+
+    # Diretório onde as entradas despejadas da memória são gravadas (ainda criptografadas); vazio mantém apenas em memória
+    SPILL_DIR = ''
+
+class Balancing(Enum):
+    # Intervalo (em segundos) entre as verificações de saúde das réplicas e tempo máximo de cada conexão
+    HEALTH_INTERVAL = 5
+    HEALTH_TIMEOUT = 1.0
+
+    # Falhas consecutivas (conexão recusada ou sessão sem resposta) que ejetam a réplica, e por quanto tempo (segundos)
+    EJECTION_FAILURES = 3
+    EJECTION_TIME = 30
+
+    # Solicitações de uma mesma identidade sempre para a mesma réplica disponível (localidade dos caches do modelo)
+    STICKY = False
+
+class Authentication(Enum):
+    # pipelined: a foto de autenticação é enviada ao modelo no início, e a embedding é calculada enquanto
+    # os templates são buscados no servidor e descriptografados; a prova aguarda as duas etapas
+    # sequential: a foto segue junto com a solicitação de prova, após a resposta do servidor
+    MODE = 'pipelined'
+
+class Tracing(Enum):
+    FILE = '' # Spans no formato Trace Event (JSON), reunidos com user/code/merge_traces.py (ex.: '/home/user/traces/user.json'); vazio desativa. O arquivo cresce sem limite enquanto ativo
@@ -0,0 +1,140 @@
+import json
+import base64
+import struct
+
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+from Crypto.Util.Padding import pad, unpad
+
+from enums import Encryption
+
+
+VERSAO_GCM = 2 # Primeiro byte do envelope; autenticado como dado associado
+VERSAO_GCM_PROJECAO = 3 # Envelope com o hash da matriz de projeção das embeddings (também autenticado)
+TAMANHO_PROJECAO = 32
+TAMANHO_NONCE = 12
+TAMANHO_TAG = 16
+LARGURAS = {4: 'i', 8: 'q'} # Inteiros de 32 ou 64 bits, conforme a precisão de ponto fixo
+
+
+def gerar_chave():
+    return get_random_bytes(32)  # 256 bits = 32 bytes
+
+
+def empacotar(embedding):
+    """Inteiros de ponto fixo em largura fixa (little-endian): 1 byte de largura seguido dos valores"""
+    largura = 4 if -2 ** 31 <= min(embedding, default=0) and max(embedding, default=0) < 2 ** 31 else 8
+    return bytes([largura]) + struct.pack(f'<{len(embedding)}{LARGURAS[largura]}', *embedding)
+
+
+def desempacotar(dados):
+    largura = dados[0]
+    return list(struct.unpack(f'<{(len(dados) - 1) // largura}{LARGURAS[largura]}', dados[1:]))
+
+
+def criptografar(chave, embedding, projecao=None):
+    """Criptografa no formato configurado em Encryption.FORMAT
+
+    'projecao' é o hash (hex) da matriz de projeção com que o modelo gerou a embedding; ele segue
+    no envelope, e o modelo recusa comparar templates registrados com outra matriz.
+    """
+    if Encryption.FORMAT.value == 'cbc':
+        if projecao is not None:
+            raise ValueError("O formato CBC não registra a projeção das embeddings (use o formato GCM)")
+        return criptografar_cbc(chave, embedding)
+    return criptografar_gcm(chave, embedding, projecao)
+
+
+def criptografar_gcm(chave, embedding, projecao=None):
+    """Envelope AES-256-GCM: versão | [projeção] | nonce | embedding empacotada criptografada | tag, em base64"""
+    if projecao is None:
+        cabecalho = bytes([VERSAO_GCM])
+    else:
+        cabecalho = bytes([VERSAO_GCM_PROJECAO]) + bytes.fromhex(projecao)
+    cipher = AES.new(chave, AES.MODE_GCM, nonce=get_random_bytes(TAMANHO_NONCE), mac_len=TAMANHO_TAG)
+    cipher.update(cabecalho)
+    dados_criptografados, tag = cipher.encrypt_and_digest(empacotar(embedding))
+
+    return {
+        'data': base64.b64encode(cabecalho + cipher.nonce + dados_criptografados + tag).decode('utf-8')
+    }
+
+
+def tamanho_cabecalho(envelope):
+    if envelope[0] == VERSAO_GCM:
+        return 1
+    if envelope[0] == VERSAO_GCM_PROJECAO:
+        return 1 + TAMANHO_PROJECAO
+    raise ValueError(f"Versão de envelope desconhecida: {envelope[0]}")
+
+
+def descriptografar(chave, pacote_criptografado):
+    """Abre envelopes GCM e, para registros antigos (com IV separado), o formato CBC sobre JSON"""
+    if pacote_criptografado.get('iv'):
+        return descriptografar_cbc(chave, pacote_criptografado)
+
+    envelope = base64.b64decode(pacote_criptografado['data'])
+    cabecalho = envelope[:tamanho_cabecalho(envelope)]
+
+    nonce = envelope[len(cabecalho):len(cabecalho) + TAMANHO_NONCE]
+    dados_criptografados = envelope[len(cabecalho) + TAMANHO_NONCE:-TAMANHO_TAG]
+    tag = envelope[-TAMANHO_TAG:]
+
+    cipher = AES.new(chave, AES.MODE_GCM, nonce=nonce, mac_len=TAMANHO_TAG)
+    cipher.update(cabecalho)
+
+    # Levanta ValueError se o envelope (inclusive a projeção) foi alterado ou a chave está incorreta
+    return desempacotar(cipher.decrypt_and_verify(dados_criptografados, tag))
+
+
+def projecao_envelope(pacote_criptografado):
+    """Hash (hex) da matriz de projeção registrado no envelope; None sem projeção ou no formato CBC
+
+    O valor só é confiável após descriptografar o mesmo pacote, que autentica o cabeçalho.
+    """
+    if pacote_criptografado.get('iv'):
+        return None
+    envelope = base64.b64decode(pacote_criptografado['data'])
+    if tamanho_cabecalho(envelope) == 1:
+        return None
+    return envelope[1:1 + TAMANHO_PROJECAO].hex()
+
+
+def criptografar_lote(chaves, embeddings, projecao=None):
+    """Criptografa cada embedding com a chave da respectiva pessoa"""
+    return [criptografar(chave, embedding, projecao) for chave, embedding in zip(chaves, embeddings)]
+
+
+def descriptografar_lote(chave, pacotes):
+    """Descriptografa os templates de uma identidade (mesma chave), em qualquer um dos formatos"""
+    return [descriptografar(chave, pacote) for pacote in pacotes]
+
+
+def criptografar_cbc(chave, embedding):
+    """Formato anterior: AES-256 no modo CBC sobre a embedding em JSON, com o IV separado"""
+    # Converte embedding para formato serializável
+    if isinstance(embedding, list):
+        embedding_bytes = json.dumps(embedding).encode('utf-8')
+    else:
+        embedding_bytes = str(embedding).encode('utf-8')
+
+    # Inicializa cipher AES no modo CBC, aplica padding e criptografa
+    cipher = AES.new(chave, AES.MODE_CBC)
+    dados_criptografados = cipher.encrypt(pad(embedding_bytes, AES.block_size))
+
+    # Empacota dados criptografados com IV
+    return {
+        'data': base64.b64encode(dados_criptografados).decode('utf-8'),
+        'iv': base64.b64encode(cipher.iv).decode('utf-8')
+    }
+
+
+def descriptografar_cbc(chave, pacote_criptografado):
+    # Extrai dados criptografados e IV do pacote
+    dados_criptografados = base64.b64decode(pacote_criptografado['data'])
+    iv = base64.b64decode(pacote_criptografado['iv'])
+
+    # Descriptografa, remove padding e converte de volta para embedding
+    cipher = AES.new(chave, AES.MODE_CBC, iv)
+    dados_sem_padding = unpad(cipher.decrypt(dados_criptografados), AES.block_size)
+    return json.loads(dados_sem_padding.decode('utf-8'))
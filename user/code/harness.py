@@ -0,0 +1,68 @@
+import time
+
+from balancer import LoadBalancer
+from cache import TemplateCache
+from enums import Color
+from standins import ModelStandIn, ServerStandIn
+from tracing import Tracer
+from user import User
+
+
+def ler_parametros(argumentos, padrao):
+    """Parâmetros no formato chave=valor, convertidos para o tipo do valor padrão; os omitidos seguem 'padrao'"""
+    parametros = dict(padrao)
+    for argumento in argumentos:
+        chave, _, valor = argumento.partition('=')
+        if chave not in padrao:
+            raise ValueError(f"Parâmetro desconhecido: {chave}")
+        parametros[chave] = type(padrao[chave])(valor)
+    return parametros
+
+
+def validar_alvo(parametros):
+    """Confere os parâmetros usados por configurar_alvo antes de iniciar o Usuário (levanta ValueError)"""
+    if parametros['alvo'] not in ('local', 'servicos'):
+        raise ValueError(f"Alvo desconhecido: {parametros['alvo']} (use local ou servicos)")
+    if 'fluxo' in parametros and parametros['fluxo'] not in ('pipelined', 'sequential'):
+        raise ValueError(f"Fluxo de autenticação desconhecido: {parametros['fluxo']} (use pipelined ou sequential)")
+
+
+def configurar_alvo(parametros):
+    """Inicia o motor do Usuário e, no alvo local, os stand-ins do modelo e do servidor (benchmark_load.py e bulk_enroll.py)"""
+    validar_alvo(parametros)
+    user = User()
+    servicos = []
+
+    if parametros['alvo'] == 'local':
+        porta = parametros['porta']
+        servidores = []
+        for indice in range(parametros.get('replicas_servidor', 1)):
+            servidores.append(ServerStandIn(
+                porta + 10 * indice, parametros['verificacao_ms'] / 1000, parametros.get('consulta_ms', 0.0) / 1000,
+                banco=servidores[0] if servidores else None
+            ).iniciar())
+        modelos = [
+            ModelStandIn(porta + 2 + 10 * indice, parametros['embedding_ms'] / 1000, parametros['prova_ms'] / 1000,
+                         parametros['provers']).iniciar()
+            for indice in range(parametros.get('replicas_modelo', 1))
+        ]
+        servicos = servidores + modelos
+
+        user.host = '127.0.0.1'
+        user.port = porta + 1
+        user.servidor = LoadBalancer('servidor', [('127.0.0.1', servidor.porta) for servidor in servidores])
+        user.modelo = LoadBalancer('modelo', [('127.0.0.1', modelo.porta) for modelo in modelos])
+        user.endereco_retorno = f'127.0.0.1:{porta + 1}'
+
+    if 'cache' in parametros:
+        user.cache_templates = TemplateCache(max_entradas=parametros['cache'])
+
+    if 'fluxo' in parametros:
+        user.modo_autenticacao = parametros['fluxo']
+
+    if 'rastro' in parametros:
+        user.rastreamento = Tracer('usuario', parametros['rastro'], Color.GREEN.value)
+
+    user.iniciar()
+    time.sleep(0.5)
+    return user, servicos
@@ -0,0 +1,78 @@
+import sys
+import json
+
+from enums import Color
+
+
+def ler_eventos(caminho):
+    """Eventos de um arquivo de spans (formato Trace Event, com ou sem o colchete final)"""
+    with open(caminho) as arquivo:
+        conteudo = arquivo.read().strip()
+    if not conteudo:
+        return []
+    if conteudo.startswith('{'):
+        return json.loads(conteudo).get('traceEvents', [])
+
+    # Arquivo ainda em gravação: remove a vírgula final e fecha o array
+    conteudo = conteudo.rstrip(',')
+    if not conteudo.endswith(']'):
+        conteudo += ']'
+    return json.loads(conteudo)
+
+
+def reunir(caminhos, trace_id=None):
+    """Eventos de todos os serviços (apenas os do rastro informado, se houver), em ordem de início"""
+    metadados = {}
+    spans = []
+    for caminho in caminhos:
+        for evento in ler_eventos(caminho):
+            if evento.get('ph') == 'M':
+                metadados[(evento['pid'], evento['name'])] = evento
+            elif trace_id is None or evento.get('args', {}).get('trace_id') == trace_id:
+                spans.append(evento)
+    spans.sort(key=lambda evento: evento['ts'])
+    return list(metadados.values()) + spans
+
+
+def imprimir_cascata(eventos):
+    """Cascata em texto: cada span indentado sob o span pai, com início relativo e duração"""
+    spans = [evento for evento in eventos if evento.get('ph') == 'X']
+    if not spans:
+        return
+    inicio = spans[0]['ts']
+    filhos = {}
+    ids = {evento['args']['span_id'] for evento in spans}
+    for evento in spans:
+        pai = evento['args'].get('parent_id')
+        filhos.setdefault(pai if pai in ids else None, []).append(evento)
+
+    def imprimir(evento, nivel):
+        print(Color.GREEN.value + f" {(evento['ts'] - inicio) / 1000:>9.1f} ms {evento['dur'] / 1000:>9.1f} ms  "
+              f"{'  ' * nivel}{evento['cat']}/{evento['name']}")
+        for filho in filhos.get(evento['args']['span_id'], []):
+            imprimir(filho, nivel + 1)
+
+    print(Color.GREEN.value + "    INÍCIO     DURAÇÃO  SPAN")
+    for raiz in filhos.get(None, []):
+        imprimir(raiz, 0)
+
+
+if __name__ == "__main__":
+    argumentos = [argumento for argumento in sys.argv[1:] if not argumento.startswith('trace=')]
+    filtros = [argumento.partition('=')[2] for argumento in sys.argv[1:] if argumento.startswith('trace=')]
+    if len(argumentos) < 2:
+        print("Uso: python3 merge_traces.py SAÍDA ARQUIVO [ARQUIVO ...] [trace=TRACE_ID]")
+        sys.exit(1)
+
+    saida, caminhos = argumentos[0], argumentos[1:]
+    trace_id = filtros[0] if filtros else None
+    eventos = reunir(caminhos, trace_id)
+
+    with open(saida, 'w') as arquivo:
+        json.dump({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, arquivo)
+
+    rastros = {evento['args']['trace_id'] for evento in eventos if evento.get('ph') == 'X'}
+    print(Color.GREEN.value + f" {len(eventos)} evento(s) de {len(rastros)} rastro(s) salvos em {saida} "
+          f"(abra em https://ui.perfetto.dev ou chrome://tracing)")
+    if trace_id:
+        imprimir_cascata(eventos)
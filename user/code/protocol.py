@@ -0,0 +1,61 @@
+# Cópias idênticas em model/code e user/code (cada contêiner monta apenas o próprio diretório):
+# altere as duas juntas; tests/test_copias.py do Usuário confere que não divergem.
+import json
+import struct
+
+
+# Mensagens com campos binários (ex.: imagens) são enviadas como:
+#   MAGICO | tamanho do cabeçalho (4 bytes, big-endian) | cabeçalho JSON | anexos
+# No cabeçalho, cada campo bytes é substituído por {"$anexo": índice} e "anexos" lista os tamanhos.
+# Mensagens sem campos binários continuam sendo JSON puro, aceito por todos os serviços.
+MAGICO = b'\x00ZKB'
+ANEXO = '$anexo'
+
+
+def codificar(mensagem):
+    """Serializa a mensagem; campos bytes seguem como anexos binários, sem base64"""
+    anexos = []
+
+    def substituir(valor):
+        if isinstance(valor, (bytes, bytearray, memoryview)):
+            anexos.append(valor)
+            return {ANEXO: len(anexos) - 1}
+        if isinstance(valor, dict):
+            return {chave: substituir(item) for chave, item in valor.items()}
+        if isinstance(valor, (list, tuple)):
+            return [substituir(item) for item in valor]
+        return valor
+
+    estrutura = substituir(mensagem)
+    if not anexos:
+        return json.dumps(mensagem).encode()
+
+    cabecalho = json.dumps({'mensagem': estrutura, 'anexos': [len(anexo) for anexo in anexos]}).encode()
+    return b''.join([MAGICO, struct.pack('>I', len(cabecalho)), cabecalho, *anexos])
+
+
+def decodificar(dados):
+    """Reconstrói a mensagem, com os anexos de volta como bytes; JSON puro é lido diretamente"""
+    if not dados.startswith(MAGICO):
+        return json.loads(dados.decode())
+
+    inicio = len(MAGICO) + 4
+    (tamanho,) = struct.unpack('>I', dados[len(MAGICO):inicio])
+    cabecalho = json.loads(dados[inicio:inicio + tamanho].decode())
+
+    anexos = []
+    posicao = inicio + tamanho
+    for tamanho_anexo in cabecalho['anexos']:
+        anexos.append(dados[posicao:posicao + tamanho_anexo])
+        posicao += tamanho_anexo
+
+    def restaurar(valor):
+        if isinstance(valor, dict):
+            if len(valor) == 1 and ANEXO in valor:
+                return anexos[valor[ANEXO]]
+            return {chave: restaurar(item) for chave, item in valor.items()}
+        if isinstance(valor, list):
+            return [restaurar(item) for item in valor]
+        return valor
+
+    return restaurar(cabecalho['mensagem'])
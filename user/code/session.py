@@ -0,0 +1,163 @@
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+
+from envelope import criptografar, descriptografar, descriptografar_lote, gerar_chave
+
+
+class Session:
+    """Estado de uma pessoa atendida pelo cliente: chave, identidade, solicitações pendentes e tempos
+
+    As respostas do modelo e do servidor repetem o correlation_id da solicitação, que é o
+    identificador da sessão; assim, vários registros e autenticações podem ocorrer ao mesmo tempo.
+    """
+
+    def __init__(self, foto_registro=None, fotos_extras=(), foto_autenticacao=None,
+                 chave_simetrica=None, user_id=None):
+        self.id = uuid.uuid4().hex
+
+        # Chave simétrica e ID da identidade (informados para autenticar uma identidade já registrada)
+        self.chave_simetrica = chave_simetrica
+        self.user_id = user_id
+
+        # Fotos de registro, dos templates adicionais ainda não registrados e de autenticação
+        self.foto_registro = foto_registro
+        self.templates_pendentes = list(fotos_extras)
+        self.foto_autenticacao = foto_autenticacao
+
+        # Versão do circuito dos arquivos do trusted setup usados na prova (verificada com a mesma chave)
+        self.versao_circuito = None
+
+        # Versão dos templates usados na prova (conferida pelo servidor) e se vieram do cache local
+        self.versao_templates = None
+        self.templates_em_cache = False
+
+        # Solicitação de prova aguardando arquivos do trusted setup ausentes no modelo
+        self.solicitacao_prova = None
+
+        # Foto de autenticação já enviada ao modelo (reenviada se o modelo não tiver mais a embedding preparada)
+        self.foto_preparada = None
+
+        # Início e duração de cada fase (registro, autenticação e suas etapas); o tempo limite conta a partir da última fase
+        self.ultima_fase = time.monotonic()
+        self.inicios = {}
+        self.tempos = {}
+
+        # Cada fase é também um span do rastro da sessão (trace_id = ID da sessão), quando há rastreamento
+        self.rastreamento = None
+        self.spans = {}
+
+        # Réplica de cada serviço usada pela sessão (as etapas seguintes seguem para a mesma réplica)
+        # e solicitações ainda sem resposta, como (balanceador, réplica)
+        self.replicas = {}
+        self.em_andamento = []
+
+        # Bytes das fotos enviadas e tempo de CPU gasto no cliente para prepará-las
+        self.bytes_upload = 0
+        self.cpu_upload = 0.0
+
+        self.autenticado = None
+        self.erro = None
+        self.concluida = threading.Event()
+
+    @property
+    def rotulo(self):
+        return f"[{self.id[:8]}]"
+
+    def iniciar_fase(self, nome):
+        self.ultima_fase = time.monotonic()
+        self.inicios[nome] = time.perf_counter()
+        self.concluida.clear()
+
+        if self.rastreamento is not None:
+            # As etapas são filhas da fase mais antiga em andamento (registro ou autenticação)
+            raiz = next(iter(self.spans.values()), None)
+            pai = self.rastreamento.propagacao(raiz) if raiz else {'trace_id': self.id, 'span_id': None}
+            self.spans[nome] = self.rastreamento.abrir(nome, pai=pai)
+
+    def concluir_fase(self, nome):
+        """Registra e retorna a duração da fase (somada às ocorrências anteriores, como em vários templates)"""
+        span = self.spans.pop(nome, None)
+        if span is not None:
+            self.rastreamento.fechar(span)
+
+        inicio = self.inicios.pop(nome, None)
+        if inicio is not None:
+            # Respostas antecipadas (ex.: erro antes da etapa) não registram a etapa não iniciada
+            self.tempos[nome] = self.tempos.get(nome, 0.0) + time.perf_counter() - inicio
+        return self.tempos.get(nome)
+
+    def finalizar(self, erro=None):
+        self.erro = erro
+
+        # Fases interrompidas também aparecem no rastro, com o erro
+        for span in list(self.spans.values())[::-1]:
+            self.rastreamento.fechar(span, erro=erro)
+        self.spans.clear()
+
+        self.concluida.set()
+
+    def contexto_rastro(self):
+        """Contexto enviado nas solicitações: o span da etapa mais recente em andamento"""
+        if self.rastreamento is None:
+            return None
+        spans = list(self.spans.values())
+        return self.rastreamento.propagacao(spans[-1]) if spans else {'trace_id': self.id, 'span_id': None}
+
+    @contextmanager
+    def rastrear(self, nome, **atributos):
+        """Span de uma operação local da sessão (ex.: criptografia ou envio), filho da etapa em andamento"""
+        if self.rastreamento is None:
+            yield
+            return
+        span = self.rastreamento.abrir(nome, pai=self.contexto_rastro(), **atributos)
+        try:
+            yield
+        finally:
+            self.rastreamento.fechar(span)
+
+    def aguardar(self, timeout=None):
+        """Aguarda o fim da sessão; retorna False se o tempo se esgotar"""
+        return self.concluida.wait(timeout)
+
+    def gerar_chave_simetrica(self):
+        """Gera chave simétrica AES de 256 bits para criptografia"""
+        self.chave_simetrica = gerar_chave()
+        return self.chave_simetrica
+
+    def criptografar_embedding(self, embedding, projecao=None):
+        if not self.chave_simetrica:
+            raise ValueError("❌ Chave simétrica não foi gerada")
+        with self.rastrear('criptografar'):
+            return criptografar(self.chave_simetrica, embedding, projecao)
+
+    def descriptografar_embedding(self, pacote_criptografado):
+        if not self.chave_simetrica:
+            raise ValueError("❌ Chave simétrica não foi gerada")
+        with self.rastrear('descriptografar'):
+            return descriptografar(self.chave_simetrica, pacote_criptografado)
+
+    def descriptografar_embeddings(self, pacotes_criptografados):
+        if not self.chave_simetrica:
+            raise ValueError("❌ Chave simétrica não foi gerada")
+        with self.rastrear('descriptografar', templates=len(pacotes_criptografados)):
+            return descriptografar_lote(self.chave_simetrica, pacotes_criptografados)
+
+
+class BatchSession(Session):
+    """Registro de várias pessoas em uma única ida e volta: embeddings e IDs em lote, uma chave por pessoa
+
+    As listas são alinhadas às fotos; a foto sem embedding (ou não armazenada) fica com o erro correspondente.
+    """
+
+    def __init__(self, fotos):
+        super().__init__()
+        self.fotos = list(fotos)
+        self.chaves = [None] * len(self.fotos)
+        self.user_ids = [None] * len(self.fotos)
+        self.erros = [None] * len(self.fotos)
+
+        # Índices das fotos enviadas na solicitação em andamento (as respostas seguem a mesma ordem)
+        self.pendentes = []
+
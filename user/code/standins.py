@@ -0,0 +1,238 @@
+import json
+import math
+import time
+import socket
+import hashlib
+import itertools
+import threading
+import socketserver
+from io import BytesIO
+from concurrent.futures import Future
+
+from PIL import Image
+from protocol import decodificar
+
+
+LARGURA = 32 # Imagem reduzida para LARGURA x ALTURA pixels: uma dimensão da embedding por pixel
+ALTURA = 16
+ESCALA = 2 ** 16 # Mesma escala de ponto fixo das embeddings enviadas pelo modelo
+LIMIAR = 0.7
+
+
+def embedding_sintetica(dados_imagem):
+    """Embedding determinística da imagem: pixels em tons de cinza reduzidos, centralizados e normalizados
+
+    Fotos da mesma pessoa no corpus sintético (mesmo padrão com ruído) produzem embeddings
+    semelhantes, e pessoas diferentes produzem embeddings quase ortogonais.
+    """
+    imagem = Image.open(BytesIO(dados_imagem)).convert('L').resize((LARGURA, ALTURA))
+    pixels = list(imagem.getdata())
+    media = sum(pixels) / len(pixels)
+    centralizados = [pixel - media for pixel in pixels]
+    norma = math.sqrt(sum(valor * valor for valor in centralizados)) or 1.0
+    return [round(valor / norma * ESCALA) for valor in centralizados]
+
+
+def versao_templates(embeddings):
+    return hashlib.sha256(','.join(embedding['data'] for embedding in embeddings).encode()).hexdigest()[:16]
+
+
+def similaridade_cosseno(embedding1, embedding2):
+    produto = sum(a * b for a, b in zip(embedding1, embedding2))
+    normas = sum(a * a for a in embedding1) * sum(b * b for b in embedding2)
+    return produto / math.sqrt(normas) if normas else 0.0
+
+
+class ServidorTCP(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    request_queue_size = socket.SOMAXCONN
+
+
+class StandIn:
+    """Serviço local com o protocolo dos contêineres: uma mensagem JSON por conexão e resposta
+    enviada para 'return_to', repetindo o correlation_id da solicitação
+
+    Os stand-ins reimplementam as mensagens do Modelo e do Servidor, em vez de executar as classes
+    reais com o prover e o banco simulados: o Usuário roda em um contêiner próprio, sem o código,
+    as dependências (Torch, snarkjs, PostgreSQL) e os enums dos outros serviços. Por isso a carga
+    local mede o Usuário e o protocolo, mas não exercita os handlers reais (a versão aceita do
+    circuito, a projeção das embeddings, a busca de artefatos); uma mudança no protocolo dos
+    serviços deve ser refletida aqui.
+    """
+
+    def __init__(self, porta, host='127.0.0.1'):
+        self.host = host
+        self.porta = porta
+        self.servidor = None
+
+    def iniciar(self):
+        servico = self
+
+        class Conexao(socketserver.BaseRequestHandler):
+            def handle(self):
+                dados = b''
+                while True:
+                    chunk = self.request.recv(65536)
+                    if not chunk:
+                        break
+                    dados += chunk
+                if dados:
+                    servico.atender(decodificar(dados))
+
+        self.servidor = ServidorTCP((self.host, self.porta), Conexao)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        return self
+
+    def encerrar(self):
+        if self.servidor is not None:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+
+    def atender(self, mensagem):
+        try:
+            tipo, dados = self.processar(mensagem.get('type'), mensagem.get('data'))
+        except Exception as e:
+            tipo, dados = 'error', {'error': f'{type(e).__name__}: {e}'}
+
+        resposta = {'type': tipo, 'data': dados}
+        if mensagem.get('correlation_id') is not None:
+            resposta['correlation_id'] = mensagem['correlation_id']
+        if mensagem.get('trace') is not None:
+            resposta['trace'] = mensagem['trace']
+
+        host, porta = mensagem['return_to'].split(':')
+        with socket.create_connection((host, int(porta))) as conexao:
+            conexao.sendall(json.dumps(resposta).encode())
+
+    def processar(self, tipo, dados):
+        raise NotImplementedError
+
+
+class ModelStandIn(StandIn):
+    """Modelo de IA simulado: embedding derivada dos pixels e prova com latência configurável
+
+    A "prova" apenas transporta a decisão (result = 1 se a nova embedding atinge o limiar com
+    algum template); os provers são limitados como no pool do modelo. Fotos enviadas antes da
+    prova ('prepare_embedding') ficam com a embedding aguardando a solicitação que as referencia.
+    """
+
+    def __init__(self, porta, atraso_embedding=0.0, atraso_prova=0.0, provers=1, host='127.0.0.1'):
+        super().__init__(porta, host)
+        self.atraso_embedding = atraso_embedding
+        self.atraso_prova = atraso_prova
+        self.provers = threading.BoundedSemaphore(provers)
+        self.trava = threading.Lock()
+        self.preparadas = {}
+
+    def processar(self, tipo, dados):
+        if tipo == 'generate_embedding':
+            time.sleep(self.atraso_embedding)
+            return 'embedding', embedding_sintetica(dados)
+
+        if tipo == 'generate_embeddings':
+            time.sleep(self.atraso_embedding)
+            return 'embeddings', [embedding_sintetica(foto) for foto in dados]
+
+        if tipo == 'prepare_embedding':
+            preparada = Future()
+            with self.trava:
+                self.preparadas[dados['ref']] = preparada
+            time.sleep(self.atraso_embedding)
+            preparada.set_result(embedding_sintetica(dados['image']))
+            return 'prepared_embedding', {'ready': True}
+
+        if tipo == 'generate_snark_proof':
+            if 'new_image' in dados:
+                time.sleep(self.atraso_embedding)
+                nova = embedding_sintetica(dados['new_image'])
+            else:
+                with self.trava:
+                    preparada = self.preparadas.pop(dados['new_image_ref'], None)
+                if preparada is None:
+                    return 'missing_image', {'ref': dados['new_image_ref']}
+                nova = preparada.result()
+            resultado = any(similaridade_cosseno(template, nova) >= LIMIAR for template in dados['old_embeddings'])
+            with self.provers:
+                time.sleep(self.atraso_prova)
+            return 'snark_proof', {
+                'prova': {'protocol': 'groth16', 'curve': 'bn128', 'stand_in': True},
+                'params': [str(int(resultado)), str(round(LIMIAR * ESCALA))]
+            }
+
+        return 'error', {'error': f'Tipo de mensagem não suportado: {tipo}'}
+
+
+class ServerStandIn(StandIn):
+    """Servidor simulado: banco de embeddings criptografadas em memória, com latência configurável na
+    consulta dos templates e na verificação
+
+    Réplicas criadas com 'banco' (outro ServerStandIn) compartilham o mesmo banco, como réplicas
+    do servidor sobre um único PostgreSQL.
+    """
+
+    def __init__(self, porta, atraso_verificacao=0.0, atraso_consulta=0.0, host='127.0.0.1', banco=None):
+        super().__init__(porta, host)
+        self.atraso_verificacao = atraso_verificacao
+        self.atraso_consulta = atraso_consulta
+        if banco is not None:
+            self.trava, self.identidades, self.ids = banco.trava, banco.identidades, banco.ids
+        else:
+            self.trava, self.identidades, self.ids = threading.Lock(), {}, itertools.count(1)
+
+    def processar(self, tipo, dados):
+        if tipo == 'store_embedding':
+            embedding = {'data': dados['data'], 'iv': dados.get('iv')}
+            with self.trava:
+                identidade = dados.get('user_id')
+                if identidade is None:
+                    identidade = next(self.ids)
+                    self.identidades[identidade] = []
+                elif identidade not in self.identidades:
+                    return 'registration_error', {'error': 'Identidade não encontrada'}
+                self.identidades[identidade].append(embedding)
+            return 'registration_id', identidade
+
+        if tipo == 'store_embeddings':
+            with self.trava:
+                ids = [next(self.ids) for _ in dados]
+                for identidade, embedding in zip(ids, dados):
+                    self.identidades[identidade] = [{'data': embedding['data'], 'iv': embedding.get('iv')}]
+            return 'registration_ids', ids
+
+        if tipo == 'get_embedding':
+            time.sleep(self.atraso_consulta)
+            with self.trava:
+                embeddings = list(self.identidades.get(dados, []))
+            if not embeddings:
+                return 'authentication_result', {
+                    'authenticated': False,
+                    'reason': 'Embedding não encontrada para o ID fornecido'
+                }
+            return 'snark_ingredients', {
+                'embedding': embeddings[0],
+                'embeddings': embeddings,
+                'artifacts': {},
+                'version': 1,
+                'template_version': versao_templates(embeddings)
+            }
+
+        if tipo == 'get_artifacts':
+            return 'artifacts', {}
+
+        if tipo == 'verify_snark_proof':
+            if dados.get('template_version') is not None:
+                with self.trava:
+                    atual = versao_templates(self.identidades.get(dados['user_id'], []))
+                if dados['template_version'] != atual:
+                    return 'authentication_result', {'authenticated': False, 'reason': 'Templates desatualizados', 'stale': True}
+            time.sleep(self.atraso_verificacao)
+            # Mesma conferência dos sinais públicos [result, threshold] do servidor
+            resultado, limiar = dados['params']
+            if limiar != str(round(LIMIAR * ESCALA)):
+                return 'authentication_result', {'authenticated': False, 'reason': 'Limiar da prova difere do configurado'}
+            if resultado != '1':
+                return 'authentication_result', {'authenticated': False, 'reason': 'Faces não correspondem'}
+            return 'authentication_result', {'authenticated': True}
+
+        return 'error', {'error': f'Tipo de mensagem não suportado: {tipo}'}
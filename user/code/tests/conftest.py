@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos do serviço são importados como na execução (a partir de user/code)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,64 @@
+from balancer import LoadBalancer, ler_enderecos
+from enums import Balancing
+
+
+ENDERECOS = [('a', 1), ('b', 2), ('c', 3)]
+
+
+def test_ler_enderecos():
+    assert ler_enderecos(['h1:10', 'h2:20'], 'x', 1) == [('h1', 10), ('h2', 20)]
+    assert ler_enderecos((), 'x', 1) == [('x', 1)]
+
+
+def test_menos_solicitacoes_em_andamento():
+    balanceador = LoadBalancer('modelo', ENDERECOS, fixa=False)
+    escolhidas = [balanceador.escolher() for _ in range(3)]
+    assert len(set(escolhidas)) == 3
+
+    balanceador.liberar(escolhidas[1])
+    assert balanceador.escolher() is escolhidas[1]
+
+
+def test_preferida_e_excluidas():
+    balanceador = LoadBalancer('modelo', ENDERECOS, fixa=False)
+    a, b, c = balanceador.replicas
+
+    assert balanceador.escolher(preferida=c) is c
+    assert balanceador.escolher(excluir=[a, c]) is b
+    assert balanceador.escolher(excluir=[a, b, c]) is None
+
+
+def test_chave_fixa_a_replica():
+    balanceador = LoadBalancer('modelo', ENDERECOS, fixa=True)
+    primeira = balanceador.escolher(chave=42)
+    for _ in range(5):
+        assert balanceador.escolher(chave=42) is primeira
+
+
+def test_ejecao_apos_falhas_consecutivas():
+    balanceador = LoadBalancer('modelo', ENDERECOS[:2], fixa=False)
+    a, b = balanceador.replicas
+
+    for _ in range(Balancing.EJECTION_FAILURES.value - 1):
+        balanceador.registrar_falha(a, 'teste')
+    balanceador.registrar_sucesso(a)
+    balanceador.registrar_falha(a, 'teste')
+    assert a.ejecoes == 0
+
+    for _ in range(Balancing.EJECTION_FAILURES.value):
+        balanceador.registrar_falha(a, 'teste')
+    assert a.ejecoes == 1
+    assert all(balanceador.escolher() is b for _ in range(3))
+    assert balanceador.relatorio()['a:1']['disponivel'] is False
+
+
+def test_ejecao_imediata_e_todas_ejetadas():
+    balanceador = LoadBalancer('modelo', ENDERECOS[:2], fixa=False)
+    a, b = balanceador.replicas
+
+    balanceador.registrar_falha(a, 'fora do ar', ejetar=True)
+    balanceador.registrar_falha(b, 'fora do ar', ejetar=True)
+    assert a.ejecoes == b.ejecoes == 1
+
+    # Com todas as réplicas ejetadas, a solicitação ainda é enviada a uma delas
+    assert balanceador.escolher() in (a, b)
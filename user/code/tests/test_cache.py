@@ -0,0 +1,79 @@
+import os
+
+from cache import TemplateCache
+
+
+def ingredientes(versao='v1'):
+    return {'templates': ['abc'], 'template_version': versao}
+
+
+def test_armazena_e_retorna():
+    cache = TemplateCache(max_entradas=4, ttl=60, diretorio='')
+    assert cache.obter(1) is None
+    cache.armazenar(1, ingredientes())
+    assert cache.obter(1) == ingredientes()
+
+    relatorio = cache.relatorio()
+    assert (relatorio['acertos'], relatorio['faltas'], relatorio['entradas']) == (1, 1, 1)
+
+
+def test_ignora_ingredientes_sem_versao():
+    cache = TemplateCache(max_entradas=4, ttl=60, diretorio='')
+    cache.armazenar(1, {'templates': ['abc']})
+    assert cache.obter(1) is None
+
+
+def test_desativado():
+    cache = TemplateCache(max_entradas=0, ttl=60, diretorio='')
+    cache.armazenar(1, ingredientes())
+    assert cache.obter(1) is None
+    assert cache.relatorio()['faltas'] == 0
+
+
+def test_despeja_o_menos_usado():
+    cache = TemplateCache(max_entradas=2, ttl=60, diretorio='')
+    cache.armazenar(1, ingredientes('a'))
+    cache.armazenar(2, ingredientes('b'))
+    assert cache.obter(1) is not None # 2 passa a ser o menos usado
+    cache.armazenar(3, ingredientes('c'))
+
+    assert cache.obter(2) is None
+    assert cache.obter(1)['template_version'] == 'a'
+    assert cache.obter(3)['template_version'] == 'c'
+
+
+def test_despejadas_vao_para_o_disco(tmp_path):
+    cache = TemplateCache(max_entradas=1, ttl=60, diretorio=str(tmp_path))
+    cache.armazenar(1, ingredientes('a'))
+    cache.armazenar(2, ingredientes('b'))
+
+    # O nome do arquivo não revela o ID
+    arquivos = os.listdir(tmp_path)
+    assert len(arquivos) == 1 and not arquivos[0].startswith('1.')
+    assert cache.obter(1)['template_version'] == 'a'
+
+
+def test_expira_apos_o_ttl(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr('cache.time.time', lambda: agora[0])
+
+    cache = TemplateCache(max_entradas=4, ttl=60, diretorio='')
+    cache.armazenar(1, ingredientes())
+    agora[0] += 59
+    assert cache.obter(1) is not None
+    agora[0] += 2
+    assert cache.obter(1) is None
+    assert cache.relatorio()['entradas'] == 0
+
+
+def test_invalidar_remove_da_memoria_e_do_disco(tmp_path):
+    cache = TemplateCache(max_entradas=1, ttl=60, diretorio=str(tmp_path))
+    cache.armazenar(1, ingredientes('a'))
+    cache.armazenar(2, ingredientes('b'))
+
+    cache.invalidar(1)
+    cache.invalidar(2)
+    cache.invalidar(3)
+    assert cache.obter(1) is None and cache.obter(2) is None
+    assert os.listdir(tmp_path) == []
+    assert cache.relatorio()['invalidadas'] == 2
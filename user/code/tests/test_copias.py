@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..')
+
+COPIAS = {
+    'tracing.py': ('model', 'server', 'user'),
+    'protocol.py': ('model', 'user')
+}
+
+
+@pytest.mark.parametrize('modulo', sorted(COPIAS))
+def test_copias_identicas(modulo):
+    caminhos = [os.path.join(RAIZ, servico, 'code', modulo) for servico in COPIAS[modulo]]
+    if not all(os.path.isfile(caminho) for caminho in caminhos):
+        pytest.skip("Apenas o diretório do serviço está disponível (contêiner)")
+
+    conteudos = set()
+    for caminho in caminhos:
+        with open(caminho, 'rb') as arquivo:
+            conteudos.add(arquivo.read())
+    assert len(conteudos) == 1, f"As cópias de {modulo} divergem: {', '.join(caminhos)}"
@@ -0,0 +1,34 @@
+import base64
+import hashlib
+
+import pytest
+
+from envelope import criptografar, descriptografar, gerar_chave, projecao_envelope
+
+
+PROJECAO = hashlib.sha256(b'matriz').hexdigest()
+
+
+def test_envelope_sem_projecao():
+    chave = gerar_chave()
+    pacote = criptografar(chave, [512, -256, 1024])
+    assert projecao_envelope(pacote) is None
+    assert descriptografar(chave, pacote) == [512, -256, 1024]
+
+
+def test_envelope_registra_a_projecao():
+    chave = gerar_chave()
+    pacote = criptografar(chave, [512, -256, 1024], PROJECAO)
+    assert projecao_envelope(pacote) == PROJECAO
+    assert descriptografar(chave, pacote) == [512, -256, 1024]
+
+
+def test_projecao_alterada_invalida_o_envelope():
+    chave = gerar_chave()
+    envelope = bytearray(base64.b64decode(criptografar(chave, [1024], PROJECAO)['data']))
+    envelope[1] ^= 0x01
+    pacote = {'data': base64.b64encode(bytes(envelope)).decode('utf-8')}
+
+    assert projecao_envelope(pacote) != PROJECAO
+    with pytest.raises(ValueError):
+        descriptografar(chave, pacote)
@@ -0,0 +1,33 @@
+import json
+
+from protocol import MAGICO, codificar, decodificar
+
+
+def test_mensagem_sem_bytes_segue_em_json_puro():
+    mensagem = {'type': 'verify', 'data': {'id': 3, 'valores': [1, 2.5, None]}, 'correlation_id': 'abc'}
+    dados = codificar(mensagem)
+    assert json.loads(dados) == mensagem
+    assert decodificar(dados) == mensagem
+
+
+def test_bytes_seguem_como_anexos():
+    imagem = bytes(range(256)) * 4
+    mensagem = {
+        'type': 'generate_embeddings',
+        'data': {'images': [imagem, b''], 'extra': {'foto': b'\x00\xff'}, 'n': 2},
+        'correlation_id': None
+    }
+    dados = codificar(mensagem)
+    assert dados.startswith(MAGICO)
+    # Os anexos não são codificados em base64
+    assert imagem in dados
+    assert decodificar(dados) == mensagem
+
+
+def test_bytearray_e_memoryview_voltam_como_bytes():
+    dados = codificar({'a': bytearray(b'xy'), 'b': memoryview(b'zw')})
+    assert decodificar(dados) == {'a': b'xy', 'b': b'zw'}
+
+
+def test_tuplas_voltam_como_listas():
+    assert decodificar(codificar({'a': (b'1', 2)})) == {'a': [b'1', 2]}
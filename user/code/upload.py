@@ -0,0 +1,45 @@
+import time
+from io import BytesIO
+
+from PIL import Image
+from enums import Upload
+
+
+def preparar_upload(origem, lado_maximo=None, formatos=None, qualidade=None):
+    """Bytes da foto para envio ao modelo e como foram obtidos ('original', 'reduzida' ou 'recodificada')
+
+    Fotos em um formato aceito e dentro do tamanho seguem com os bytes originais, sem decodificação
+    (apenas o cabeçalho é lido). Fotos maiores são reduzidas para o maior lado necessário ao recorte
+    da face; em JPEG, o modo draft decodifica diretamente em resolução reduzida.
+    """
+    lado_maximo = Upload.MAX_SIDE.value if lado_maximo is None else lado_maximo
+    formatos = Upload.FORMATS.value if formatos is None else formatos
+    qualidade = Upload.QUALITY.value if qualidade is None else qualidade
+
+    if isinstance(origem, bytes):
+        dados = origem
+    else:
+        with open(origem, 'rb') as arquivo:
+            dados = arquivo.read()
+
+    imagem = Image.open(BytesIO(dados))
+    reduzir = bool(lado_maximo) and max(imagem.size) > lado_maximo
+    if imagem.format in formatos and not reduzir:
+        return dados, 'original'
+
+    if reduzir and imagem.format == 'JPEG':
+        imagem.draft('RGB', (lado_maximo, lado_maximo))
+    imagem = imagem.convert('RGB')
+    if reduzir:
+        imagem.thumbnail((lado_maximo, lado_maximo), Image.BILINEAR, reducing_gap=2.0)
+
+    buffer = BytesIO()
+    imagem.save(buffer, format='JPEG', quality=qualidade)
+    return buffer.getvalue(), 'reduzida' if reduzir else 'recodificada'
+
+
+def medir_upload(origem, **opcoes):
+    """preparar_upload com o tempo de CPU gasto no cliente"""
+    inicio = time.process_time()
+    dados, modo = preparar_upload(origem, **opcoes)
+    return dados, modo, time.process_time() - inicio
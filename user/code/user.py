@@ -1,16 +1,23 @@
 import time
 import json
-import base64
 import socket
 import threading
-from io import BytesIO
 
-from Crypto.Cipher import AES
-from Crypto.Random import get_random_bytes
-from Crypto.Util.Padding import pad, unpad
+from balancer import LoadBalancer, ler_enderecos
+from cache import TemplateCache
+from enums import Addresses, Authentication, Color, ImagePath, Sessions
+from envelope import criptografar_lote, gerar_chave, projecao_envelope
+from protocol import codificar, decodificar
+from session import Session
+from tracing import Tracer
+from upload import medir_upload
 
-from PIL import Image
-from enums import Addresses, Benchmark, Color, ImagePath
+
+# Respostas enviadas pelo modelo; as demais vêm do servidor
+RESPOSTAS_MODELO = {
+    'embedding', 'embeddings', 'embedding_error', 'prepared_embedding', 'missing_image',
+    'missing_artifacts', 'snark_proof', 'snark_proof_error'
+}
 
 
 class User:
@@ -20,57 +27,84 @@ class User:
         print(Color.GREEN.value + " INICIALIZANDO USUÁRIO")
         print("=" * 60)
 
-        # Chave simétrica para criptografia
-        self.chave_simetrica = None
-        self.user_id = None
-        
+        # Sessões em andamento, indexadas pelo correlation_id repetido nas respostas
+        self.sessoes = {}
+        self.trava_sessoes = threading.Lock()
+
         # Configurações de rede - endereços locais
         self.host = Addresses.HOST.value
         self.port = Addresses.PORT.value
-        
-        # Configurações de rede - serviços externos
-        self.servidor_host = Addresses.SERVER_HOST.value
-        self.servidor_port = Addresses.SERVER_PORT.value
-        self.modelo_host = Addresses.MODEL_HOST.value  
-        self.modelo_port = Addresses.MODEL_PORT.value
-    
+
+        # Configurações de rede - serviços externos, com as solicitações distribuídas entre as réplicas
+        self.servidor = LoadBalancer('servidor', ler_enderecos(
+            Addresses.SERVER_REPLICAS.value, Addresses.SERVER_HOST.value, Addresses.SERVER_PORT.value
+        ))
+        self.modelo = LoadBalancer('modelo', ler_enderecos(
+            Addresses.MODEL_REPLICAS.value, Addresses.MODEL_HOST.value, Addresses.MODEL_PORT.value
+        ))
+
+        # Endereço para o qual o modelo e o servidor enviam as respostas
+        self.endereco_retorno = Addresses.RETURN.value
+
+        # Autenticação em pipeline (foto enviada ao modelo em paralelo com a busca dos templates) ou sequencial
+        self.modo_autenticacao = Authentication.MODE.value
+
+        # Templates criptografados das identidades autenticadas recentemente neste dispositivo
+        self.cache_templates = TemplateCache()
+
+        # Spans das sessões; o contexto segue nas solicitações ao modelo e ao servidor
+        self.rastreamento = Tracer('usuario', prefixo=Color.GREEN.value)
+
     def executar(self):
         """Método principal que inicia o serviço do usuário"""
-        
-        # Inicia servidor para receber mensagens dos outros serviços
-        servidor_thread = threading.Thread(target=self.iniciar_servidor)
-        servidor_thread.daemon = True
-        servidor_thread.start()
-        print(Color.GREEN.value + " Servidor de escuta iniciado em thread separada")
-        
+        self.iniciar()
+
         # Aguarda um momento para outros serviços iniciarem
         print(Color.GREEN.value + " Aguardando outros serviços iniciarem...")
         time.sleep(5)
-        
-        # Inicia processo de registro
-        self.processo_registro()
-        
+
+        # Inicia as sessões de demonstração (registro seguido de autenticação)
+        for _ in range(Sessions.CONCURRENT.value):
+            self.iniciar_registro(Session(
+                ImagePath.FACE_IMAGE_REG.value,
+                ImagePath.FACE_IMAGES_EXTRA.value,
+                ImagePath.FACE_IMAGE_AUT.value
+            ))
+
         # Mantém o serviço rodando
         try:
             while True:
                 time.sleep(1)
         except KeyboardInterrupt:
             print("\n" + Color.GREEN.value + " Encerrando serviço do usuário...")
-    
+
+    def iniciar(self):
+        """Inicia o servidor de escuta e a expiração das sessões sem resposta"""
+        servidor_thread = threading.Thread(target=self.iniciar_servidor)
+        servidor_thread.daemon = True
+        servidor_thread.start()
+        print(Color.GREEN.value + " Servidor de escuta iniciado em thread separada")
+
+        threading.Thread(target=self.expirar_sessoes, daemon=True).start()
+
+        # Verificação de saúde das réplicas do modelo e do servidor
+        for balanceador in (self.modelo, self.servidor):
+            threading.Thread(target=balanceador.verificar_periodicamente, daemon=True).start()
+
     def iniciar_servidor(self):
         """Inicia servidor TCP para receber mensagens de outros serviços"""
         try:
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
                 s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
                 s.bind((self.host, self.port))
-                s.listen(5)
+                s.listen(socket.SOMAXCONN)
 
                 print(Color.GREEN.value + f" Servidor escutando em {self.host}:{self.port}")
 
                 print("=" * 60)
                 print(Color.GREEN.value + " USUÁRIO INICIALIZADO COM SUCESSO")
                 print("=" * 60)
-                
+
                 while True:
                     try:
                         conn, addr = s.accept()
@@ -81,349 +115,585 @@ class User:
                         print(Color.GREEN.value + f"❌ Erro no servidor: {e}")
         except Exception as e:
             print(Color.GREEN.value + f"❌ Erro crítico no servidor: {e}")
-    
+
     def processar_cliente(self, conn, addr):
         """Processa mensagens recebidas de outros serviços"""
         try:
             with conn:
                 # Recebe dados em chunks para mensagens grandes
+                inicio = time.time()
                 dados_completos = b''
                 while True:
                     chunk = conn.recv(4096)
                     if not chunk:
                         break
                     dados_completos += chunk
-                
+
                 if dados_completos:
                     print(Color.GREEN.value + f" Mensagem recebida de {addr} - Tamanho: {len(dados_completos)} bytes")
-                    
-                    # Converte dados recebidos para JSON
-                    mensagem = json.loads(dados_completos.decode())
+
+                    # Converte dados recebidos (JSON, ou JSON com anexos binários) para a mensagem
+                    mensagem = decodificar(dados_completos)
                     print(Color.GREEN.value + f" Tipo da mensagem: {mensagem.get('type', 'desconhecido')}")
-                    
+
+                    self.rastreamento.fechar(self.rastreamento.abrir(
+                        'receber', pai=mensagem.get('trace'), inicio=inicio,
+                        tipo=mensagem.get('type'), bytes=len(dados_completos)
+                    ))
+
                     # Processa mensagem baseada no tipo
                     self.processar_mensagem(mensagem)
-                        
+
         except json.JSONDecodeError as e:
             print(Color.GREEN.value + f"❌ Erro ao decodificar JSON: {e}")
         except Exception as e:
             print(Color.GREEN.value + f"❌ Erro ao processar cliente: {e}")
-    
+
     def processar_mensagem(self, mensagem):
-        """Roteia mensagens baseado no tipo"""
+        """Roteia mensagens para a sessão de origem e, dentro dela, pelo tipo"""
         tipo_mensagem = mensagem.get('type')
         dados = mensagem.get('data')
-        
+
+        sessao = self.obter_sessao(mensagem.get('correlation_id'))
+        if sessao is None:
+            print(Color.GREEN.value + f"⚠️ Resposta '{tipo_mensagem}' sem sessão correspondente (encerrada ou desconhecida)")
+            return
+
+        self.concluir_solicitacao(sessao, self.modelo if tipo_mensagem in RESPOSTAS_MODELO else self.servidor)
+
         if tipo_mensagem == 'embedding':
-            self.processar_embedding_recebida(dados)
+            self.processar_embedding_recebida(sessao, dados, mensagem.get('projection'))
         elif tipo_mensagem == 'registration_id':
-            self.processar_id_registro(dados)
+            self.processar_id_registro(sessao, dados)
+        elif tipo_mensagem == 'prepared_embedding':
+            self.processar_embedding_preparada(sessao, dados)
+        elif tipo_mensagem == 'missing_image':
+            self.processar_imagem_ausente(sessao, dados)
         elif tipo_mensagem == 'snark_ingredients':
-            self.processar_ingredientes_snark(dados)
+            self.processar_ingredientes_snark(sessao, dados)
+        elif tipo_mensagem == 'missing_artifacts':
+            self.processar_artefatos_ausentes(sessao, dados)
+        elif tipo_mensagem == 'artifacts':
+            self.processar_artefatos_recebidos(sessao, dados)
+        elif tipo_mensagem == 'artifacts_error':
+            self.processar_erro(sessao, dados)
         elif tipo_mensagem == 'snark_proof':
-            self.processar_prova_snark(dados)
+            self.processar_prova_snark(sessao, dados)
         elif tipo_mensagem == 'authentication_result':
-            self.processar_resultado_autenticacao(dados)
+            self.processar_resultado_autenticacao(sessao, dados)
+        elif tipo_mensagem == 'embeddings':
+            self.processar_embeddings_lote(sessao, dados, mensagem.get('projection'))
+        elif tipo_mensagem == 'registration_ids':
+            self.processar_ids_lote(sessao, dados)
         else:
-            self.processar_erro(dados)
-    
-    def gerar_chave_simetrica(self):
-        """Gera chave simétrica AES de 256 bits para criptografia"""
-        print(Color.GREEN.value + " Gerando chave simétrica AES-256...")
-        self.chave_simetrica = get_random_bytes(32)  # 256 bits = 32 bytes
-        print(Color.GREEN.value + " Chave simétrica gerada com sucesso")
-        return self.chave_simetrica
-    
-    def criptografar_embedding(self, embedding):
-        """Criptografa embedding usando AES-256 no modo CBC"""
-        if not self.chave_simetrica:
-            raise ValueError("❌ Chave simétrica não foi gerada")
-        
-        print(Color.GREEN.value + " Criptografando embedding...")
-        
-        # Converte embedding para formato serializável
-        if isinstance(embedding, list):
-            embedding_str = json.dumps(embedding)
-            embedding_bytes = embedding_str.encode('utf-8')
-        else:
-            embedding_bytes = str(embedding).encode('utf-8')
-        
-        # Inicializa cipher AES no modo CBC
-        cipher = AES.new(self.chave_simetrica, AES.MODE_CBC)
-        
-        # Aplica padding e criptografa
-        dados_padded = pad(embedding_bytes, AES.block_size)
-        dados_criptografados = cipher.encrypt(dados_padded)
-        
-        # Empacota dados criptografados com IV
-        pacote_criptografado = {
-            'data': base64.b64encode(dados_criptografados).decode('utf-8'),
-            'iv': base64.b64encode(cipher.iv).decode('utf-8')
+            self.processar_erro(sessao, dados)
+
+    # === TABELA DE SESSÕES ===
+
+    def registrar_sessao(self, sessao):
+        if self.rastreamento.ativo:
+            sessao.rastreamento = self.rastreamento
+        with self.trava_sessoes:
+            self.sessoes[sessao.id] = sessao
+
+    def obter_sessao(self, correlacao):
+        with self.trava_sessoes:
+            return self.sessoes.get(correlacao)
+
+    def encerrar_sessao(self, sessao, erro=None):
+        """Remove a sessão da tabela e sinaliza seu término; respostas tardias passam a ser descartadas"""
+        with self.trava_sessoes:
+            self.sessoes.pop(sessao.id, None)
+            em_andamento, sessao.em_andamento = sessao.em_andamento, []
+        for balanceador, replica in em_andamento:
+            balanceador.liberar(replica)
+        sessao.finalizar(erro)
+
+    def falhar(self, sessao, motivo):
+        print(Color.GREEN.value + f"❌ {sessao.rotulo} {motivo}")
+        self.encerrar_sessao(sessao, motivo)
+
+    def expirar_sessoes(self):
+        """Encerra as sessões que não receberam resposta dentro do tempo limite"""
+        while True:
+            time.sleep(min(Sessions.TIMEOUT.value, 10))
+            limite = time.monotonic() - Sessions.TIMEOUT.value
+            with self.trava_sessoes:
+                expiradas = [sessao for sessao in self.sessoes.values() if sessao.ultima_fase < limite]
+            for sessao in expiradas:
+                # As réplicas que não responderam contam uma falha para a ejeção
+                for balanceador, replica in list(sessao.em_andamento):
+                    balanceador.registrar_falha(replica, "sessão sem resposta")
+                self.falhar(sessao, "Tempo esgotado aguardando resposta")
+
+    def enviar_solicitacao(self, sessao, balanceador, tipo, dados):
+        """Envia uma solicitação identificada pela sessão, para que a resposta seja roteada de volta a ela
+
+        A sessão continua na réplica usada nas etapas anteriores (embedding preparada e arquivos do
+        trusted setup ficam nela); se a réplica recusar a conexão, tenta as demais.
+        """
+        mensagem = {
+            'type': tipo,
+            'data': dados,
+            'return_to': self.endereco_retorno,
+            'correlation_id': sessao.id
         }
-        
-        print(Color.GREEN.value + " Embedding criptografada com sucesso")
-        return pacote_criptografado
-    
-    def descriptografar_embedding(self, pacote_criptografado):
-        """Descriptografa embedding usando AES-256"""
-        if not self.chave_simetrica:
-            raise ValueError("❌ Chave simétrica não foi gerada")
-        
-        print(Color.GREEN.value + " Descriptografando embedding...")
-        
-        # Extrai dados criptografados e IV do pacote
-        dados_criptografados = base64.b64decode(pacote_criptografado['data'])
-        iv = base64.b64decode(pacote_criptografado['iv'])
-        
-        # Inicializa cipher com IV original
-        cipher = AES.new(self.chave_simetrica, AES.MODE_CBC, iv)
-        
-        # Descriptografa e remove padding
-        dados_descriptografados = cipher.decrypt(dados_criptografados)
-        dados_sem_padding = unpad(dados_descriptografados, AES.block_size)
-        
-        # Converte de volta para embedding
-        embedding = json.loads(dados_sem_padding.decode('utf-8'))
-        print(Color.GREEN.value + " Embedding descriptografada com sucesso")
-        return embedding
-    
+        rastro = sessao.contexto_rastro()
+        if rastro is not None:
+            mensagem['trace'] = rastro
+
+        tentadas = []
+        while True:
+            replica = balanceador.escolher(sessao.replicas.get(balanceador.nome), sessao.user_id or sessao.id, tentadas)
+            if replica is None:
+                return False
+
+            # Registrada antes do envio: a resposta pode chegar antes do retorno de enviar_mensagem
+            with self.trava_sessoes:
+                sessao.em_andamento.append((balanceador, replica))
+
+            with sessao.rastrear('enviar', tipo=tipo, destino=replica.endereco):
+                enviada = self.enviar_mensagem(replica.host, replica.port, mensagem)
+            if enviada:
+                balanceador.registrar_sucesso(replica)
+                sessao.replicas[balanceador.nome] = replica
+                return True
+
+            self.concluir_solicitacao(sessao, balanceador, replica)
+            balanceador.registrar_falha(replica, "conexão recusada")
+            tentadas.append(replica)
+
+    def concluir_solicitacao(self, sessao, balanceador, replica=None):
+        """Libera a solicitação mais antiga da sessão ao serviço (ou à réplica informada)"""
+        with self.trava_sessoes:
+            for indice, (servico, usada) in enumerate(sessao.em_andamento):
+                if servico is balanceador and (replica is None or usada is replica):
+                    del sessao.em_andamento[indice]
+                    break
+            else:
+                return
+        balanceador.liberar(usada)
+
     def enviar_mensagem(self, host, port, mensagem):
-        """Envia mensagem JSON para outros serviços via TCP"""
+        """Envia a mensagem (JSON, com as imagens como anexos binários) para outros serviços via TCP"""
         try:
-            mensagem_json = json.dumps(mensagem)
-            tamanho_mensagem = len(mensagem_json.encode())
-            
+            conteudo = codificar(mensagem)
+
             with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
                 s.connect((host, port))
-                s.send(mensagem_json.encode())
-                
-            print(Color.GREEN.value + f" Mensagem enviada para {host}:{port} - Tamanho: {tamanho_mensagem} bytes")
+                s.sendall(conteudo)
+
+            print(Color.GREEN.value + f" Mensagem enviada para {host}:{port} - Tamanho: {len(conteudo)} bytes")
             return True
-            
+
         except ConnectionRefusedError:
             print(Color.GREEN.value + f"❌ Conexão recusada para {host}:{port}")
             return False
         except Exception as e:
             print(Color.GREEN.value + f"❌ Erro ao enviar mensagem: {e}")
             return False
-    
-    def carregar_imagem_como_base64(self, caminho_imagem):
-        """Carrega imagem e converte para base64"""
+
+    def carregar_imagem(self, sessao, foto):
+        """Prepara a foto (caminho ou bytes) para envio como anexo binário, sem recodificar quando possível"""
         try:
-            print(Color.GREEN.value + f" Carregando imagem: {caminho_imagem}")
-            imagem = Image.open(caminho_imagem)
-            
-            # Converte para base64
-            buffer = BytesIO()
-            imagem.save(buffer, format='JPEG')
-            imagem_base64 = base64.b64encode(buffer.getvalue()).decode()
-            
-            print(Color.GREEN.value + f" Imagem carregada - Tamanho: {len(imagem_base64)} caracteres")
-            return imagem_base64
-            
+            with sessao.rastrear('preparar_foto'):
+                dados, modo, cpu = medir_upload(foto)
         except Exception as e:
             print(Color.GREEN.value + f"❌ Erro ao carregar imagem: {e}")
             return None
-    
+
+        sessao.bytes_upload += len(dados)
+        sessao.cpu_upload += cpu
+        print(Color.GREEN.value + f" {sessao.rotulo} Imagem carregada ({modo}) - Tamanho: {len(dados)} bytes, CPU: {cpu * 1000:.1f} ms")
+        return dados
+
     # === PROCESSO DE REGISTRO ===
-    
-    def processo_registro(self):
-        """Executa o processo completo de registro do usuário"""
+
+    def iniciar_registro(self, sessao):
+        """Executa o processo completo de registro da pessoa atendida pela sessão"""
         print("\n" + "=" * 60)
-        print(Color.GREEN.value + " INICIANDO FASE DE REGISTRO")
+        print(Color.GREEN.value + f" INICIANDO FASE DE REGISTRO {sessao.rotulo}")
         print("=" * 60)
-        
+
         # Inicia cronômetro da fase de registro
-        Benchmark.REGISTRATION_TIME = time.time()
+        self.registrar_sessao(sessao)
+        sessao.iniciar_fase('registro')
 
         # Etapa 1: Gerar chave simétrica
-        print(Color.GREEN.value + " Etapa 1/4: Gerando chave de criptografia")
-        self.gerar_chave_simetrica()
-        
+        print(Color.GREEN.value + f" {sessao.rotulo} Etapa 1/4: Gerando chave simétrica AES-256")
+        sessao.gerar_chave_simetrica()
+
+        # As fotos adicionais são registradas como templates da mesma identidade
+        sessao.user_id = None
+        self.solicitar_embedding(sessao, sessao.foto_registro)
+        return sessao
+
+    def solicitar_embedding(self, sessao, caminho_imagem):
+        """Envia a foto de registro ao modelo de IA para a geração da embedding"""
         # Etapa 2: Carregar foto do usuário
-        print("\n" + Color.GREEN.value + " Etapa 2/4: Carregando foto do usuário")
-        foto_base64 = self.carregar_imagem_como_base64(ImagePath.FACE_IMAGE_REG.value)
-        
-        if not foto_base64:
-            print(Color.GREEN.value + "❌ Falha no registro: Não foi possível carregar a foto")
+        print("\n" + Color.GREEN.value + f" {sessao.rotulo} Etapa 2/4: Carregando foto do usuário")
+        foto = self.carregar_imagem(sessao, caminho_imagem)
+
+        if not foto:
+            self.falhar(sessao, "Falha no registro: Não foi possível carregar a foto")
             return
-        
+
         # Etapa 3: Solicitar embedding ao modelo de IA
-        print("\n" + Color.GREEN.value + " Etapa 3/4: Enviando foto para o modelo de IA")
-        mensagem_modelo = {
-            'type': 'generate_embedding',
-            'data': foto_base64,
-            'return_to': Addresses.RETURN.value
-        }
-        
-        sucesso = self.enviar_mensagem(self.modelo_host, self.modelo_port, mensagem_modelo)
+        print("\n" + Color.GREEN.value + f" {sessao.rotulo} Etapa 3/4: Enviando foto para o modelo de IA")
+        sessao.iniciar_fase('embedding')
+        sucesso = self.enviar_solicitacao(sessao, self.modelo, 'generate_embedding', foto)
         if not sucesso:
-            print(Color.GREEN.value + "❌ Falha no registro: Não foi possível enviar foto para o modelo")
+            self.falhar(sessao, "Falha no registro: Não foi possível enviar foto para o modelo")
             return
-        
-        print(Color.GREEN.value + " Aguardando resposta do modelo de IA...")
-    
-    def processar_embedding_recebida(self, embedding):
-        """Processa embedding recebida do modelo de IA durante o registro"""
-        print("\n" + Color.GREEN.value + " Etapa 4/4: Processando embedding recebida")
-        
+
+        print(Color.GREEN.value + f" {sessao.rotulo} Aguardando resposta do modelo de IA...")
+
+    def processar_embedding_recebida(self, sessao, embedding, projecao=None):
+        """Processa embedding recebida do modelo de IA durante o registro
+
+        O hash da matriz de projeção usada pelo modelo ('projecao') fica registrado no envelope do template.
+        """
+        print("\n" + Color.GREEN.value + f" {sessao.rotulo} Etapa 4/4: Processando embedding recebida")
+        sessao.concluir_fase('embedding')
+
         # Verifica se embedding é válida
         if embedding is None:
-            print(Color.GREEN.value + "❌ Falha no registro: Embedding inválida recebida do modelo")
+            self.falhar(sessao, "Falha no registro: Embedding inválida recebida do modelo")
             return
-        
-        print(Color.GREEN.value + f" Embedding recebida - Dimensões: {len(embedding) if isinstance(embedding, list) else 'formato desconhecido'}")
-        
-        # Criptografa embedding
+
+        print(Color.GREEN.value + f" {sessao.rotulo} Embedding recebida - Dimensões: {len(embedding) if isinstance(embedding, list) else 'formato desconhecido'}")
+
+        # Criptografa embedding com a chave da sessão
         try:
-            embedding_criptografada = self.criptografar_embedding(embedding)
+            embedding_criptografada = sessao.criptografar_embedding(embedding, projecao)
         except Exception as e:
-            print(Color.GREEN.value + f"❌ Falha no registro: Erro na criptografia - {e}")
+            self.falhar(sessao, f"Falha no registro: Erro na criptografia - {e}")
             return
-        
+
+        # Templates adicionais são associados à identidade já registrada
+        if sessao.user_id:
+            embedding_criptografada['user_id'] = sessao.user_id
+
         # Envia embedding criptografada para servidor
-        print(Color.GREEN.value + " Enviando embedding criptografada para servidor...")
-        mensagem_servidor = {
-            'type': 'store_embedding',
-            'data': embedding_criptografada,
-            'return_to': Addresses.RETURN.value
-        }
-        
-        sucesso = self.enviar_mensagem(self.servidor_host, self.servidor_port, mensagem_servidor)
+        print(Color.GREEN.value + f" {sessao.rotulo} Enviando embedding criptografada para servidor...")
+        sessao.iniciar_fase('armazenamento')
+        sucesso = self.enviar_solicitacao(sessao, self.servidor, 'store_embedding', embedding_criptografada)
         if not sucesso:
-            print(Color.GREEN.value + "❌ Falha no registro: Não foi possível enviar para o servidor")
-    
-    def processar_id_registro(self, registration_id):
+            self.falhar(sessao, "Falha no registro: Não foi possível enviar para o servidor")
+
+    def processar_id_registro(self, sessao, registration_id):
         """Processa ID de registro recebido do servidor"""
-        print(Color.GREEN.value + f" ID do usuário: {registration_id}")
-        print("=" * 60)
-        print(Color.GREEN.value + " FASE DE REGISTRO FINALIZADA")
-        print("=" * 60)
-        
+        print(Color.GREEN.value + f" {sessao.rotulo} ID do usuário: {registration_id}")
+        sessao.concluir_fase('armazenamento')
+
         # Armazena ID para futuras autenticações
-        self.user_id = registration_id
-        
+        sessao.user_id = registration_id
+
+        # Um template adicional altera os templates da identidade
+        self.invalidar_templates(registration_id)
+
+        # Registra o próximo template adicional antes de concluir o registro
+        if sessao.templates_pendentes:
+            print(Color.GREEN.value + f" {sessao.rotulo} Registrando template adicional ({len(sessao.templates_pendentes)} restante(s))...")
+            self.solicitar_embedding(sessao, sessao.templates_pendentes.pop(0))
+            return
+
         # Calcula tempo de registro
-        Benchmark.REGISTRATION_TIME = time.time() - Benchmark.REGISTRATION_TIME
+        tempo_registro = sessao.concluir_fase('registro')
+
+        print("=" * 60)
+        print(Color.GREEN.value + f" FASE DE REGISTRO FINALIZADA {sessao.rotulo} - {tempo_registro:.2f} SEGUNDOS")
+        print("=" * 60)
+
+        if sessao.foto_autenticacao is None:
+            self.encerrar_sessao(sessao)
+            return
 
         # Agenda processo de autenticação
-        print("\n" + Color.GREEN.value + " Autenticação será iniciada em 3 segundos...")
-        threading.Timer(3.0, self.processo_autenticacao).start()
-    
+        atraso = Sessions.AUTHENTICATION_DELAY.value
+        print("\n" + Color.GREEN.value + f" {sessao.rotulo} Autenticação será iniciada em {atraso:g} segundos...")
+        threading.Timer(atraso, self.iniciar_autenticacao, args=(sessao,)).start()
+
+    # === REGISTRO EM LOTE ===
+
+    def iniciar_registro_lote(self, sessao):
+        """Solicita ao modelo, em uma única mensagem, as embeddings de todas as fotos do lote"""
+        self.registrar_sessao(sessao)
+        sessao.iniciar_fase('registro')
+
+        fotos = [self.carregar_imagem(sessao, foto) for foto in sessao.fotos]
+        for indice, foto in enumerate(fotos):
+            if not foto:
+                sessao.erros[indice] = 'Não foi possível carregar a foto'
+
+        sessao.pendentes = [indice for indice, foto in enumerate(fotos) if foto]
+        if not sessao.pendentes:
+            self.concluir_registro_lote(sessao)
+            return sessao
+
+        print(Color.GREEN.value + f" {sessao.rotulo} Enviando lote de {len(sessao.pendentes)} foto(s) para o modelo de IA")
+        sessao.iniciar_fase('embedding')
+        sucesso = self.enviar_solicitacao(sessao, self.modelo, 'generate_embeddings',
+                                          [fotos[indice] for indice in sessao.pendentes])
+        if not sucesso:
+            self.falhar(sessao, "Falha no registro em lote: Não foi possível enviar as fotos para o modelo")
+        return sessao
+
+    def processar_embeddings_lote(self, sessao, embeddings, projecao=None):
+        """Criptografa cada embedding com uma chave nova e armazena o lote no servidor"""
+        sessao.concluir_fase('embedding')
+
+        validas = []
+        for indice, embedding in zip(sessao.pendentes, embeddings):
+            if embedding is None:
+                sessao.erros[indice] = 'Nenhuma face detectada na imagem'
+            else:
+                sessao.chaves[indice] = gerar_chave()
+                validas.append((indice, embedding))
+
+        sessao.pendentes = [indice for indice, _ in validas]
+        if not validas:
+            self.concluir_registro_lote(sessao)
+            return
+
+        try:
+            with sessao.rastrear('criptografar', embeddings=len(validas)):
+                pacotes = criptografar_lote([sessao.chaves[indice] for indice, _ in validas], [embedding for _, embedding in validas], projecao)
+        except Exception as e:
+            self.falhar(sessao, f"Falha no registro em lote: Erro na criptografia - {e}")
+            return
+
+        print(Color.GREEN.value + f" {sessao.rotulo} Enviando {len(pacotes)} embedding(s) criptografada(s) para o servidor...")
+        sessao.iniciar_fase('armazenamento')
+        sucesso = self.enviar_solicitacao(sessao, self.servidor, 'store_embeddings', pacotes)
+        if not sucesso:
+            self.falhar(sessao, "Falha no registro em lote: Não foi possível enviar para o servidor")
+
+    def processar_ids_lote(self, sessao, registration_ids):
+        """Associa os IDs recebidos (na ordem do envio) às fotos do lote"""
+        sessao.concluir_fase('armazenamento')
+        for indice, registration_id in zip(sessao.pendentes, registration_ids):
+            sessao.user_ids[indice] = registration_id
+        self.concluir_registro_lote(sessao)
+
+    def concluir_registro_lote(self, sessao):
+        tempo_registro = sessao.concluir_fase('registro')
+        registradas = sum(1 for user_id in sessao.user_ids if user_id is not None)
+        print(Color.GREEN.value + f" {sessao.rotulo} Lote registrado: {registradas}/{len(sessao.fotos)} foto(s) em {tempo_registro:.2f} s")
+        self.encerrar_sessao(sessao)
+
     # === PROCESSO DE AUTENTICAÇÃO ===
-    
-    def processo_autenticacao(self):
-        """Executa o processo completo de autenticação do usuário"""
+
+    def iniciar_autenticacao(self, sessao):
+        """Executa o processo completo de autenticação da pessoa atendida pela sessão"""
         print("\n" + "=" * 60)
-        print(Color.GREEN.value + " INICIANDO FASE DE AUTENTICAÇÃO")
+        print(Color.GREEN.value + f" INICIANDO FASE DE AUTENTICAÇÃO {sessao.rotulo}")
         print("=" * 60)
-        
+
         # Inicia cronômetro da fase de autenticação
-        Benchmark.AUTHENTICATION_TIME = time.time()
+        self.registrar_sessao(sessao)
+        sessao.iniciar_fase('autenticacao')
 
-        if not self.user_id:
-            print(Color.GREEN.value + "❌ Falha na autenticação: ID do usuário não encontrado")
-            print(Color.GREEN.value + " É necessário fazer o registro primeiro")
+        if not sessao.user_id or not sessao.chave_simetrica:
+            self.falhar(sessao, "Falha na autenticação: ID do usuário não encontrado (é necessário fazer o registro primeiro)")
             return
-        
+
+        # A embedding da nova foto é calculada no modelo enquanto os templates chegam do servidor
+        if self.modo_autenticacao == 'pipelined' and not self.preparar_embedding(sessao):
+            return
+
+        self.solicitar_templates(sessao)
+        return sessao
+
+    def solicitar_templates(self, sessao):
+        """Usa os templates em cache da identidade ou os solicita ao servidor"""
+        sessao.iniciar_fase('ingredientes')
+
+        ingredientes = self.cache_templates.obter(sessao.user_id)
+        if ingredientes is not None:
+            # Etapa 1: Templates recebidos em uma autenticação anterior neste dispositivo
+            print(Color.GREEN.value + f" {sessao.rotulo} Etapa 1/4: Templates do ID {sessao.user_id} encontrados no cache local")
+            sessao.templates_em_cache = True
+            self.processar_ingredientes_snark(sessao, ingredientes)
+            return
+
         # Etapa 1: Solicitar embedding armazenada do servidor
-        print(Color.GREEN.value + f" Etapa 1/4: Solicitando embedding para ID {self.user_id}")
-        mensagem_servidor = {
-            'type': 'get_embedding',
-            'data': self.user_id,
-            'return_to': Addresses.RETURN.value
-        }
-        
-        sucesso = self.enviar_mensagem(self.servidor_host, self.servidor_port, mensagem_servidor)
+        print(Color.GREEN.value + f" {sessao.rotulo} Etapa 1/4: Solicitando embedding para ID {sessao.user_id}")
+        sucesso = self.enviar_solicitacao(sessao, self.servidor, 'get_embedding', sessao.user_id)
+        if not sucesso:
+            self.falhar(sessao, "Falha na autenticação: Não foi possível contatar o servidor")
+            return
+
+        print(Color.GREEN.value + f" {sessao.rotulo} Aguardando embedding do servidor...")
+
+    def invalidar_templates(self, user_id):
+        """Descarta os templates em cache da identidade (ex.: após alterá-los no servidor)"""
+        self.cache_templates.invalidar(user_id)
+
+    def preparar_embedding(self, sessao):
+        """Envia a foto de autenticação ao modelo antes da busca dos templates, referenciada pelo ID da sessão"""
+        print(Color.GREEN.value + f" {sessao.rotulo} Enviando foto de autenticação ao modelo (em paralelo com a busca dos templates)")
+        sessao.foto_preparada = self.carregar_imagem(sessao, sessao.foto_autenticacao)
+
+        if not sessao.foto_preparada:
+            self.falhar(sessao, "Falha na autenticação: Não foi possível carregar foto de autenticação")
+            return False
+
+        sessao.iniciar_fase('preparacao')
+        sucesso = self.enviar_solicitacao(sessao, self.modelo, 'prepare_embedding', {
+            'image': sessao.foto_preparada,
+            'ref': sessao.id
+        })
         if not sucesso:
-            print(Color.GREEN.value + "❌ Falha na autenticação: Não foi possível contatar o servidor")
+            self.falhar(sessao, "Falha na autenticação: Não foi possível enviar a foto para o modelo")
+            return False
+        return True
+
+    def processar_embedding_preparada(self, sessao, dados):
+        """Encerra a autenticação sem face detectada antes mesmo da solicitação de prova"""
+        sessao.concluir_fase('preparacao')
+        if not dados.get('ready'):
+            self.falhar(sessao, "Falha na autenticação: Nenhuma face detectada na foto de autenticação")
             return
-        
-        print(Color.GREEN.value + " Aguardando embedding do servidor...")
-    
-    def processar_ingredientes_snark(self, ingredientes):
-        """Processa embedding criptografada recebida do servidor"""
-        print("\n" + Color.GREEN.value + " Etapa 2/4: Processando embedding do servidor")
-        
-        embedding_criptografada = ingredientes['embedding']
-        chave_prova = ingredientes['proving_key']
-        circuito = ingredientes['circuit']
-
-        # Descriptografa embedding armazenada
+        print(Color.GREEN.value + f" {sessao.rotulo} Embedding da foto de autenticação pronta no modelo")
+
+    def processar_imagem_ausente(self, sessao, dados):
+        """Reenvia a solicitação de prova com a foto, quando o modelo não tem mais a embedding preparada"""
+        if not sessao.solicitacao_prova or not sessao.foto_preparada:
+            print(Color.GREEN.value + f"⚠️ {sessao.rotulo} Foto de autenticação solicitada sem solicitação de prova pendente")
+            return
+
+        print(Color.GREEN.value + f" {sessao.rotulo} Modelo sem a embedding preparada, reenviando a foto de autenticação...")
+        sessao.solicitacao_prova = dict(sessao.solicitacao_prova, new_image=sessao.foto_preparada)
+        self.solicitar_prova_snark(sessao, sessao.solicitacao_prova)
+
+    def processar_ingredientes_snark(self, sessao, ingredientes):
+        """Processa os templates criptografados recebidos do servidor (ou do cache local)"""
+        print("\n" + Color.GREEN.value + f" {sessao.rotulo} Etapa 2/4: Processando embedding do servidor")
+        sessao.concluir_fase('ingredientes')
+
+        embeddings_criptografadas = ingredientes.get('embeddings') or [ingredientes['embedding']]
+        artefatos = ingredientes['artifacts']
+        sessao.versao_circuito = ingredientes.get('version')
+        sessao.versao_templates = ingredientes.get('template_version')
+
+        # Descriptografa os templates armazenados com a chave da sessão
         try:
-            embedding_antiga = self.descriptografar_embedding(embedding_criptografada)
-            print(Color.GREEN.value + f" Embedding descriptografada - Dimensões: {len(embedding_antiga) if isinstance(embedding_antiga, list) else 'formato desconhecido'}")
+            embeddings_antigas = sessao.descriptografar_embeddings(embeddings_criptografadas)
+            print(Color.GREEN.value + f" {sessao.rotulo} {len(embeddings_antigas)} template(s) descriptografado(s) - Dimensões: {len(embeddings_antigas[0])}")
         except Exception as e:
-            print(Color.GREEN.value + f"❌ Falha na autenticação: Erro na descriptografia - {e}")
+            self.invalidar_templates(sessao.user_id)
+            self.falhar(sessao, f"Falha na autenticação: Erro na descriptografia - {e}")
             return
-        
-        # Carrega nova foto para autenticação
-        print("\n" + Color.GREEN.value + " Etapa 3/4: Carregando foto para autenticação")
-        foto_nova_base64 = self.carregar_imagem_como_base64(ImagePath.FACE_IMAGE_AUT.value)
-        
-        if not foto_nova_base64:
-            print(Color.GREEN.value + "❌ Falha na autenticação: Não foi possível carregar foto de autenticação")
-            return
-        
-        # Solicita prova zk-SNARK ao modelo
-        print(Color.GREEN.value + " Enviando dados para geração de prova zk-SNARK...")
-        mensagem_modelo = {
-            'type': 'generate_snark_proof',
-            'data': {
-                'new_image': foto_nova_base64,
-                'old_embedding': embedding_antiga,
-                'proving_key': chave_prova,
-                'circuit': circuito
-            },
-            'return_to': Addresses.RETURN.value
+
+        # Os templates continuam criptografados no cache; a versão é conferida pelo servidor a cada uso
+        if not sessao.templates_em_cache:
+            self.cache_templates.armazenar(sessao.user_id, ingredientes)
+
+        # Solicita prova zk-SNARK ao modelo; os arquivos do trusted setup seguem apenas como hashes
+        # (a etapa de prova inclui a eventual busca dos arquivos ausentes no modelo)
+        # O hash da projeção de cada template (autenticado na descriptografia) é conferido pelo modelo
+        sessao.solicitacao_prova = {
+            'old_embeddings': embeddings_antigas,
+            'template_projections': [projecao_envelope(pacote) for pacote in embeddings_criptografadas],
+            'artifacts': artefatos
         }
-        
-        sucesso = self.enviar_mensagem(self.modelo_host, self.modelo_port, mensagem_modelo)
+
+        if sessao.foto_preparada:
+            # A foto já está no modelo: a prova referencia a embedding preparada (ou em cálculo)
+            print("\n" + Color.GREEN.value + f" {sessao.rotulo} Etapa 3/4: Foto de autenticação já enviada ao modelo")
+            sessao.solicitacao_prova['new_image_ref'] = sessao.id
+        else:
+            # Carrega nova foto para autenticação
+            print("\n" + Color.GREEN.value + f" {sessao.rotulo} Etapa 3/4: Carregando foto para autenticação")
+            foto_nova = self.carregar_imagem(sessao, sessao.foto_autenticacao)
+
+            if not foto_nova:
+                self.falhar(sessao, "Falha na autenticação: Não foi possível carregar foto de autenticação")
+                return
+            sessao.solicitacao_prova['new_image'] = foto_nova
+
+        sessao.iniciar_fase('prova')
+        self.solicitar_prova_snark(sessao, sessao.solicitacao_prova)
+
+    def solicitar_prova_snark(self, sessao, dados):
+        """Envia ao modelo a solicitação de geração de prova zk-SNARK"""
+        print(Color.GREEN.value + f" {sessao.rotulo} Enviando dados para geração de prova zk-SNARK...")
+        sucesso = self.enviar_solicitacao(sessao, self.modelo, 'generate_snark_proof', dados)
+        if not sucesso:
+            self.falhar(sessao, "Falha na autenticação: Não foi possível enviar dados para o modelo")
+
+    def processar_artefatos_ausentes(self, sessao, dados):
+        """Busca no servidor os arquivos do trusted setup que o modelo ainda não possui"""
+        hashes = dados['hashes']
+        print(Color.GREEN.value + f" {sessao.rotulo} Modelo sem {len(hashes)} arquivo(s) do trusted setup, solicitando ao servidor...")
+
+        sucesso = self.enviar_solicitacao(sessao, self.servidor, 'get_artifacts', hashes)
         if not sucesso:
-            print(Color.GREEN.value + "❌ Falha na autenticação: Não foi possível enviar dados para o modelo")
-    
-    def processar_prova_snark(self, dados_prova):
+            self.falhar(sessao, "Falha na autenticação: Não foi possível contatar o servidor")
+
+    def processar_artefatos_recebidos(self, sessao, artefatos):
+        """Reenvia a solicitação de prova junto com os arquivos do trusted setup ausentes"""
+        if not sessao.solicitacao_prova:
+            print(Color.GREEN.value + f"⚠️ {sessao.rotulo} Arquivos do trusted setup recebidos sem solicitação de prova pendente")
+            return
+
+        print(Color.GREEN.value + f" {sessao.rotulo} {len(artefatos)} arquivo(s) do trusted setup recebido(s) do servidor")
+        self.solicitar_prova_snark(sessao, dict(sessao.solicitacao_prova, artifact_contents=artefatos))
+
+    def processar_prova_snark(self, sessao, dados_prova):
         """Processa prova zk-SNARK recebida do modelo"""
-        print("\n" + Color.GREEN.value + " Etapa 4/4: Processando prova zk-SNARK")
-        print(Color.GREEN.value + " Prova zk-SNARK recebida do modelo")
-        
+        print("\n" + Color.GREEN.value + f" {sessao.rotulo} Etapa 4/4: Processando prova zk-SNARK")
+        sessao.concluir_fase('prova')
+        sessao.solicitacao_prova = None
+
         # Envia prova para o servidor verificar
-        print(Color.GREEN.value + " Enviando prova para verificação no servidor...")
-        mensagem_servidor = {
-            'type': 'verify_snark_proof',
-            'data': {
-                'user_id': self.user_id,
-                'prova': dados_prova['prova'],
-                'params': dados_prova['params']
-            },
-            'return_to': Addresses.RETURN.value
-        }
-        
-        sucesso = self.enviar_mensagem(self.servidor_host, self.servidor_port, mensagem_servidor)
+        print(Color.GREEN.value + f" {sessao.rotulo} Enviando prova para verificação no servidor...")
+        sessao.iniciar_fase('verificacao')
+        sucesso = self.enviar_solicitacao(sessao, self.servidor, 'verify_snark_proof', {
+            'user_id': sessao.user_id,
+            'prova': dados_prova['prova'],
+            'params': dados_prova['params'],
+            'version': sessao.versao_circuito,
+            'template_version': sessao.versao_templates
+        })
         if not sucesso:
-            print(Color.GREEN.value + "❌ Falha na autenticação: Não foi possível enviar prova para o servidor")
-    
-    def processar_resultado_autenticacao(self, resultado):
+            self.falhar(sessao, "Falha na autenticação: Não foi possível enviar prova para o servidor")
+
+    def processar_resultado_autenticacao(self, sessao, resultado):
         """Processa resultado final da autenticação"""
-        print("\n" + Color.GREEN.value + " RESULTADO DA AUTENTICAÇÃO:")
-        
-        if resultado.get('authenticated', False):
+        sessao.concluir_fase('verificacao')
+
+        # Templates ou arquivos do trusted setup do cache desatualizados: repete com os do servidor
+        if resultado.get('stale') and sessao.templates_em_cache:
+            print(Color.GREEN.value + f" {sessao.rotulo} Templates em cache desatualizados ({resultado.get('reason')}), consultando o servidor...")
+            self.invalidar_templates(sessao.user_id)
+            sessao.templates_em_cache = False
+            self.solicitar_templates(sessao)
+            return
+
+        print("\n" + Color.GREEN.value + f" RESULTADO DA AUTENTICAÇÃO {sessao.rotulo}:")
+
+        sessao.autenticado = resultado.get('authenticated', False)
+        if sessao.autenticado:
             print(Color.GREEN.value + " ✅ AUTENTICAÇÃO BEM-SUCEDIDA!")
             print(Color.GREEN.value + " Usuário autenticado com sucesso")
         else:
             print(Color.GREEN.value + "❌ AUTENTICAÇÃO FALHOU!")
             motivo = resultado.get('reason', 'Motivo não especificado')
             print(Color.GREEN.value + f" Motivo da falha: {motivo}")
-        
+
         # Calcula tempo de autenticação
-        Benchmark.AUTHENTICATION_TIME = time.time() - Benchmark.AUTHENTICATION_TIME
+        sessao.concluir_fase('autenticacao')
+        self.encerrar_sessao(sessao)
 
         print("=" * 60)
-        print(Color.GREEN.value + " FASE DE AUTENTICAÇÃO FINALIZADA")
+        print(Color.GREEN.value + f" FASE DE AUTENTICAÇÃO FINALIZADA {sessao.rotulo}")
         print("=" * 60 + "\n")
 
-        print(Color.GREEN.value + f" TEMPO DE REGISTRO: {Benchmark.REGISTRATION_TIME:.2f} SEGUNDOS")
-        print(Color.GREEN.value + f" TEMPO DE AUTENTICAÇÃO: {Benchmark.AUTHENTICATION_TIME:.2f} SEGUNDOS")
+        if 'registro' in sessao.tempos:
+            print(Color.GREEN.value + f" TEMPO DE REGISTRO: {sessao.tempos['registro']:.2f} SEGUNDOS")
+        print(Color.GREEN.value + f" TEMPO DE AUTENTICAÇÃO: {sessao.tempos['autenticacao']:.2f} SEGUNDOS")
 
-    def processar_erro(self, mensagem):
-        print(Color.GREEN.value + f"❌ Erro: {mensagem['error']}")
\ No newline at end of file
+    def processar_erro(self, sessao, mensagem):
+        self.falhar(sessao, f"Erro: {mensagem['error']}")